@@ -0,0 +1,62 @@
+"""Admin REST endpoints."""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session, sessionmaker
+from typing import List, Literal, Optional
+from app.database import get_db
+from app.services.batch_reconciliation_service import BatchReconciliationService
+from app.services.idempotency_store import idempotency_store
+from app.services.score_cache import score_cache
+from app.services.reconciliation_metrics import reconcile_metrics
+from app.schemas.reconciliation import (
+    BatchReconciliationReport,
+    ReconcileMetricsSnapshot,
+    ScoreCacheStats,
+)
+from app.schemas.transaction import IdempotencyStoreStats
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.post("/reconcile", response_model=BatchReconciliationReport)
+def reconcile_all(
+    tenant_id: Optional[List[int]] = Query(None),
+    workers: Optional[int] = Query(None, ge=1),
+    time_limit: Optional[float] = Query(None, ge=0),
+    assignment: Optional[Literal["best", "one_to_one"]] = Query(None),
+    full: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    """
+    Reconcile all tenants, or those given as repeated tenant_id parameters,
+    and return the summary report.
+    """
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    return BatchReconciliationService.reconcile_tenants(
+        session_factory,
+        tenant_ids=tenant_id,
+        workers=workers,
+        time_limit=time_limit,
+        assignment=assignment,
+        full=full,
+    )
+
+
+@router.get("/score-cache", response_model=ScoreCacheStats)
+def score_cache_stats():
+    """Get the size and hit/miss counters of the pair score cache."""
+    return score_cache.stats()
+
+
+@router.get("/idempotency-keys", response_model=IdempotencyStoreStats)
+def idempotency_store_stats():
+    """Get the size, TTL and hit/miss counters of the idempotency key cache."""
+    return idempotency_store.stats()
+
+
+@router.get("/metrics", response_model=ReconcileMetricsSnapshot)
+def reconcile_metrics_snapshot():
+    """
+    Get the reconcile runs of this process by status, with histograms of run
+    and stage wall time and of SQL statements per run.
+    """
+    return reconcile_metrics.snapshot()
@@ -1,12 +1,26 @@
 """Reconciliation REST endpoints."""
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Literal, Optional
 from app.database import get_db
 from app.services.reconciliation_service import ReconciliationService
 from app.services.ai_service import AIService
-from app.schemas.reconciliation import ReconciliationResponse, ExplainResponse
-from app.schemas.match import MatchResponse
+from app.services.tenant_service import TenantService
+from app.services.reconciliation_job_service import ReconciliationJobService
+from app.services.reconciliation_metrics import ReconcileMetrics
+from app.schemas.reconciliation import (
+    ReconciliationResponse,
+    ExplainResponse,
+    ReconciliationJobResponse,
+)
+from app.schemas.match import (
+    MatchBatch,
+    MatchBatchOutcome,
+    MatchBatchResult,
+    MatchRejection,
+    MatchResponse,
+)
 
 router = APIRouter(prefix="/tenants/{tenant_id}/reconcile", tags=["reconciliation"])
 
@@ -14,17 +28,84 @@ ai_service = AIService()
 
 
 @router.post("", response_model=ReconciliationResponse)
-def reconcile(tenant_id: int, db: Session = Depends(get_db)):
-    """Run reconciliation and return match candidates."""
+def reconcile(
+    tenant_id: int,
+    assignment: Optional[Literal["best", "one_to_one"]] = Query(None),
+    full: bool = Query(False),
+    metrics: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    """
+    Run reconciliation and return match candidates.
+    Only records added since the last run are scored unless full=true.
+    With metrics=true the run's per-stage measurements are returned too.
+    """
     try:
-        matches = ReconciliationService.reconcile(db, tenant_id)
+        run_metrics = ReconcileMetrics()
+        matches = ReconciliationService.reconcile(
+            db, tenant_id, assignment=assignment, full=full, metrics=run_metrics
+        )
         return ReconciliationResponse(
-            matches=[MatchResponse.model_validate(m) for m in matches]
+            matches=[MatchResponse.model_validate(m) for m in matches],
+            metrics=run_metrics.as_dict() if metrics else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/stream")
+def reconcile_stream(
+    tenant_id: int,
+    assignment: Optional[Literal["best", "one_to_one"]] = Query(None),
+    full: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    """
+    Run reconciliation and stream match candidates as newline-delimited JSON,
+    one match per line, as each batch of matches is persisted.
+    """
+    if not TenantService.get_tenant(db, tenant_id):
+        raise HTTPException(status_code=404, detail=f"Tenant {tenant_id} not found")
+
+    def stream_matches():
+        # The request's session is closed before the body is streamed; the
+        # stream reopens it and closes it again once done
+        try:
+            for match in ReconciliationService.reconcile_stream(
+                db, tenant_id, assignment=assignment, full=full
+            ):
+                yield MatchResponse.model_validate(match).model_dump_json() + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(stream_matches(), media_type="application/x-ndjson")
+
+
+@router.post("/jobs", response_model=ReconciliationJobResponse, status_code=202)
+def submit_reconcile_job(
+    tenant_id: int,
+    assignment: Optional[Literal["best", "one_to_one"]] = Query(None),
+    full: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    """Queue reconciliation as a background job and return the job right away."""
+    try:
+        return ReconciliationJobService.submit_job(
+            db, tenant_id, assignment=assignment, full=full
         )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@router.get("/jobs/{job_id}", response_model=ReconciliationJobResponse)
+def get_reconcile_job(tenant_id: int, job_id: int, db: Session = Depends(get_db)):
+    """Get the status, progress, timings and resulting match ids of a job."""
+    job = ReconciliationJobService.get_job(db, tenant_id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @router.get("/explain", response_model=ExplainResponse)
 def explain_reconciliation(
     tenant_id: int,
@@ -46,17 +127,54 @@ def explain_reconciliation(
 
     # Calculate score
     score = float(
-        ReconciliationService.calculate_match_score(invoice, transaction)
+        ReconciliationService.calculate_match_score(invoice, transaction, db)
     )
 
     explanation = ai_service.explain_match(invoice, transaction, score)
     return ExplainResponse(explanation=explanation)
 
 
+@router.post("/matches:batch", response_model=MatchBatchResult)
+def review_matches(tenant_id: int, batch: MatchBatch, db: Session = Depends(get_db)):
+    """
+    Confirm and reject matches in one transaction, returning an outcome per
+    id. Other proposals of each confirmed invoice or transaction are
+    rejected too, and invoices left without a proposal get their next
+    ranked candidate.
+    """
+    if not TenantService.get_tenant(db, tenant_id):
+        raise HTTPException(status_code=404, detail=f"Tenant {tenant_id} not found")
+    review = ReconciliationService.review_matches(db, tenant_id, batch.confirm, batch.reject)
+    return MatchBatchResult(
+        results=[
+            MatchBatchOutcome(match_id=match_id, action=action, outcome=outcome)
+            for match_id, action, outcome in review.outcomes
+        ],
+        auto_rejected=review.auto_rejected,
+        promoted=[MatchResponse.model_validate(m) for m in review.promoted],
+    )
+
+
 @router.post("/matches/{match_id}/confirm", response_model=MatchResponse)
 def confirm_match(tenant_id: int, match_id: int, db: Session = Depends(get_db)):
-    """Confirm a proposed match."""
-    match = ReconciliationService.confirm_match(db, tenant_id, match_id)
+    """Confirm a proposed match, rejecting competing proposals."""
+    try:
+        match = ReconciliationService.confirm_match(db, tenant_id, match_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not match:
         raise HTTPException(status_code=404, detail="Match not found or already confirmed")
     return MatchResponse.model_validate(match)
+
+
+@router.post("/matches/{match_id}/reject", response_model=MatchRejection)
+def reject_match(tenant_id: int, match_id: int, db: Session = Depends(get_db)):
+    """Reject a proposed match and promote the invoice's next ranked candidate."""
+    result = ReconciliationService.reject_match(db, tenant_id, match_id)
+    if not result:
+        raise HTTPException(status_code=404, detail="Match not found or not proposed")
+    rejected, promoted = result
+    return MatchRejection(
+        rejected=MatchResponse.model_validate(rejected),
+        promoted=MatchResponse.model_validate(promoted) if promoted else None,
+    )
@@ -4,7 +4,7 @@ from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
 from app.services.tenant_service import TenantService
-from app.schemas.tenant import TenantCreate, TenantResponse
+from app.schemas.tenant import TenantCreate, TenantUpdate, TenantResponse
 
 router = APIRouter(prefix="/tenants", tags=["tenants"])
 
@@ -12,7 +12,21 @@ router = APIRouter(prefix="/tenants", tags=["tenants"])
 @router.post("", response_model=TenantResponse, status_code=201)
 def create_tenant(tenant: TenantCreate, db: Session = Depends(get_db)):
     """Create a new tenant."""
-    return TenantService.create_tenant(db, tenant.name)
+    return TenantService.create_tenant(
+        db, tenant.name, auto_confirm_threshold=tenant.auto_confirm_threshold
+    )
+
+
+@router.patch("/{tenant_id}", response_model=TenantResponse)
+def update_tenant(tenant_id: int, changes: TenantUpdate, db: Session = Depends(get_db)):
+    """Update a tenant's name or auto-confirm threshold (null disables it)."""
+    values = changes.model_dump(exclude_unset=True)
+    if values.get("name", "") is None:
+        raise HTTPException(status_code=422, detail="name cannot be null")
+    tenant = TenantService.update_tenant(db, tenant_id, values)
+    if not tenant:
+        raise HTTPException(status_code=404, detail=f"Tenant {tenant_id} not found")
+    return tenant
 
 
 @router.get("", response_model=List[TenantResponse])
@@ -1,42 +1,205 @@
 """Bank transaction REST endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, File, HTTPException, Header, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Iterator, List, Literal, Optional, Union
+import anyio
 from app.database import get_db
 from app.services.transaction_service import TransactionService
-from app.schemas.transaction import TransactionImport, TransactionResponse
+from app.services.statement_parsers import PARSERS, detect_format
+from app.schemas.transaction import (
+    StatementImportReport,
+    TransactionCreate,
+    TransactionImport,
+    TransactionResponse,
+    TransactionStreamReport,
+    TransactionUpsertReport,
+)
 
 router = APIRouter(
     prefix="/tenants/{tenant_id}/bank-transactions", tags=["bank-transactions"]
 )
 
 
-@router.post("/import", response_model=List[TransactionResponse], status_code=201)
-def import_transactions(
+# Media type of imports with one transaction per line
+NDJSON = "application/x-ndjson"
+
+# Longest NDJSON line accepted, so one line cannot exhaust memory
+NDJSON_MAX_LINE_BYTES = 1024 * 1024
+
+
+def _ndjson_transactions(request: Request) -> Iterator[TransactionCreate]:
+    """
+    Parse and validate an NDJSON request body one line at a time as it
+    arrives. Runs in a worker thread, pulling body chunks from the event loop.
+    """
+    chunks = request.stream()
+
+    async def next_chunk() -> Optional[bytes]:
+        try:
+            return await chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def parse(line: bytes, number: int) -> TransactionCreate:
+        try:
+            return TransactionCreate.model_validate_json(line)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", number, *error["loc"])} for error in e.errors()]
+            )
+
+    pending = b""
+    number = 0
+    while True:
+        chunk = anyio.from_thread.run(next_chunk)
+        if chunk is None:
+            break
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield parse(line, number)
+        if len(pending) > NDJSON_MAX_LINE_BYTES:
+            raise RequestValidationError(
+                [
+                    {
+                        "type": "too_long",
+                        "loc": ("body", number + 1),
+                        "msg": f"Line longer than {NDJSON_MAX_LINE_BYTES} bytes",
+                        "input": None,
+                    }
+                ]
+            )
+    if pending.strip():
+        yield parse(pending, number + 1)
+
+
+@router.post(
+    "/import",
+    response_model=Union[
+        List[TransactionResponse], TransactionStreamReport, TransactionUpsertReport
+    ],
+    status_code=201,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "transactions": {
+                                "type": "array",
+                                "items": TransactionCreate.model_json_schema(),
+                            }
+                        },
+                        "required": ["transactions"],
+                    }
+                },
+                NDJSON: {"schema": TransactionCreate.model_json_schema()},
+            },
+        }
+    },
+)
+async def import_transactions(
     tenant_id: int,
-    transaction_import: TransactionImport,
+    request: Request,
+    on_conflict: Optional[Literal["skip", "update"]] = Query(None),
     idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
 ):
-    """Import bank transactions in bulk with idempotency support."""
+    """
+    Import bank transactions in bulk with idempotency support.
+    With Content-Type application/x-ndjson the body is one transaction per
+    line, parsed and inserted in chunks as it arrives, and a report is
+    returned instead of the transactions. Both forms of the same
+    transactions hash alike for the Idempotency-Key.
+    With on_conflict, external ids the tenant already has are skipped or
+    updated rather than failing with 409, and a report of rows inserted,
+    updated and skipped is returned.
+    """
     try:
-        transactions_data = [
-            {
-                "external_id": tx.external_id,
-                "posted_at": tx.posted_at.isoformat() if tx.posted_at else None,
-                "amount": float(tx.amount),
-                "currency": tx.currency,
-                "description": tx.description,
-            }
-            for tx in transaction_import.transactions
-        ]
-
-        imported, is_duplicate = TransactionService.import_transactions(
-            db, tenant_id, transactions_data, idempotency_key
+        ndjson = request.headers.get("content-type", "").split(";")[0].strip() == NDJSON
+        if on_conflict and ndjson:
+            report, is_duplicate = await run_in_threadpool(
+                TransactionService.upsert_transactions,
+                db,
+                tenant_id,
+                _ndjson_transactions(request),
+                on_conflict,
+                idempotency_key,
+            )
+            return TransactionUpsertReport(duplicate=is_duplicate, **report)
+        if ndjson:
+            report, is_duplicate = await run_in_threadpool(
+                TransactionService.import_transaction_stream,
+                db,
+                tenant_id,
+                _ndjson_transactions(request),
+                idempotency_key,
+            )
+            return TransactionStreamReport(duplicate=is_duplicate, **report)
+
+        try:
+            transaction_import = TransactionImport.model_validate_json(await request.body())
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors()]
+            )
+        if on_conflict:
+            report, is_duplicate = await run_in_threadpool(
+                TransactionService.upsert_transactions,
+                db,
+                tenant_id,
+                transaction_import.transactions,
+                on_conflict,
+                idempotency_key,
+            )
+            return TransactionUpsertReport(duplicate=is_duplicate, **report)
+
+        imported, is_duplicate = await run_in_threadpool(
+            TransactionService.import_transaction_models,
+            db,
+            tenant_id,
+            transaction_import.transactions,
+            idempotency_key,
         )
 
         return imported
     except ValueError as e:
-        if "already used with different payload" in str(e):
+        if "already used with different payload" in str(e) or "already imported" in str(e):
+            raise HTTPException(status_code=409, detail=str(e))
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/import/statement", response_model=StatementImportReport, status_code=201)
+def import_statement(
+    tenant_id: int,
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ofx"]] = Query(None),
+    on_conflict: Optional[Literal["skip", "update"]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Import a CSV or OFX/QFX bank statement upload, parsed and committed in
+    chunks as it is read. The format defaults to the file extension. With
+    on_conflict, external ids the tenant already has are skipped or updated.
+    """
+    statement_format = format or detect_format(file.filename)
+    if statement_format is None:
+        raise HTTPException(
+            status_code=422,
+            detail="Unknown statement format; use a .csv, .ofx or .qfx file or the format parameter",
+        )
+    try:
+        report = TransactionService.import_statement(
+            db, tenant_id, PARSERS[statement_format](file.file), on_conflict=on_conflict
+        )
+    except ValueError as e:
+        if "already imported" in str(e):
             raise HTTPException(status_code=409, detail=str(e))
         raise HTTPException(status_code=404, detail=str(e))
+    return StatementImportReport(format=statement_format, **report)
@@ -7,14 +7,21 @@ from app.services.tenant_service import TenantService
 from app.services.invoice_service import InvoiceService
 from app.services.transaction_service import TransactionService
 from app.services.reconciliation_service import ReconciliationService
+from app.services.reconciliation_job_service import ReconciliationJobService
 from app.services.ai_service import AIService
 from app.models.invoice import InvoiceStatus
 from app.models.match import MatchStatus
+from app.schemas.transaction import TransactionCreate
 from app.graphql.types import (
     Tenant,
     Invoice,
     BankTransaction,
+    TransactionUpsertReport,
     Match,
+    MatchRejection,
+    MatchBatchOutcome,
+    MatchBatchResult,
+    ReconciliationJob,
     TenantInput,
     InvoiceInput,
     TransactionImportInput,
@@ -33,6 +40,53 @@ def get_db_session() -> Session:
 ai_service = AIService()
 
 
+def to_match(match) -> Match:
+    """Convert a match model to its GraphQL type."""
+    return Match(
+        id=match.id,
+        tenant_id=match.tenant_id,
+        invoice_id=match.invoice_id,
+        bank_transaction_id=match.bank_transaction_id,
+        score=match.score,
+        status=match.status.value,
+        created_at=match.created_at,
+    )
+
+
+def to_transaction_models(input: TransactionImportInput) -> List[TransactionCreate]:
+    """Convert imported transaction inputs to the models the service takes."""
+    return [
+        TransactionCreate(
+            external_id=tx.external_id,
+            posted_at=tx.posted_at,
+            amount=tx.amount,
+            currency=tx.currency,
+            description=tx.description,
+        )
+        for tx in input.transactions
+    ]
+
+
+def to_reconciliation_job(job) -> ReconciliationJob:
+    """Convert a reconciliation job model to its GraphQL type."""
+    return ReconciliationJob(
+        id=job.id,
+        tenant_id=job.tenant_id,
+        status=job.status.value,
+        assignment=job.assignment,
+        full=job.full,
+        invoices_total=job.invoices_total,
+        invoices_scored=job.invoices_scored,
+        match_count=job.match_count,
+        match_ids=job.match_ids,
+        error=job.error,
+        duration_seconds=job.duration_seconds,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
 @strawberry.type
 class Query:
     """GraphQL queries."""
@@ -47,6 +101,7 @@ class Query:
                 Tenant(
                     id=t.id,
                     name=t.name,
+                    auto_confirm_threshold=t.auto_confirm_threshold,
                     created_at=t.created_at,
                 )
                 for t in tenants
@@ -145,6 +200,16 @@ class Query:
         finally:
             db.close()
 
+    @strawberry.field
+    def reconcile_job(self, tenant_id: int, job_id: int) -> Optional[ReconciliationJob]:
+        """Get the status of a reconciliation job."""
+        db = get_db_session()
+        try:
+            job = ReconciliationJobService.get_job(db, tenant_id, job_id)
+            return to_reconciliation_job(job) if job else None
+        finally:
+            db.close()
+
     @strawberry.field
     def explain_reconciliation(
         self, tenant_id: int, invoice_id: int, transaction_id: int
@@ -158,7 +223,9 @@ class Query:
             if not invoice or not transaction:
                 raise ValueError("Invoice or transaction not found")
 
-            score = float(ReconciliationService.calculate_match_score(invoice, transaction))
+            score = float(
+                ReconciliationService.calculate_match_score(invoice, transaction, db)
+            )
             explanation = ai_service.explain_match(invoice, transaction, score)
 
             return ExplainResponse(explanation=explanation)
@@ -175,10 +242,13 @@ class Mutation:
         """Create a new tenant."""
         db = get_db_session()
         try:
-            tenant = TenantService.create_tenant(db, input.name)
+            tenant = TenantService.create_tenant(
+                db, input.name, auto_confirm_threshold=input.auto_confirm_threshold
+            )
             return Tenant(
                 id=tenant.id,
                 name=tenant.name,
+                auto_confirm_threshold=tenant.auto_confirm_threshold,
                 created_at=tenant.created_at,
             )
         finally:
@@ -238,19 +308,8 @@ class Mutation:
         """Import bank transactions."""
         db = get_db_session()
         try:
-            transactions_data = [
-                {
-                    "external_id": tx.external_id,
-                    "posted_at": tx.posted_at.isoformat() if tx.posted_at else None,
-                    "amount": float(tx.amount),
-                    "currency": tx.currency,
-                    "description": tx.description,
-                }
-                for tx in input.transactions
-            ]
-
-            imported, _ = TransactionService.import_transactions(
-                db, tenant_id, transactions_data, idempotency_key
+            imported, _ = TransactionService.import_transaction_models(
+                db, tenant_id, to_transaction_models(input), idempotency_key
             )
 
             return [
@@ -272,11 +331,33 @@ class Mutation:
             db.close()
 
     @strawberry.mutation
-    def reconcile(self, tenant_id: int) -> List[Match]:
+    def upsert_bank_transactions(
+        self,
+        tenant_id: int,
+        input: TransactionImportInput,
+        on_conflict: str = "skip",
+        idempotency_key: Optional[str] = None,
+    ) -> TransactionUpsertReport:
+        """Import bank transactions, skipping or updating known external ids."""
+        db = get_db_session()
+        try:
+            report, is_duplicate = TransactionService.upsert_transactions(
+                db, tenant_id, to_transaction_models(input), on_conflict, idempotency_key
+            )
+            return TransactionUpsertReport(duplicate=is_duplicate, **report)
+        finally:
+            db.close()
+
+    @strawberry.mutation
+    def reconcile(
+        self, tenant_id: int, assignment: Optional[str] = None, full: bool = False
+    ) -> List[Match]:
         """Run reconciliation."""
         db = get_db_session()
         try:
-            matches = ReconciliationService.reconcile(db, tenant_id)
+            matches = ReconciliationService.reconcile(
+                db, tenant_id, assignment=assignment, full=full
+            )
             return [
                 Match(
                     id=m.id,
@@ -294,6 +375,20 @@ class Mutation:
         finally:
             db.close()
 
+    @strawberry.mutation
+    def submit_reconcile_job(
+        self, tenant_id: int, assignment: Optional[str] = None, full: bool = False
+    ) -> ReconciliationJob:
+        """Queue reconciliation as a background job."""
+        db = get_db_session()
+        try:
+            job = ReconciliationJobService.submit_job(
+                db, tenant_id, assignment=assignment, full=full
+            )
+            return to_reconciliation_job(job)
+        finally:
+            db.close()
+
     @strawberry.mutation
     def confirm_match(self, tenant_id: int, match_id: int) -> Match:
         """Confirm a match."""
@@ -314,5 +409,47 @@ class Mutation:
         finally:
             db.close()
 
+    @strawberry.mutation
+    def reject_match(self, tenant_id: int, match_id: int) -> MatchRejection:
+        """Reject a match and promote the invoice's next ranked candidate."""
+        db = get_db_session()
+        try:
+            result = ReconciliationService.reject_match(db, tenant_id, match_id)
+            if not result:
+                raise ValueError("Match not found or not proposed")
+            rejected, promoted = result
+            return MatchRejection(
+                rejected=to_match(rejected),
+                promoted=to_match(promoted) if promoted else None,
+            )
+        finally:
+            db.close()
+
+    @strawberry.mutation
+    def review_matches(
+        self,
+        tenant_id: int,
+        confirm: Optional[List[int]] = None,
+        reject: Optional[List[int]] = None,
+    ) -> MatchBatchResult:
+        """Confirm and reject matches in one transaction."""
+        db = get_db_session()
+        try:
+            if not TenantService.get_tenant(db, tenant_id):
+                raise ValueError(f"Tenant {tenant_id} not found")
+            review = ReconciliationService.review_matches(
+                db, tenant_id, confirm or [], reject or []
+            )
+            return MatchBatchResult(
+                results=[
+                    MatchBatchOutcome(match_id=match_id, action=action, outcome=outcome)
+                    for match_id, action, outcome in review.outcomes
+                ],
+                auto_rejected=review.auto_rejected,
+                promoted=[to_match(m) for m in review.promoted],
+            )
+        finally:
+            db.close()
+
 
 schema = strawberry.Schema(query=Query, mutation=Mutation)
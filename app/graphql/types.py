@@ -12,6 +12,7 @@ class Tenant:
     """Tenant GraphQL type."""
     id: int
     name: str
+    auto_confirm_threshold: Optional[Decimal]
     created_at: datetime
 
 
@@ -52,6 +53,15 @@ class BankTransaction:
     created_at: datetime
 
 
+@strawberry.type
+class TransactionUpsertReport:
+    """Rows an upsert import inserted, updated and skipped."""
+    inserted: int
+    updated: int
+    skipped: int
+    duplicate: bool
+
+
 @strawberry.type
 class Match:
     """Match GraphQL type."""
@@ -64,10 +74,53 @@ class Match:
     created_at: datetime
 
 
+@strawberry.type
+class MatchRejection:
+    """Rejected match and the candidate promoted in its place."""
+    rejected: Match
+    promoted: Optional[Match]
+
+
+@strawberry.type
+class MatchBatchOutcome:
+    """Outcome of one match id of a batch review."""
+    match_id: int
+    action: str  # confirm or reject
+    outcome: str  # confirmed, rejected, not_found, not_proposed or conflict
+
+
+@strawberry.type
+class MatchBatchResult:
+    """Outcomes of a batch review, plus the matches it rejected or promoted."""
+    results: List[MatchBatchOutcome]
+    auto_rejected: List[int]
+    promoted: List[Match]
+
+
+@strawberry.type
+class ReconciliationJob:
+    """Reconciliation job GraphQL type."""
+    id: int
+    tenant_id: int
+    status: str  # JobStatus as string
+    assignment: Optional[str]
+    full: bool
+    invoices_total: Optional[int]
+    invoices_scored: int
+    match_count: Optional[int]
+    match_ids: List[int]
+    error: Optional[str]
+    duration_seconds: Optional[float]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+
 @strawberry.input
 class TenantInput:
     """Input for creating a tenant."""
     name: str
+    auto_confirm_threshold: Optional[Decimal] = None
 
 
 @strawberry.input
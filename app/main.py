@@ -1,17 +1,38 @@
 """Main FastAPI application."""
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from sqlalchemy.orm import Session
 from strawberry.fastapi import GraphQLRouter
-from app.api import tenants, invoices, transactions, reconciliation
+from app.api import tenants, invoices, transactions, reconciliation, admin
 from app.graphql.schema import schema
 from app.database import Base, engine
+from app.schema_upgrades import upgrade_schema
+from app.services.idempotency_store import idempotency_store
+from app.services.reconciliation_job_service import ReconciliationJobService
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Fail the jobs an earlier process left unfinished, and run the expired
+    idempotency key sweeper while the app is up.
+    """
+    with Session(bind=engine) as db:
+        ReconciliationJobService.fail_orphaned_jobs(db)
+    idempotency_store.start_sweeper(engine)
+    yield
+    idempotency_store.stop_sweeper()
+
 
 app = FastAPI(
     title="Invoice Reconciliation API",
     description="Multi-Tenant Invoice Reconciliation API with REST and GraphQL",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Include REST routers
@@ -19,6 +40,7 @@ app.include_router(tenants.router)
 app.include_router(invoices.router)
 app.include_router(transactions.router)
 app.include_router(reconciliation.router)
+app.include_router(admin.router)
 
 # Include GraphQL router
 graphql_app = GraphQLRouter(schema)
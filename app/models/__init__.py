@@ -1,15 +1,25 @@
 from .tenant import Tenant
 from .vendor import Vendor
+from .vendor_alias import VendorAlias
 from .invoice import Invoice
 from .bank_transaction import BankTransaction
 from .match import Match
 from .idempotency import IdempotencyKey
+from .reconciliation_watermark import ReconciliationWatermark
+from .reconciliation_job import ReconciliationJob
+from .pair_score import PairScore
+from .ranked_candidate import RankedCandidate
 
 __all__ = [
     "Tenant",
     "Vendor",
+    "VendorAlias",
     "Invoice",
     "BankTransaction",
     "Match",
     "IdempotencyKey",
+    "ReconciliationWatermark",
+    "ReconciliationJob",
+    "PairScore",
+    "RankedCandidate",
 ]
@@ -1,23 +1,52 @@
 """Bank transaction model."""
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Numeric, Index, event
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates, object_session
 from app.database import Base
+from app.money import to_cents
 
 
 class BankTransaction(Base):
     """Bank transaction model."""
     __tablename__ = "bank_transactions"
+    __table_args__ = (
+        Index("ix_bank_transactions_tenant_amount_cents", "tenant_id", "amount_cents"),
+        Index("ix_bank_transactions_tenant_posted_at", "tenant_id", "posted_at"),
+        # A tenant's external ids are unique; transactions without one are not checked
+        Index(
+            "ux_bank_transactions_tenant_external_id",
+            "tenant_id",
+            "external_id",
+            unique=True,
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False, index=True)
     external_id = Column(String, nullable=True, index=True)
     posted_at = Column(DateTime(timezone=True), nullable=False, index=True)
     amount = Column(Numeric(10, 2), nullable=False)
+    # Integer copy of amount in cents, kept in sync by _sync_amount_cents
+    amount_cents = Column(BigInteger, nullable=False)
     currency = Column(String, default="USD", nullable=False)
     description = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Bumped on every update; caches key on (id, version)
+    version = Column(Integer, default=1, nullable=False)
 
     # Relationships
     tenant = relationship("Tenant", backref="bank_transactions")
     matches = relationship("Match", back_populates="bank_transaction")
+
+    @validates("amount")
+    def _sync_amount_cents(self, key, amount):
+        """Keep amount_cents in step with amount."""
+        self.amount_cents = to_cents(amount) if amount is not None else None
+        return amount
+
+
+@event.listens_for(BankTransaction, "before_update")
+def _bump_version(mapper, connection, target):
+    """Increment the version of a transaction with changed columns."""
+    if object_session(target).is_modified(target, include_collections=False):
+        target.version = (target.version or 1) + 1
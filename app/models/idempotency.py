@@ -1,24 +1,114 @@
 """Idempotency key model."""
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
 from sqlalchemy.sql import func
 from app.database import Base
+from datetime import timezone
+from decimal import Decimal
+from typing import Optional, Union
 import hashlib
 import json
 
+# Prefix of payload hashes over the canonical transaction encoding; hashes
+# without it were stored by LegacyTransactionHash
+CANONICAL_HASH_PREFIX = "v2:"
+
 
 class IdempotencyKey(Base):
     """Idempotency key model for tracking idempotent requests."""
     __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # Keys are scoped to their tenant
+        Index("ux_idempotency_keys_tenant_key", "tenant_id", "key", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    key = Column(String, unique=True, nullable=False, index=True)
+    key = Column(String, nullable=False)
     tenant_id = Column(Integer, nullable=False, index=True)
     payload_hash = Column(String, nullable=False)  # Hash of the request payload
     response_data = Column(Text, nullable=True)  # JSON string of response
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Keys expire IDEMPOTENCY_TTL_SECONDS after this; the sweeper scans it
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
+    )
 
     @staticmethod
     def hash_payload(payload: dict) -> str:
         """Generate a hash of the payload for comparison."""
         payload_str = json.dumps(payload, sort_keys=True)
         return hashlib.sha256(payload_str.encode()).hexdigest()
+
+
+class TransactionHash:
+    """
+    Canonical payload hash of imported transactions (TransactionCreate or
+    anything with its fields), computed one at a time so a stream hashes
+    like the same list. Each transaction is encoded as a compact JSON array
+    of its fields in a fixed order, with the exact amount as a plain decimal
+    string and aware dates in UTC, so equal values hash alike however the
+    request spelt them.
+    """
+
+    def __init__(self):
+        self._hash = hashlib.sha256()
+
+    def update(self, tx) -> None:
+        """Add the next transaction."""
+        posted_at = tx.posted_at
+        if posted_at.tzinfo is not None:
+            posted_at = posted_at.astimezone(timezone.utc)
+        # 100, 100.0 and 100.00 are the same amount; so are 0 and -0.00
+        amount = tx.amount.normalize() if tx.amount else Decimal(0)
+        fields = [
+            tx.external_id,
+            posted_at.isoformat(),
+            format(amount, "f"),
+            tx.currency,
+            tx.description,
+        ]
+        self._hash.update(json.dumps(fields, ensure_ascii=False, separators=(",", ":")).encode())
+        self._hash.update(b"\n")
+
+    def hexdigest(self) -> str:
+        """Hash of the transactions added so far."""
+        return CANONICAL_HASH_PREFIX + self._hash.hexdigest()
+
+
+class LegacyTransactionHash:
+    """
+    IdempotencyKey.hash_payload of the float-converted transaction dicts
+    imports hashed before TransactionHash, computed one at a time, so keys
+    stored back then still replay.
+    """
+
+    def __init__(self):
+        self._hash = hashlib.sha256(b"[")
+        self._empty = True
+
+    def update(self, tx) -> None:
+        """Add the next transaction."""
+        item = {
+            "external_id": tx.external_id,
+            "posted_at": tx.posted_at.isoformat(),
+            "amount": float(tx.amount),
+            "currency": tx.currency,
+            "description": tx.description,
+        }
+        if not self._empty:
+            self._hash.update(b", ")
+        self._hash.update(json.dumps(item, sort_keys=True).encode())
+        self._empty = False
+
+    def hexdigest(self) -> str:
+        """Hash of the transactions added so far, as a list."""
+        digest = self._hash.copy()
+        digest.update(b"]")
+        return digest.hexdigest()
+
+
+def transaction_hash(
+    stored_hash: Optional[str] = None,
+) -> Union[TransactionHash, LegacyTransactionHash]:
+    """The hasher to compare transactions with stored_hash, canonical by default."""
+    if stored_hash is not None and not stored_hash.startswith(CANONICAL_HASH_PREFIX):
+        return LegacyTransactionHash()
+    return TransactionHash()
@@ -1,9 +1,10 @@
 """Invoice model."""
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Numeric, Enum, Index, event
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates, object_session
 import enum
 from app.database import Base
+from app.money import to_cents
 
 
 class InvoiceStatus(str, enum.Enum):
@@ -16,19 +17,40 @@ class InvoiceStatus(str, enum.Enum):
 class Invoice(Base):
     """Invoice model."""
     __tablename__ = "invoices"
+    __table_args__ = (
+        Index("ix_invoices_tenant_amount_cents", "tenant_id", "amount_cents"),
+        Index("ix_invoices_tenant_invoice_date", "tenant_id", "invoice_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False, index=True)
     vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=True, index=True)
     invoice_number = Column(String, nullable=True, index=True)
     amount = Column(Numeric(10, 2), nullable=False)
+    # Integer copy of amount in cents, kept in sync by _sync_amount_cents
+    amount_cents = Column(BigInteger, nullable=False)
     currency = Column(String, default="USD", nullable=False)
     invoice_date = Column(DateTime(timezone=True), nullable=True)
     description = Column(String, nullable=True)
     status = Column(Enum(InvoiceStatus), default=InvoiceStatus.OPEN, nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Bumped on every update; caches key on (id, version)
+    version = Column(Integer, default=1, nullable=False)
 
     # Relationships
     tenant = relationship("Tenant", backref="invoices")
     vendor = relationship("Vendor", back_populates="invoices")
     matches = relationship("Match", back_populates="invoice")
+
+    @validates("amount")
+    def _sync_amount_cents(self, key, amount):
+        """Keep amount_cents in step with amount."""
+        self.amount_cents = to_cents(amount) if amount is not None else None
+        return amount
+
+
+@event.listens_for(Invoice, "before_update")
+def _bump_version(mapper, connection, target):
+    """Increment the version of an invoice with changed columns."""
+    if object_session(target).is_modified(target, include_collections=False):
+        target.version = (target.version or 1) + 1
@@ -0,0 +1,31 @@
+"""Pair score cache model."""
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class PairScore(Base):
+    """Persisted match score of an invoice/transaction pair at given record versions."""
+    __tablename__ = "pair_scores"
+    __table_args__ = (
+        Index(
+            "ix_pair_scores_key",
+            "invoice_id",
+            "invoice_version",
+            "bank_transaction_id",
+            "transaction_version",
+            "scorer",
+            unique=True,
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, nullable=False, index=True)
+    # Plain ids: rows are deleted with their records, never joined
+    invoice_id = Column(Integer, nullable=False)
+    invoice_version = Column(Integer, nullable=False)
+    bank_transaction_id = Column(Integer, nullable=False, index=True)
+    transaction_version = Column(Integer, nullable=False)
+    scorer = Column(String, nullable=False)  # scoring rules fingerprint
+    score = Column(String, nullable=False)  # exact Decimal text, unrounded
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,23 @@
+"""Ranked candidate model."""
+from sqlalchemy import Column, Integer, DateTime, Numeric, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class RankedCandidate(Base):
+    """
+    One of an invoice's top-K scored transactions, kept by reconcile so a
+    rejected proposal can be replaced by the runner-up without rescoring.
+    """
+    __tablename__ = "ranked_candidates"
+    __table_args__ = (
+        Index("ix_ranked_candidates_invoice", "tenant_id", "invoice_id", "score"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, nullable=False, index=True)
+    # Plain ids: rows are deleted with their invoice, never joined
+    invoice_id = Column(Integer, nullable=False)
+    bank_transaction_id = Column(Integer, nullable=False)
+    score = Column(Numeric(5, 2), nullable=False)  # 0.00 to 100.00
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,43 @@
+"""Reconciliation job model."""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Enum, Float, Text
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+import enum
+import json
+from app.database import Base
+
+
+class JobStatus(str, enum.Enum):
+    """Reconciliation job status enumeration."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class ReconciliationJob(Base):
+    """Background reconciliation run submitted for a tenant."""
+    __tablename__ = "reconciliation_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False, index=True)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False, index=True)
+    assignment = Column(String, nullable=True)
+    full = Column(Boolean, default=False, nullable=False)
+    invoices_total = Column(Integer, nullable=True)
+    invoices_scored = Column(Integer, default=0, nullable=False)
+    match_count = Column(Integer, nullable=True)
+    result_match_ids = Column(Text, nullable=True)  # JSON list of created match ids
+    error = Column(Text, nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Relationships
+    tenant = relationship("Tenant", backref="reconciliation_jobs")
+
+    @property
+    def match_ids(self) -> list:
+        """Ids of the matches created by the job."""
+        return json.loads(self.result_match_ids) if self.result_match_ids else []
@@ -0,0 +1,17 @@
+"""Reconciliation watermark model."""
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class ReconciliationWatermark(Base):
+    """Highest invoice and transaction ids a tenant's reconciliation has processed."""
+    __tablename__ = "reconciliation_watermarks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False, unique=True, index=True)
+    last_invoice_id = Column(Integer, nullable=False, default=0)
+    last_transaction_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
@@ -1,5 +1,5 @@
 """Tenant model."""
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Numeric
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -10,4 +10,7 @@ class Tenant(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
+    # Reconcile confirms new proposals scoring at least this much with an
+    # exact amount; None leaves every proposal for review
+    auto_confirm_threshold = Column(Numeric(5, 2), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,8 @@
+"""Money amount helpers."""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Union
+
+
+def to_cents(amount: Union[Decimal, float, int, str], rounding: str = ROUND_HALF_UP) -> int:
+    """Convert an amount to integer minor units (cents)."""
+    return int((Decimal(str(amount)) * 100).to_integral_value(rounding=rounding))
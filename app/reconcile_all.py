@@ -0,0 +1,52 @@
+"""Reconcile every tenant (or selected tenants) in one batch.
+
+Usage: python -m app.reconcile_all [--tenant ID ...] [--workers N]
+       [--time-limit SECONDS] [--assignment best|one_to_one] [--full]
+       [--report PATH]
+"""
+import argparse
+import json
+import sys
+from app.database import SessionLocal
+from app.services.batch_reconciliation_service import BatchReconciliationService
+
+
+def main(argv=None) -> int:
+    """Run the batch and write its JSON report; exit non-zero if any tenant failed."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--tenant", type=int, action="append", dest="tenant_ids", metavar="ID",
+        help="Tenant id to reconcile (repeatable; default: all tenants)",
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Tenants reconciled concurrently (RECONCILE_ALL_WORKERS)"
+    )
+    parser.add_argument(
+        "--time-limit", type=float,
+        help="Seconds per tenant before its run is abandoned, 0 for none (RECONCILE_TENANT_TIME_LIMIT)",
+    )
+    parser.add_argument("--assignment", choices=["best", "one_to_one"])
+    parser.add_argument("--full", action="store_true", help="Ignore the incremental watermarks")
+    parser.add_argument("--report", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = BatchReconciliationService.reconcile_tenants(
+        SessionLocal,
+        tenant_ids=args.tenant_ids,
+        workers=args.workers,
+        time_limit=args.time_limit,
+        assignment=args.assignment,
+        full=args.full,
+    )
+
+    output = json.dumps(report, indent=2, default=lambda value: value.isoformat())
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 1 if report["failed"] or report["timed_out"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""In-place upgrades for databases created by an earlier version of the models.
+
+Base.metadata.create_all creates missing tables but never alters existing
+ones, so columns added to existing tables are added and backfilled here.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from typing import Optional
+import logging
+from app.models.invoice import Invoice
+from app.models.bank_transaction import BankTransaction
+from app.models.tenant import Tenant
+from app.models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """Apply every upgrade; each one is skipped when already applied."""
+    # First: the others create every index of their tables, this one included
+    _add_external_id_unique(engine)
+    _add_amount_cents(engine)
+    _add_versions(engine)
+    _add_date_indexes(engine)
+    _add_auto_confirm_threshold(engine)
+    _scope_idempotency_keys(engine)
+
+
+def _add_column(
+    engine: Engine, model, name: str, ddl: str, backfill: Optional[str] = None
+) -> None:
+    """Add a column (and backfill it) unless the table already has it."""
+    table = model.__table__
+    columns = {column["name"] for column in inspect(engine).get_columns(table.name)}
+    if name in columns:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {ddl}"))
+        if backfill:
+            conn.execute(text(f"UPDATE {table.name} SET {name} = {backfill}"))
+
+
+def _add_amount_cents(engine: Engine) -> None:
+    """Add the integer cents columns of invoices and bank transactions."""
+    for model in (Invoice, BankTransaction):
+        # ROUND rounds halves away from zero, like to_cents
+        _add_column(
+            engine,
+            model,
+            "amount_cents",
+            "BIGINT NOT NULL DEFAULT 0",
+            backfill="CAST(ROUND(amount * 100) AS BIGINT)",
+        )
+        for index in model.__table__.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def _add_versions(engine: Engine) -> None:
+    """Add the record versions score caches are keyed on."""
+    for model in (Invoice, BankTransaction):
+        _add_column(engine, model, "version", "INTEGER NOT NULL DEFAULT 1")
+
+
+def _add_date_indexes(engine: Engine) -> None:
+    """Add the (tenant, date) indexes the date-window join reads in order."""
+    for model in (Invoice, BankTransaction):
+        for index in model.__table__.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def _add_auto_confirm_threshold(engine: Engine) -> None:
+    """Add the per-tenant auto-confirm threshold, unset for existing tenants."""
+    _add_column(engine, Tenant, "auto_confirm_threshold", "NUMERIC(5, 2)")
+
+
+def _add_external_id_unique(engine: Engine) -> None:
+    """
+    Add the unique (tenant, external id) index. Transactions imported twice
+    before it existed keep their rows and matches, but all but the first
+    lose the external id they share.
+    """
+    table = BankTransaction.__table__
+    name = "ux_bank_transactions_tenant_external_id"
+    if name in {index["name"] for index in inspect(engine).get_indexes(table.name)}:
+        return
+    with engine.begin() as conn:
+        cleared = conn.execute(
+            text(
+                f"UPDATE {table.name} SET external_id = NULL "
+                f"WHERE external_id IS NOT NULL AND id NOT IN ("
+                f"SELECT MIN(id) FROM {table.name} WHERE external_id IS NOT NULL "
+                f"GROUP BY tenant_id, external_id)"
+            )
+        ).rowcount
+        if cleared:
+            logger.warning("Cleared %d duplicate bank transaction external ids", cleared)
+    for index in table.indexes:
+        if index.name == name:
+            index.create(engine)
+
+
+def _scope_idempotency_keys(engine: Engine) -> None:
+    """
+    Replace the globally unique key index with a unique (tenant, key) one,
+    and index created_at for the expiry sweeper.
+    """
+    table = IdempotencyKey.__table__
+    indexes = {index["name"] for index in inspect(engine).get_indexes(table.name)}
+    if "ix_idempotency_keys_key" in indexes:
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_idempotency_keys_key"))
+    for index in table.indexes:
+        index.create(engine, checkfirst=True)
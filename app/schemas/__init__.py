@@ -1,11 +1,38 @@
-from .tenant import TenantCreate, TenantResponse
+from .tenant import TenantCreate, TenantUpdate, TenantResponse
 from .invoice import InvoiceCreate, InvoiceResponse, InvoiceFilter
-from .transaction import TransactionCreate, TransactionResponse, TransactionImport
-from .match import MatchResponse, MatchConfirm
-from .reconciliation import ReconciliationResponse, ExplainResponse
+from .transaction import (
+    TransactionCreate,
+    TransactionResponse,
+    TransactionImport,
+    TransactionStreamReport,
+    TransactionUpsertReport,
+    StatementRowError,
+    StatementImportReport,
+    IdempotencyStoreStats,
+)
+from .match import (
+    MatchResponse,
+    MatchConfirm,
+    MatchRejection,
+    MatchBatch,
+    MatchBatchOutcome,
+    MatchBatchResult,
+)
+from .reconciliation import (
+    ReconciliationResponse,
+    ExplainResponse,
+    ReconciliationJobResponse,
+    TenantReconciliationResult,
+    BatchReconciliationReport,
+    ScoreCacheStats,
+    ReconcileStageMetrics,
+    ReconcileRunMetrics,
+    ReconcileMetricsSnapshot,
+)
 
 __all__ = [
     "TenantCreate",
+    "TenantUpdate",
     "TenantResponse",
     "InvoiceCreate",
     "InvoiceResponse",
@@ -13,8 +40,24 @@ __all__ = [
     "TransactionCreate",
     "TransactionResponse",
     "TransactionImport",
+    "TransactionStreamReport",
+    "TransactionUpsertReport",
+    "StatementRowError",
+    "StatementImportReport",
+    "IdempotencyStoreStats",
     "MatchResponse",
     "MatchConfirm",
+    "MatchRejection",
+    "MatchBatch",
+    "MatchBatchOutcome",
+    "MatchBatchResult",
     "ReconciliationResponse",
     "ExplainResponse",
+    "ReconciliationJobResponse",
+    "TenantReconciliationResult",
+    "BatchReconciliationReport",
+    "ScoreCacheStats",
+    "ReconcileStageMetrics",
+    "ReconcileRunMetrics",
+    "ReconcileMetricsSnapshot",
 ]
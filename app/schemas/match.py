@@ -2,6 +2,7 @@
 from pydantic import BaseModel
 from datetime import datetime
 from decimal import Decimal
+from typing import List, Literal, Optional
 from app.models.match import MatchStatus
 
 
@@ -22,3 +23,29 @@ class MatchResponse(BaseModel):
 class MatchConfirm(BaseModel):
     """Schema for confirming a match."""
     pass  # No additional fields needed
+
+
+class MatchRejection(BaseModel):
+    """Schema for a rejected match and the candidate promoted in its place."""
+    rejected: MatchResponse
+    promoted: Optional[MatchResponse]
+
+
+class MatchBatch(BaseModel):
+    """Schema for confirming and rejecting matches in one request."""
+    confirm: List[int] = []
+    reject: List[int] = []
+
+
+class MatchBatchOutcome(BaseModel):
+    """Schema for the outcome of one match id of a batch."""
+    match_id: int
+    action: Literal["confirm", "reject"]
+    outcome: Literal["confirmed", "rejected", "not_found", "not_proposed", "conflict"]
+
+
+class MatchBatchResult(BaseModel):
+    """Schema for batch confirm/reject result."""
+    results: List[MatchBatchOutcome]
+    auto_rejected: List[int]
+    promoted: List[MatchResponse]
@@ -1,14 +1,128 @@
 """Reconciliation schemas."""
 from pydantic import BaseModel
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional
 from app.schemas.match import MatchResponse
+from app.models.reconciliation_job import JobStatus
+
+
+class ReconcileStageMetrics(BaseModel):
+    """Schema for one stage of a measured reconcile run."""
+    name: str  # prepare, load_invoices, load_transactions, score or persist
+    seconds: float
+    rows: Optional[int]
+    statements: int
+
+
+class ReconcileRunMetrics(BaseModel):
+    """Schema for the measurements of one reconcile run."""
+    tenant_id: int
+    backend: str
+    assignment: str
+    full: bool
+    status: str  # succeeded, failed or abandoned
+    seconds: float
+    statements: int
+    invoices: int
+    transactions: int
+    pairs_scored: int
+    pairs_skipped: int
+    matches: int
+    auto_confirmed: int
+    stages: List[ReconcileStageMetrics]
 
 
 class ReconciliationResponse(BaseModel):
     """Schema for reconciliation response."""
     matches: List[MatchResponse]
+    metrics: Optional[ReconcileRunMetrics] = None
 
 
 class ExplainResponse(BaseModel):
     """Schema for explanation response."""
     explanation: str
+
+
+class ReconciliationJobResponse(BaseModel):
+    """Schema for reconciliation job response."""
+    id: int
+    tenant_id: int
+    status: JobStatus
+    assignment: Optional[str]
+    full: bool
+    invoices_total: Optional[int]
+    invoices_scored: int
+    match_count: Optional[int]
+    match_ids: List[int]
+    error: Optional[str]
+    duration_seconds: Optional[float]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class TenantReconciliationResult(BaseModel):
+    """Schema for one tenant's line of a batch reconciliation report."""
+    tenant_id: int
+    status: str  # succeeded, failed or timed_out
+    invoices_total: int
+    invoices_scored: int
+    match_count: int
+    duration_seconds: float
+    invoices_per_second: float
+    error: Optional[str]
+
+
+class BatchReconciliationReport(BaseModel):
+    """Schema for batch reconciliation report."""
+    started_at: datetime
+    finished_at: datetime
+    duration_seconds: float
+    workers: int
+    tenant_count: int
+    succeeded: int
+    failed: int
+    timed_out: int
+    match_count: int
+    invoices_scored: int
+    invoices_per_second: float
+    tenants: List[TenantReconciliationResult]
+
+
+class ScoreCacheStats(BaseModel):
+    """Schema for pair score cache statistics."""
+    size: int
+    max_size: int
+    persist: bool
+    hits: int
+    persistent_hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    invalidations: int
+
+
+class HistogramBucket(BaseModel):
+    """Schema for a cumulative histogram bucket."""
+    le: float
+    count: int
+
+
+class Histogram(BaseModel):
+    """Schema for a histogram of observed values."""
+    buckets: List[HistogramBucket]
+    sum: float
+    count: int
+
+
+class ReconcileMetricsSnapshot(BaseModel):
+    """Schema for the reconcile metrics aggregated over every run."""
+    runs: Dict[str, int]
+    run_seconds: Histogram
+    stage_seconds: Dict[str, Histogram]
+    statements: Histogram
+    pairs_scored: int
+    pairs_skipped: int
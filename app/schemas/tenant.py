@@ -1,18 +1,27 @@
 """Tenant schemas."""
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from decimal import Decimal
 from typing import Optional
 
 
 class TenantCreate(BaseModel):
     """Schema for creating a tenant."""
     name: str
+    auto_confirm_threshold: Optional[Decimal] = Field(None, ge=0, le=100)
+
+
+class TenantUpdate(BaseModel):
+    """Schema for updating a tenant; only the fields given are changed."""
+    name: Optional[str] = None
+    auto_confirm_threshold: Optional[Decimal] = Field(None, ge=0, le=100)
 
 
 class TenantResponse(BaseModel):
     """Schema for tenant response."""
     id: int
     name: str
+    auto_confirm_threshold: Optional[Decimal]
     created_at: datetime
 
     class Config:
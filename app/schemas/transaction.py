@@ -32,3 +32,50 @@ class TransactionResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class TransactionStreamReport(BaseModel):
+    """Schema for NDJSON import response."""
+    imported: int
+    first_id: Optional[int]
+    last_id: Optional[int]
+    duplicate: bool  # replayed from the Idempotency-Key
+
+
+class TransactionUpsertReport(BaseModel):
+    """Schema for upsert import response."""
+    inserted: int
+    updated: int
+    skipped: int  # external ids already imported, kept or unchanged
+    duplicate: bool  # replayed from the Idempotency-Key
+
+
+class StatementRowError(BaseModel):
+    """Schema for an invalid row of an uploaded statement."""
+    line: int
+    error: str
+
+
+class StatementImportReport(BaseModel):
+    """Schema for statement upload report."""
+    format: str  # csv or ofx
+    rows: int
+    imported: int
+    updated: int
+    skipped: int
+    failed: int
+    errors: List[StatementRowError]  # the first MAX_REPORTED_ERRORS only
+    duration_seconds: float
+    rows_per_second: float
+
+
+class IdempotencyStoreStats(BaseModel):
+    """Schema for idempotency key cache statistics."""
+    size: int
+    max_size: int
+    ttl_seconds: int
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    expired: int
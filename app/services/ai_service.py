@@ -4,6 +4,7 @@ from typing import Optional
 from openai import OpenAI
 from app.models.invoice import Invoice
 from app.models.bank_transaction import BankTransaction
+from app.services.similarity import get_similarity
 
 
 class AIService:
@@ -103,11 +104,11 @@ class AIService:
 
         # Text similarity
         if invoice.description and transaction.description:
-            from difflib import SequenceMatcher
-
-            similarity = SequenceMatcher(
-                None, invoice.description.lower(), transaction.description.lower()
-            ).ratio()
+            text_similarity = get_similarity()
+            similarity = text_similarity.ratio(
+                text_similarity.prepare(invoice.description),
+                text_similarity.prepare(transaction.description),
+            )
             if similarity > 0.5:
                 reasons.append("similar descriptions")
 
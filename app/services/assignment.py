@@ -0,0 +1,67 @@
+"""Assignment strategies that turn scored candidates into proposals."""
+from decimal import Decimal
+from typing import Iterable, Iterator, List, Tuple
+from app.models.invoice import Invoice
+from app.services.scoring_backends import ScoredInvoice
+
+# (invoice, transaction position, score) of a proposal
+Assignment = Tuple[Invoice, int, Decimal]
+
+
+def best_per_invoice(scored_invoices: Iterable[ScoredInvoice]) -> Iterator[Assignment]:
+    """
+    Pick each invoice's best candidate independently (ties go to the earliest
+    transaction). A transaction may be proposed for several invoices.
+    """
+    for invoice, scored in scored_invoices:
+        best = None
+        for position, score in scored:
+            if best is None or score > best[1]:
+                best = (position, score)
+        if best:
+            yield invoice, best[0], best[1]
+
+
+def one_to_one(scored_invoices: Iterable[ScoredInvoice]) -> List[Assignment]:
+    """
+    Assign candidates across all invoices at once so each invoice and each
+    transaction appears in at most one proposal.
+
+    Greedy pass over all candidate edges in priority order (highest score
+    first, then lowest invoice id, then earliest transaction, whatever order
+    the invoices come in); an edge is taken when neither its invoice nor its
+    transaction is taken yet. This runs in O(E log E) for E candidate edges.
+    """
+    invoices = []
+    edges = []
+    for invoice_position, (invoice, scored) in enumerate(scored_invoices):
+        invoices.append(invoice)
+        for position, score in scored:
+            edges.append((-score, invoice.id, invoice_position, position))
+    edges.sort()
+
+    assigned = {}
+    taken_transactions = set()
+    for negative_score, _, invoice_position, position in edges:
+        if invoice_position in assigned or position in taken_transactions:
+            continue
+        assigned[invoice_position] = (position, -negative_score)
+        taken_transactions.add(position)
+
+    return [
+        (invoices[invoice_position], position, score)
+        for invoice_position, (position, score) in sorted(assigned.items())
+    ]
+
+
+ASSIGNMENT_MODES = {
+    "best": best_per_invoice,
+    "one_to_one": one_to_one,
+}
+
+
+def get_assignment(name: str):
+    """Return the assignment strategy registered under name."""
+    if name not in ASSIGNMENT_MODES:
+        raise ValueError(f"Unknown assignment mode {name}")
+    return ASSIGNMENT_MODES[name]
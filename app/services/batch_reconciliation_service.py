@@ -0,0 +1,180 @@
+"""Multi-tenant batch reconciliation service."""
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import func, true
+from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import os
+import time
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.bank_transaction import BankTransaction
+from app.services.tenant_service import TenantService
+from app.services.reconciliation_service import ReconciliationService
+
+# Tenants reconciled concurrently by a batch run
+BATCH_WORKERS = int(os.getenv("RECONCILE_ALL_WORKERS", "4"))
+
+# Seconds one tenant's run may take before it is abandoned (0 = no limit)
+TENANT_TIME_LIMIT = float(os.getenv("RECONCILE_TENANT_TIME_LIMIT", "600"))
+
+# Tenants fetched per page when listing every tenant
+TENANT_PAGE_SIZE = 500
+
+
+class TenantTimeLimitExceeded(Exception):
+    """Raised inside a tenant's run once its time limit has passed."""
+
+
+class BatchReconciliationService:
+    """Service for reconciling many tenants in one batch."""
+
+    @staticmethod
+    def reconcile_tenants(
+        session_factory: sessionmaker,
+        tenant_ids: Optional[List[int]] = None,
+        workers: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        assignment: Optional[str] = None,
+        full: bool = False,
+    ) -> dict:
+        """
+        Reconcile the given tenants (all tenants by default) on a pool of
+        worker threads and return a summary report.
+        Tenants with the least pending work are started first, so small
+        tenants do not wait behind large ones. Each tenant runs in its own
+        session; a run that exceeds time_limit seconds is rolled back and
+        reported as timed out. The limit is only checked between invoices,
+        as each one's scoring is reported, so a run can overrun it by the
+        time of one invoice plus the final persist.
+        """
+        workers = workers or BATCH_WORKERS
+        time_limit = TENANT_TIME_LIMIT if time_limit is None else time_limit
+
+        db = session_factory()
+        try:
+            if tenant_ids is None:
+                tenant_ids = BatchReconciliationService._all_tenant_ids(db)
+            else:
+                tenant_ids = list(dict.fromkeys(tenant_ids))
+            pending = BatchReconciliationService._pending_work(db, tenant_ids)
+        finally:
+            db.close()
+
+        order = sorted(tenant_ids, key=lambda tenant_id: (pending.get(tenant_id, 0), tenant_id))
+
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reconcile-all") as executor:
+            results = list(
+                executor.map(
+                    lambda tenant_id: BatchReconciliationService._reconcile_tenant(
+                        session_factory, tenant_id, time_limit, assignment, full
+                    ),
+                    order,
+                )
+            )
+        duration = time.perf_counter() - start
+
+        invoices_scored = sum(r["invoices_scored"] for r in results)
+        return {
+            "started_at": started_at,
+            "finished_at": datetime.now(timezone.utc),
+            "duration_seconds": duration,
+            "workers": workers,
+            "tenant_count": len(results),
+            "succeeded": sum(r["status"] == "succeeded" for r in results),
+            "failed": sum(r["status"] == "failed" for r in results),
+            "timed_out": sum(r["status"] == "timed_out" for r in results),
+            "match_count": sum(r["match_count"] for r in results),
+            "invoices_scored": invoices_scored,
+            "invoices_per_second": invoices_scored / duration if duration else 0.0,
+            "tenants": results,
+        }
+
+    @staticmethod
+    def _all_tenant_ids(db: Session) -> List[int]:
+        """
+        Page through every tenant id in id order, each page starting after
+        the last id of the previous one, so no tenant is skipped or repeated.
+        """
+        tenant_ids: List[int] = []
+        while True:
+            page = TenantService.list_tenants(
+                db,
+                limit=TENANT_PAGE_SIZE,
+                after_id=tenant_ids[-1] if tenant_ids else None,
+            )
+            tenant_ids.extend(tenant.id for tenant in page)
+            if len(page) < TENANT_PAGE_SIZE:
+                return tenant_ids
+
+    @staticmethod
+    def _pending_work(db: Session, tenant_ids: List[int]) -> Dict[int, int]:
+        """Open invoices plus transactions per tenant, used to order the batch."""
+        pending: Dict[int, int] = {}
+        for model, condition in (
+            (Invoice, Invoice.status == InvoiceStatus.OPEN),
+            (BankTransaction, true()),
+        ):
+            rows = (
+                db.query(model.tenant_id, func.count(model.id))
+                .filter(model.tenant_id.in_(tenant_ids), condition)
+                .group_by(model.tenant_id)
+                .all()
+            )
+            for tenant_id, count in rows:
+                pending[tenant_id] = pending.get(tenant_id, 0) + count
+        return pending
+
+    @staticmethod
+    def _reconcile_tenant(
+        session_factory: sessionmaker,
+        tenant_id: int,
+        time_limit: float,
+        assignment: Optional[str],
+        full: bool,
+    ) -> dict:
+        """Reconcile one tenant and return its line of the report."""
+        result = {
+            "tenant_id": tenant_id,
+            "status": "succeeded",
+            "invoices_total": 0,
+            "invoices_scored": 0,
+            "match_count": 0,
+            "duration_seconds": 0.0,
+            "invoices_per_second": 0.0,
+            "error": None,
+        }
+        start = time.perf_counter()
+        deadline = start + time_limit if time_limit else None
+
+        def progress(scored: int, total: int) -> None:
+            result["invoices_scored"] = scored
+            result["invoices_total"] = total
+            if deadline is not None and time.perf_counter() > deadline:
+                raise TenantTimeLimitExceeded(
+                    f"Time limit of {time_limit:g}s exceeded after {scored} of {total} invoices"
+                )
+
+        db = session_factory()
+        try:
+            matches = ReconciliationService.reconcile(
+                db, tenant_id, assignment=assignment, full=full, progress=progress
+            )
+            result["match_count"] = len(matches)
+        except TenantTimeLimitExceeded as e:
+            db.rollback()
+            result["status"] = "timed_out"
+            result["error"] = str(e)
+        except Exception as e:
+            db.rollback()
+            result["status"] = "failed"
+            result["error"] = str(e)
+        finally:
+            db.close()
+
+        duration = time.perf_counter() - start
+        result["duration_seconds"] = duration
+        if duration:
+            result["invoices_per_second"] = result["invoices_scored"] / duration
+        return result
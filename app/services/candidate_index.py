@@ -0,0 +1,92 @@
+"""Candidate blocking index for reconciliation."""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, Hashable, List, Sequence
+from app.models.invoice import Invoice
+from app.models.bank_transaction import BankTransaction
+from app.services.scoring import (
+    AMOUNT_TIERS,
+    DATE_TIERS,
+    MAX_TEXT_POINTS,
+    MIN_MATCH_SCORE,
+    VENDOR_POINTS,
+    PairScorer,
+)
+
+
+def max_day_diff(points_needed: int) -> int:
+    """Largest day difference whose date points still reach points_needed (-1 if none)."""
+    reachable = [days for days, points in DATE_TIERS if points >= points_needed]
+    return max(reachable) if reachable else -1
+
+
+class CandidateIndex:
+    """
+    Buckets unmatched transactions by amount (integer cents), posting day and
+    description (the exact key of the text similarity) so each invoice is only scored against the pairs
+    that can still reach the minimum score.
+
+    A pair can reach the threshold only if one of the following holds:
+    - the amounts are within 5% (amount points > 0)
+    - the dates are close enough that date + text + vendor points reach it
+    - the descriptions are identical and the vendor bonus applies
+      (20 text points + 10 vendor points with no amount or date points)
+    Every other pair scores below the threshold, so skipping it does not
+    change the outcome of reconciliation.
+    """
+
+    def __init__(self, transactions: Sequence[BankTransaction], scorer: PairScorer):
+        self.transactions = transactions
+        self.scorer = scorer
+        self._by_cents: Dict[int, List[int]] = defaultdict(list)
+        self._by_day: Dict[int, List[int]] = defaultdict(list)
+        self._by_description: Dict[Hashable, List[int]] = defaultdict(list)
+
+        for position, transaction in enumerate(transactions):
+            self._by_cents[transaction.amount_cents].append(position)
+            if transaction.posted_at:
+                self._by_day[transaction.posted_at.toordinal()].append(position)
+            if transaction.description:
+                self._by_description[scorer.exact_key(transaction.description)].append(
+                    position
+                )
+
+        self._cents_keys = sorted(self._by_cents)
+
+    def candidates(self, invoice: Invoice) -> List[int]:
+        """Return positions of candidate transactions for an invoice, in input order."""
+        positions = set()
+
+        # Amount buckets: |invoice - transaction| within the widest tolerance
+        cents = invoice.amount_cents
+        if cents > 0:
+            tolerance = cents * max(percent for percent, _ in AMOUNT_TIERS) // 100
+            low, high = cents - tolerance, cents + tolerance
+        else:
+            low = high = cents
+        start = bisect_left(self._cents_keys, low)
+        end = bisect_right(self._cents_keys, high)
+        for key in self._cents_keys[start:end]:
+            positions.update(self._by_cents[key])
+
+        # Date buckets: only as wide as the remaining components allow
+        if invoice.invoice_date:
+            points_needed = int(MIN_MATCH_SCORE)
+            if invoice.description:
+                points_needed -= MAX_TEXT_POINTS
+            if self.scorer.has_vendor(invoice):
+                points_needed -= VENDOR_POINTS
+            days = max_day_diff(points_needed)
+            if days >= 0:
+                # timedelta.days floors, and a day of slack covers mixed UTC offsets
+                day = invoice.invoice_date.toordinal()
+                for ordinal in range(day - days - 2, day + days + 2):
+                    positions.update(self._by_day.get(ordinal, ()))
+
+        # Identical descriptions: text + vendor points alone reach the threshold
+        if invoice.description and self.scorer.has_vendor(invoice):
+            positions.update(
+                self._by_description.get(self.scorer.exact_key(invoice.description), ())
+            )
+
+        return sorted(positions)
@@ -0,0 +1,241 @@
+"""Idempotency key store with an in-memory front cache and TTL expiry."""
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+from app.models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# Idempotency keys cached in memory (0 disables the cache)
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1000"))
+
+# Seconds a key is honoured after it was stored (0 = forever)
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+
+# Seconds between sweeps deleting expired keys (0 = no sweeper)
+IDEMPOTENCY_SWEEP_INTERVAL = int(os.getenv("IDEMPOTENCY_SWEEP_INTERVAL", "3600"))
+
+# Key under which a session's info holds the keys it will store on commit
+_PENDING_KEY = "idempotency_pending"
+
+# (tenant id, idempotency key)
+StoreKey = Tuple[int, str]
+
+
+class StoredResponse(NamedTuple):
+    """A used idempotency key: its payload hash and serialized response."""
+    key: str
+    payload_hash: str
+    response_data: Optional[str]
+    expires_at: Optional[float]  # epoch seconds; None never expires
+
+    @property
+    def response(self) -> Dict[str, Any]:
+        """The stored response, freshly deserialized."""
+        return json.loads(self.response_data or "{}")
+
+
+class IdempotencyStore:
+    """
+    Stores the payload hash and serialized response of each (tenant, key),
+    so a retried request is answered from the stored response alone.
+    Keys are looked up in a bounded LRU cache before the idempotency_keys
+    table, and cached only once the transaction storing them commits.
+    Keys expire ttl seconds after they were stored: expired keys are
+    ignored, replaced when reused, and deleted by sweep or the sweeper
+    thread.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[StoreKey, StoredResponse]" = OrderedDict()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, db: Session, tenant_id: int, key: Optional[str]) -> Optional[StoredResponse]:
+        """Return the tenant's unexpired stored key, or None (also for no key)."""
+        if not key:
+            return None
+        with self._lock:
+            entry = self._entries.get((tenant_id, key))
+            if entry is not None and not self._is_expired(entry):
+                self._entries.move_to_end((tenant_id, key))
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        record = (
+            db.query(IdempotencyKey)
+            .filter(and_(IdempotencyKey.tenant_id == tenant_id, IdempotencyKey.key == key))
+            .first()
+        )
+        if record is None:
+            return None
+        entry = StoredResponse(
+            key, record.payload_hash, record.response_data, self._expires_at(record.created_at)
+        )
+        if self._is_expired(entry):
+            # Deleted with the caller's transaction, freeing the key for reuse;
+            # flushed now so it goes before the insert of its replacement
+            db.delete(record)
+            db.flush()
+            with self._lock:
+                self.expired += 1
+            return None
+        with self._lock:
+            self._store((tenant_id, key), entry)
+        return entry
+
+    def save(
+        self,
+        db: Session,
+        tenant_id: int,
+        key: str,
+        payload_hash: str,
+        response: Dict[str, Any],
+    ) -> None:
+        """Store a key with the caller's transaction; it is cached once that commits."""
+        response_data = json.dumps(response)
+        db.add(
+            IdempotencyKey(
+                key=key,
+                tenant_id=tenant_id,
+                payload_hash=payload_hash,
+                response_data=response_data,
+            )
+        )
+        expires_at = time.time() + self.ttl if self.ttl > 0 else None
+        db.info.setdefault(_PENDING_KEY, []).append(
+            ((tenant_id, key), StoredResponse(key, payload_hash, response_data, expires_at))
+        )
+
+    def _expires_at(self, created_at: Optional[datetime]) -> Optional[float]:
+        """Expiry (epoch seconds) of a key stored at created_at."""
+        if self.ttl <= 0 or created_at is None:
+            return None
+        # SQLite returns the UTC server default without an offset
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return created_at.timestamp() + self.ttl
+
+    @staticmethod
+    def _is_expired(entry: StoredResponse) -> bool:
+        return entry.expires_at is not None and entry.expires_at <= time.time()
+
+    def _store(self, store_key: StoreKey, entry: StoredResponse) -> None:
+        """Insert into the LRU cache, evicting the least recently used entries."""
+        if self.max_size <= 0:
+            return
+        self._entries[store_key] = entry
+        self._entries.move_to_end(store_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _committed(self, entries: List[Tuple[StoreKey, StoredResponse]]) -> None:
+        """Cache keys whose transaction committed."""
+        with self._lock:
+            for store_key, entry in entries:
+                self._store(store_key, entry)
+
+    def sweep(self, db: Session) -> int:
+        """Delete every expired key; return how many were deleted."""
+        if self.ttl <= 0:
+            return 0
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        deleted = (
+            db.query(IdempotencyKey)
+            .filter(IdempotencyKey.created_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        with self._lock:
+            for store_key in [k for k, entry in self._entries.items() if self._is_expired(entry)]:
+                del self._entries[store_key]
+            self.expired += deleted
+        return deleted
+
+    def start_sweeper(self, engine: Engine, interval: Optional[float] = None) -> None:
+        """Sweep expired keys every interval (IDEMPOTENCY_SWEEP_INTERVAL) seconds."""
+        interval = IDEMPOTENCY_SWEEP_INTERVAL if interval is None else interval
+        if interval <= 0 or self.ttl <= 0 or self._sweeper is not None:
+            return
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    with Session(bind=engine) as db:
+                        deleted = self.sweep(db)
+                    if deleted:
+                        logger.info("Swept %d expired idempotency keys", deleted)
+                except Exception:
+                    logger.exception("Idempotency key sweep failed")
+
+        self._sweeper = threading.Thread(target=run, name="idempotency-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """Stop the sweeper thread, if running."""
+        if self._sweeper is None:
+            return
+        self._stop.set()
+        self._sweeper.join()
+        self._sweeper = None
+
+    def clear(self) -> None:
+        """Drop every cached key."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return the size and hit/miss counters of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
+
+
+idempotency_store = IdempotencyStore(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL)
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed(session) -> None:
+    """Cache the keys a session stored once they are committed."""
+    entries = session.info.pop(_PENDING_KEY, None)
+    if entries:
+        idempotency_store._committed(entries)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session) -> None:
+    """Keys of a rolled back transaction were never stored."""
+    session.info.pop(_PENDING_KEY, None)
+
+
+@event.listens_for(IdempotencyKey.__table__, "after_drop")
+def _clear_on_drop(target, connection, **kw) -> None:
+    """Keys may be reused once the table is recreated, so forget every one."""
+    idempotency_store.clear()
@@ -3,8 +3,10 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from typing import List, Optional
 from datetime import datetime
-from decimal import Decimal
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+from app.money import to_cents
 from app.models.invoice import Invoice, InvoiceStatus
+from app.models.ranked_candidate import RankedCandidate
 from app.models.tenant import Tenant
 
 
@@ -76,10 +78,15 @@ class InvoiceService:
             query = query.filter(Invoice.invoice_date >= start_date)
         if end_date:
             query = query.filter(Invoice.invoice_date <= end_date)
+        # Amount bounds use the indexed integer cents column
         if min_amount:
-            query = query.filter(Invoice.amount >= min_amount)
+            query = query.filter(
+                Invoice.amount_cents >= to_cents(min_amount, rounding=ROUND_CEILING)
+            )
         if max_amount:
-            query = query.filter(Invoice.amount <= max_amount)
+            query = query.filter(
+                Invoice.amount_cents <= to_cents(max_amount, rounding=ROUND_FLOOR)
+            )
 
         return query.offset(skip).limit(limit).all()
 
@@ -89,6 +96,9 @@ class InvoiceService:
         invoice = InvoiceService.get_invoice(db, tenant_id, invoice_id)
         if not invoice:
             return False
+        db.query(RankedCandidate).filter(
+            RankedCandidate.invoice_id == invoice.id
+        ).delete(synchronize_session=False)
         db.delete(invoice)
         db.commit()
         return True
@@ -0,0 +1,169 @@
+"""Process-pool parallel scoring for reconciliation."""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+import multiprocessing
+import os
+from app.models.invoice import Invoice
+from app.models.bank_transaction import BankTransaction
+from app.services.scoring_backends import ScoredInvoice, get_scoring_backend
+
+# How scoring workers are started. Forked workers would inherit the server's
+# threads and the locks they hold (job workers, the idempotency sweeper), so
+# they are started from a clean forkserver, or spawned where it is missing
+SCORING_START_METHOD = os.getenv(
+    "RECONCILE_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn",
+)
+
+
+class VendorSnapshot(NamedTuple):
+    """Plain-data copy of the vendor fields used by scoring."""
+    name: str
+
+
+class InvoiceSnapshot(NamedTuple):
+    """Plain-data copy of the invoice fields used by scoring."""
+    id: int
+    amount_cents: int
+    invoice_date: Optional[datetime]
+    description: Optional[str]
+    vendor_id: Optional[int]
+    vendor: Optional[VendorSnapshot]
+
+
+class TransactionSnapshot(NamedTuple):
+    """Plain-data copy of the transaction fields used by scoring."""
+    id: int
+    amount_cents: int
+    posted_at: datetime
+    description: Optional[str]
+
+
+def snapshot_invoice(invoice: Invoice, with_vendor: bool = True) -> InvoiceSnapshot:
+    """
+    Copy an invoice into a picklable snapshot. The vendor name is only
+    needed (and loaded) when scoring without a vendor automaton.
+    """
+    vendor = VendorSnapshot(invoice.vendor.name) if with_vendor and invoice.vendor else None
+    return InvoiceSnapshot(
+        invoice.id,
+        invoice.amount_cents,
+        invoice.invoice_date,
+        invoice.description,
+        invoice.vendor_id,
+        vendor,
+    )
+
+
+def snapshot_transaction(transaction: BankTransaction) -> TransactionSnapshot:
+    """Copy a transaction into a picklable snapshot."""
+    return TransactionSnapshot(
+        transaction.id, transaction.amount_cents, transaction.posted_at, transaction.description
+    )
+
+
+# Per-process state, set once by the pool initializer
+_worker: Dict[str, object] = {}
+
+
+def _init_worker(
+    backend_name: str, transactions: List[TransactionSnapshot], vendors
+) -> None:
+    """
+    Receive the transaction snapshots and vendor automaton once per worker
+    process. Workers score without the score cache (see ParallelScoringBackend).
+    """
+    _worker["backend"] = get_scoring_backend(backend_name, vendors=vendors)
+    _worker["transactions"] = transactions
+
+
+def _score_chunk(
+    chunk: Tuple[List[InvoiceSnapshot], Set[Tuple[int, int]]]
+) -> Tuple[List[List[Tuple[int, Decimal]]], int]:
+    """Score one chunk of invoices in a worker process; also return the pairs scored."""
+    invoices, excluded_pairs = chunk
+    backend = _worker["backend"]
+    scored_before = backend.pairs_scored
+    results = [
+        scored
+        for _, scored in backend.score_candidates(
+            invoices, _worker["transactions"], excluded_pairs
+        )
+    ]
+    return results, backend.pairs_scored - scored_before
+
+
+class ParallelScoringBackend:
+    """
+    Splits invoices into chunks and scores them in a process pool with the
+    named backend. Workers receive plain-data snapshots, not ORM objects, and
+    results are merged back in invoice order, so the output is identical to
+    the single-process backend.
+    The score cache is only used when the invoices fit in a single chunk
+    and are scored in this process: it lives in this process's memory and
+    its keys need the record versions, which the snapshots leave out, so
+    pool workers always score every pair.
+    """
+
+    def __init__(
+        self, backend_name: str, workers: int, chunk_size: int, vendors=None, cache=None
+    ):
+        self.name = backend_name
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.vendors = vendors
+        self.cache = cache
+        self.pairs_scored = 0
+
+    def score_candidates(
+        self,
+        invoices: Sequence[Invoice],
+        transactions: Sequence[BankTransaction],
+        excluded_pairs: Set[Tuple[int, int]],
+    ) -> Iterator[ScoredInvoice]:
+        """
+        Yield each invoice with its scored candidates, in transaction order.
+        Pairs in excluded_pairs ((invoice_id, transaction_id)) are skipped.
+        """
+        if len(invoices) <= self.chunk_size or not transactions:
+            # A single chunk is not worth starting a pool for
+            backend = get_scoring_backend(self.name, vendors=self.vendors, cache=self.cache)
+            scored_before = self.pairs_scored
+            for scored_invoice in backend.score_candidates(
+                invoices, transactions, excluded_pairs
+            ):
+                self.pairs_scored = scored_before + backend.pairs_scored
+                yield scored_invoice
+            return
+
+        excluded_by_invoice: Dict[int, Set[Tuple[int, int]]] = {}
+        for pair in excluded_pairs:
+            excluded_by_invoice.setdefault(pair[0], set()).add(pair)
+
+        chunks = [
+            invoices[start:start + self.chunk_size]
+            for start in range(0, len(invoices), self.chunk_size)
+        ]
+        chunk_args = (
+            (
+                [snapshot_invoice(invoice, self.vendors is None) for invoice in chunk],
+                set().union(*(excluded_by_invoice.get(i.id, ()) for i in chunk)),
+            )
+            for chunk in chunks
+        )
+        transaction_snapshots = [snapshot_transaction(t) for t in transactions]
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(SCORING_START_METHOD),
+            initializer=_init_worker,
+            initargs=(self.name, transaction_snapshots, self.vendors),
+        ) as executor:
+            # map preserves chunk order, so the merge is deterministic
+            for chunk, (results, pairs_scored) in zip(
+                chunks, executor.map(_score_chunk, chunk_args)
+            ):
+                self.pairs_scored += pairs_scored
+                yield from zip(chunk, results)
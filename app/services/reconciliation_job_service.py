@@ -0,0 +1,175 @@
+"""Background reconciliation job service."""
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import and_
+from typing import Deque, Dict, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import threading
+import time
+from app.models.reconciliation_job import ReconciliationJob, JobStatus
+from app.models.tenant import Tenant
+from app.services.reconciliation_service import ReconciliationService
+
+logger = logging.getLogger(__name__)
+
+# Threads running reconciliation jobs (jobs of one tenant never run concurrently)
+JOB_WORKERS = int(os.getenv("RECONCILE_JOB_WORKERS", "2"))
+
+# Minimum seconds between progress updates written to the job row
+PROGRESS_INTERVAL = 0.5
+
+
+class ReconciliationJobService:
+    """Service for running reconciliation as background jobs."""
+
+    _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="reconcile-job")
+    _lock = threading.Lock()
+    # Tenants with a job running, and the jobs waiting behind it
+    _pending: Dict[int, Deque[Tuple[int, sessionmaker]]] = {}
+
+    @staticmethod
+    def submit_job(
+        db: Session,
+        tenant_id: int,
+        assignment: Optional[str] = None,
+        full: bool = False,
+    ) -> ReconciliationJob:
+        """
+        Queue a reconciliation run for a tenant and return its job right away.
+        The job runs on a worker thread with its own sessions bound to the
+        same engine as db.
+        """
+        tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
+        if not tenant:
+            raise ValueError(f"Tenant {tenant_id} not found")
+
+        job = ReconciliationJob(
+            tenant_id=tenant_id,
+            status=JobStatus.QUEUED,
+            assignment=assignment,
+            full=full,
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+        ReconciliationJobService._enqueue(tenant_id, job.id, session_factory)
+        return job
+
+    @staticmethod
+    def fail_orphaned_jobs(db: Session) -> int:
+        """
+        Mark jobs left queued or running by an earlier server process as
+        failed: their worker threads are gone, so they would never finish.
+        Call at startup, before jobs are submitted; jobs run in the process
+        that submitted them, so this assumes a single API process per
+        database. Returns how many jobs were failed.
+        """
+        failed = (
+            db.query(ReconciliationJob)
+            .filter(ReconciliationJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]))
+            .update(
+                {
+                    ReconciliationJob.status: JobStatus.FAILED,
+                    ReconciliationJob.error: "Interrupted by a server restart",
+                    ReconciliationJob.finished_at: datetime.now(timezone.utc),
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if failed:
+            logger.warning("Marked %d interrupted reconciliation jobs failed", failed)
+        return failed
+
+    @staticmethod
+    def get_job(db: Session, tenant_id: int, job_id: int) -> Optional[ReconciliationJob]:
+        """Get a job by ID, ensuring tenant isolation."""
+        # Worker threads update the row, so never serve a stale identity-map copy
+        return (
+            db.query(ReconciliationJob)
+            .populate_existing()
+            .filter(
+                and_(
+                    ReconciliationJob.id == job_id,
+                    ReconciliationJob.tenant_id == tenant_id,
+                )
+            )
+            .first()
+        )
+
+    @staticmethod
+    def _enqueue(tenant_id: int, job_id: int, session_factory: sessionmaker) -> None:
+        """Start the job, or queue it behind the tenant's running job."""
+        cls = ReconciliationJobService
+        with cls._lock:
+            if tenant_id in cls._pending:
+                cls._pending[tenant_id].append((job_id, session_factory))
+                return
+            cls._pending[tenant_id] = deque()
+        cls._executor.submit(cls._run_tenant_jobs, tenant_id, job_id, session_factory)
+
+    @staticmethod
+    def _run_tenant_jobs(tenant_id: int, job_id: int, session_factory: sessionmaker) -> None:
+        """Run a tenant's jobs one after another until its queue is empty."""
+        cls = ReconciliationJobService
+        while True:
+            try:
+                cls._run_job(job_id, session_factory)
+            except Exception:
+                logger.exception("Reconciliation job %s could not be run", job_id)
+            with cls._lock:
+                if not cls._pending[tenant_id]:
+                    del cls._pending[tenant_id]
+                    return
+                job_id, session_factory = cls._pending[tenant_id].popleft()
+
+    @staticmethod
+    def _run_job(job_id: int, session_factory: sessionmaker) -> None:
+        """Run one job, recording progress, timings and the created matches."""
+        job_db = session_factory()
+        work_db = session_factory()
+        try:
+            job = job_db.get(ReconciliationJob, job_id)
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.now(timezone.utc)
+            job_db.commit()
+
+            start = time.perf_counter()
+            last_update = [0.0]
+
+            def progress(scored: int, total: int) -> None:
+                now = time.perf_counter()
+                if scored == total or now - last_update[0] >= PROGRESS_INTERVAL:
+                    last_update[0] = now
+                    job.invoices_scored = scored
+                    job.invoices_total = total
+                    job_db.commit()
+
+            try:
+                matches = ReconciliationService.reconcile(
+                    work_db,
+                    job.tenant_id,
+                    assignment=job.assignment,
+                    full=job.full,
+                    progress=progress,
+                )
+                job.status = JobStatus.SUCCEEDED
+                job.match_count = len(matches)
+                job.result_match_ids = json.dumps([m.id for m in matches])
+            except Exception as e:
+                work_db.rollback()
+                job.status = JobStatus.FAILED
+                job.error = str(e)
+
+            job.duration_seconds = time.perf_counter() - start
+            job.finished_at = datetime.now(timezone.utc)
+            job_db.commit()
+        finally:
+            work_db.close()
+            job_db.close()
@@ -0,0 +1,255 @@
+"""Per-stage instrumentation of reconciliation runs."""
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds: seconds, and SQL statements per run
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+STATEMENT_BUCKETS = (5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+# Key under which a connection's info points at the run counting its statements
+_RUN_KEY = "reconcile_metrics"
+
+# Marks an exhausted iterator in ReconcileMetrics.timed
+_END = object()
+
+
+class StageMetrics:
+    """Wall time, rows and SQL statements of one stage of a run."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.rows: Optional[int] = None
+        self.statements = 0
+
+    def as_dict(self) -> dict:
+        """The stage as a JSON-serializable dict."""
+        return {
+            "name": self.name,
+            "seconds": self.seconds,
+            "rows": self.rows,
+            "statements": self.statements,
+        }
+
+
+class ReconcileMetrics:
+    """
+    Measurements of one reconcile run: per-stage wall time, row counts and
+    SQL statements, plus the pairs scored and skipped by the backend.
+    Stages entered more than once (e.g. scoring between streamed batches)
+    accumulate. Pass one to ReconciliationService.reconcile to read it back.
+    """
+
+    def __init__(self):
+        self.tenant_id: Optional[int] = None
+        self.backend: Optional[str] = None
+        self.assignment: Optional[str] = None
+        self.full = False
+        self.status = "running"
+        self.seconds = 0.0
+        self.statements = 0
+        self.invoices = 0
+        self.transactions = 0
+        self.pairs_in_scope = 0
+        self.pairs_scored = 0
+        self.matches = 0
+        self.auto_confirmed = 0
+        self.stages: Dict[str, StageMetrics] = {}
+
+    @property
+    def pairs_skipped(self) -> int:
+        """Pairs in the run's scope that were never scored."""
+        return max(0, self.pairs_in_scope - self.pairs_scored)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMetrics]:
+        """Time the enclosed block as (part of) a stage."""
+        stage = self._stage(name)
+        start, statements = time.perf_counter(), self.statements
+        try:
+            yield stage
+        finally:
+            stage.seconds += time.perf_counter() - start
+            stage.statements += self.statements - statements
+
+    def set_rows(self, name: str, rows: int) -> None:
+        """Record the rows a stage handled."""
+        self._stage(name).rows = rows
+
+    def _stage(self, name: str) -> StageMetrics:
+        """Return the named stage, created on first use."""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = StageMetrics(name)
+        return stage
+
+    def timed(self, name: str, items: Iterable) -> Iterator:
+        """Pass items through, timing the production of each as the named stage."""
+        items = iter(items)
+        while True:
+            with self.stage(name):
+                item = next(items, _END)
+            if item is _END:
+                return
+            yield item
+
+    @contextmanager
+    def run(self, db: Session) -> Iterator["ReconcileMetrics"]:
+        """
+        Measure a run on db: count its SQL statements and, once it ends,
+        record it in the histograms and log it.
+        """
+        tagged: List[dict] = []
+        engine = db.get_bind()
+
+        def tag(connection) -> None:
+            info = connection.info
+            info[_RUN_KEY] = self
+            tagged.append(info)
+
+        def after_begin(session, transaction, connection) -> None:
+            tag(connection)
+
+        def checkin(dbapi_connection, connection_record) -> None:
+            # Untagged before it is back in the pool, so another session
+            # checking it out is not counted against this run
+            if connection_record.info.get(_RUN_KEY) is self:
+                del connection_record.info[_RUN_KEY]
+
+        # Commits release the connection; tag each one the session begins on
+        # and untag it when it is released
+        event.listen(db, "after_begin", after_begin)
+        event.listen(engine, "checkin", checkin)
+        tag(db.connection())
+        start = time.perf_counter()
+        try:
+            yield self
+            self.status = "succeeded"
+        except GeneratorExit:
+            self.status = "abandoned"
+            raise
+        except BaseException:
+            self.status = "failed"
+            raise
+        finally:
+            self.seconds = time.perf_counter() - start
+            event.remove(db, "after_begin", after_begin)
+            event.remove(engine, "checkin", checkin)
+            for info in tagged:
+                if info.get(_RUN_KEY) is self:
+                    del info[_RUN_KEY]
+            reconcile_metrics.observe(self)
+            logger.info("reconcile %s", json.dumps(self.as_dict(), sort_keys=True))
+
+    def as_dict(self) -> dict:
+        """The run and its stages as a JSON-serializable dict."""
+        return {
+            "tenant_id": self.tenant_id,
+            "backend": self.backend,
+            "assignment": self.assignment,
+            "full": self.full,
+            "status": self.status,
+            "seconds": self.seconds,
+            "statements": self.statements,
+            "invoices": self.invoices,
+            "transactions": self.transactions,
+            "pairs_scored": self.pairs_scored,
+            "pairs_skipped": self.pairs_skipped,
+            "matches": self.matches,
+            "auto_confirmed": self.auto_confirmed,
+            "stages": [stage.as_dict() for stage in self.stages.values()],
+        }
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Count a statement against the run its connection is tagged with."""
+    run = conn.info.get(_RUN_KEY)
+    if run is not None:
+        run.statements += 1
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Count value in every bucket whose bound it does not exceed."""
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def as_dict(self) -> dict:
+        """The buckets, sum and count as a JSON-serializable dict."""
+        return {
+            "buckets": [
+                {"le": bound, "count": count} for bound, count in zip(self.buckets, self.counts)
+            ],
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+class ReconcileMetricsRegistry:
+    """Aggregates every reconcile run of the process into histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every observed run."""
+        with self._lock:
+            self.runs: Dict[str, int] = {}
+            self.run_seconds = Histogram(SECONDS_BUCKETS)
+            self.stage_seconds: Dict[str, Histogram] = {}
+            self.statements = Histogram(STATEMENT_BUCKETS)
+            self.pairs_scored = 0
+            self.pairs_skipped = 0
+
+    def observe(self, metrics: ReconcileMetrics) -> None:
+        """Add a finished run."""
+        with self._lock:
+            self.runs[metrics.status] = self.runs.get(metrics.status, 0) + 1
+            self.run_seconds.observe(metrics.seconds)
+            self.statements.observe(metrics.statements)
+            for stage in metrics.stages.values():
+                histogram = self.stage_seconds.get(stage.name)
+                if histogram is None:
+                    histogram = self.stage_seconds[stage.name] = Histogram(SECONDS_BUCKETS)
+                histogram.observe(stage.seconds)
+            self.pairs_scored += metrics.pairs_scored
+            self.pairs_skipped += metrics.pairs_skipped
+
+    def snapshot(self) -> dict:
+        """Return the run counts and histograms."""
+        with self._lock:
+            return {
+                "runs": dict(self.runs),
+                "run_seconds": self.run_seconds.as_dict(),
+                "stage_seconds": {
+                    name: histogram.as_dict() for name, histogram in self.stage_seconds.items()
+                },
+                "statements": self.statements.as_dict(),
+                "pairs_scored": self.pairs_scored,
+                "pairs_skipped": self.pairs_skipped,
+            }
+
+
+reconcile_metrics = ReconcileMetricsRegistry()
@@ -1,14 +1,63 @@
 """Reconciliation service."""
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import and_, or_, insert, delete, select, update, func
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from bisect import bisect_right
+import heapq
+from itertools import chain
 from decimal import Decimal
 from datetime import datetime, timedelta
-from difflib import SequenceMatcher
+import os
+import time
 from app.models.invoice import Invoice, InvoiceStatus
 from app.models.bank_transaction import BankTransaction
 from app.models.match import Match, MatchStatus
 from app.models.tenant import Tenant
+from app.models.reconciliation_watermark import ReconciliationWatermark
+from app.models.ranked_candidate import RankedCandidate
+from app.models.pair_score import PairScore
+from app.services.scoring import calculate_match_score, PairScorer
+from app.services.scoring_backends import get_scoring_backend
+from app.services.assignment import get_assignment
+from app.services.parallel_scoring import ParallelScoringBackend
+from app.services.vendor_automaton import VendorAutomatonService
+from app.services.score_cache import score_cache
+from app.services.window_join import DateWindowJoin, InvoiceRow, TransactionRow
+from app.services.reconciliation_metrics import ReconcileMetrics
+
+# Scoring backend used by reconcile: "python" (blocking index), "numpy" or
+# "window" (date-window join streamed from the database)
+SCORING_BACKEND = os.getenv("RECONCILE_SCORING_BACKEND", "python")
+
+# Assignment mode used by reconcile: "best" (per invoice) or "one_to_one"
+ASSIGNMENT_MODE = os.getenv("RECONCILE_ASSIGNMENT", "best")
+
+# Scoring worker processes (1 scores in the calling thread) and invoices per chunk
+SCORING_WORKERS = int(os.getenv("RECONCILE_WORKERS", "1"))
+SCORING_CHUNK_SIZE = int(os.getenv("RECONCILE_CHUNK_SIZE", "1000"))
+
+# Matches persisted per batch by reconcile_stream, and the longest a proposed
+# match waits in a partial batch (seconds) before the batch is persisted anyway
+STREAM_BATCH_SIZE = int(os.getenv("RECONCILE_STREAM_BATCH_SIZE", "100"))
+STREAM_FLUSH_INTERVAL = 0.25
+
+# Rows fetched per round trip by the "window" backend's sorted streams
+WINDOW_FETCH_SIZE = 1000
+
+# Scored candidates kept per invoice, so a rejected proposal is replaced by
+# the runner-up without rescoring (0 keeps none)
+TOP_K_CANDIDATES = int(os.getenv("RECONCILE_TOP_K", "5"))
+
+
+class MatchReview(NamedTuple):
+    """Result of ReconciliationService.review_matches."""
+    # (match id, "confirm" or "reject", outcome) per requested id, in request order
+    outcomes: List[Tuple[int, str, str]]
+    # Other proposals of confirmed invoices and transactions, rejected with them
+    auto_rejected: List[int]
+    # Candidates promoted in place of rejected matches
+    promoted: List[Match]
 
 
 class ReconciliationService:
@@ -16,163 +65,668 @@ class ReconciliationService:
 
     @staticmethod
     def calculate_match_score(
-        invoice: Invoice, transaction: BankTransaction
+        invoice: Invoice, transaction: BankTransaction, db: Optional[Session] = None
     ) -> Decimal:
         """
-        Calculate a match score between 0 and 100.
-        Scoring algorithm:
-        - Exact amount match: 40 points
-        - Amount within 1% tolerance: 30 points
-        - Date proximity (within 3 days): 20 points
-        - Text similarity (description): 20 points
-        - Vendor name in transaction description: 10 points (bonus)
-        """
-        score = Decimal("0.0")
-
-        # Amount matching (40 points max)
-        if invoice.amount == transaction.amount:
-            score += Decimal("40.0")
-        elif invoice.amount > 0:
-            tolerance = abs(invoice.amount - transaction.amount) / invoice.amount
-            if tolerance <= Decimal("0.01"):  # Within 1%
-                score += Decimal("30.0")
-            elif tolerance <= Decimal("0.05"):  # Within 5%
-                score += Decimal("15.0")
-
-        # Date proximity (20 points max)
-        if invoice.invoice_date and transaction.posted_at:
-            date_diff = abs((invoice.invoice_date - transaction.posted_at).days)
-            if date_diff == 0:
-                score += Decimal("20.0")
-            elif date_diff <= 1:
-                score += Decimal("15.0")
-            elif date_diff <= 3:
-                score += Decimal("10.0")
-            elif date_diff <= 7:
-                score += Decimal("5.0")
-
-        # Text similarity (20 points max)
-        if invoice.description and transaction.description:
-            similarity = SequenceMatcher(
-                None,
-                invoice.description.lower(),
-                transaction.description.lower(),
-            ).ratio()
-            score += Decimal(str(similarity * 20))
-
-        # Vendor name bonus (10 points max)
-        if invoice.vendor and transaction.description:
-            vendor_name_lower = invoice.vendor.name.lower()
-            desc_lower = transaction.description.lower()
-            if vendor_name_lower in desc_lower:
-                score += Decimal("10.0")
-
-        return min(score, Decimal("100.0"))
+        Calculate a match score between 0 and 100 (see app.services.scoring).
+        With db, the vendor bonus uses the tenant's vendor automaton (names
+        and aliases), as reconcile does, and the score is read from and
+        stored in the score cache.
+        """
+        if db is None:
+            return calculate_match_score(invoice, transaction)
+        vendors = VendorAutomatonService.get_automaton(db, invoice.tenant_id)
+        scorer = PairScorer(vendors=vendors, cache=score_cache, db=db)
+        return scorer.score(invoice, transaction)
 
     @staticmethod
     def reconcile(
-        db: Session, tenant_id: int
+        db: Session,
+        tenant_id: int,
+        scoring_backend: Optional[str] = None,
+        assignment: Optional[str] = None,
+        full: bool = False,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+        metrics: Optional[ReconcileMetrics] = None,
     ) -> List[Match]:
         """
         Run reconciliation and create match candidates.
         Returns best matches per invoice (one match per invoice).
+        Runs are incremental: only invoices and transactions added since the
+        tenant's last run (its watermark) are scored, unless full is set.
+        scoring_backend overrides RECONCILE_SCORING_BACKEND ("python", "numpy"
+        or "window"). The "window" backend streams invoice and transaction
+        columns sorted by date and amount instead of loading them, and
+        always scores in the calling process.
+        assignment overrides RECONCILE_ASSIGNMENT: "best" proposes each invoice's
+        best transaction; "one_to_one" also proposes each transaction at most
+        once, skipping transactions that already have a proposed match.
+        workers and chunk_size override RECONCILE_WORKERS and
+        RECONCILE_CHUNK_SIZE; with more than one worker, chunks of invoices
+        are scored in a process pool.
+        progress, if given, is called with (invoices scored, invoices to score)
+        after each invoice.
+        Each invoice's top RECONCILE_TOP_K candidates are kept as ranked
+        candidates for reject_match.
+        Every run is measured per stage, logged and added to the histograms of
+        reconcile_metrics; pass metrics to read the measurements back.
         """
-        # Verify tenant exists
-        tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
-        if not tenant:
-            raise ValueError(f"Tenant {tenant_id} not found")
+        return list(
+            ReconciliationService._reconcile(
+                db,
+                tenant_id,
+                scoring_backend=scoring_backend,
+                assignment=assignment,
+                full=full,
+                workers=workers,
+                chunk_size=chunk_size,
+                progress=progress,
+                batch_size=None,
+                metrics=metrics,
+            )
+        )
 
-        # Get open invoices
-        open_invoices = (
-            db.query(Invoice)
-            .filter(
-                and_(
-                    Invoice.tenant_id == tenant_id,
-                    Invoice.status == InvoiceStatus.OPEN,
+    @staticmethod
+    def reconcile_stream(
+        db: Session,
+        tenant_id: int,
+        scoring_backend: Optional[str] = None,
+        assignment: Optional[str] = None,
+        full: bool = False,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        metrics: Optional[ReconcileMetrics] = None,
+    ) -> Iterator[Match]:
+        """
+        Run reconciliation like reconcile, yielding matches as they are created.
+        Matches are persisted and committed in batches of batch_size
+        (RECONCILE_STREAM_BATCH_SIZE), or sooner when a batch has waited
+        STREAM_FLUSH_INTERVAL, and each batch is yielded once committed.
+        With the "one_to_one" assignment, matches are only known once every
+        invoice is scored. The watermark advances when the stream is exhausted;
+        if it is abandoned, committed batches are kept and the next run
+        rescans from the previous watermark.
+        """
+        return ReconciliationService._reconcile(
+            db,
+            tenant_id,
+            scoring_backend=scoring_backend,
+            assignment=assignment,
+            full=full,
+            workers=workers,
+            chunk_size=chunk_size,
+            progress=None,
+            batch_size=batch_size or STREAM_BATCH_SIZE,
+            metrics=metrics,
+        )
+
+    @staticmethod
+    def _reconcile(
+        db: Session,
+        tenant_id: int,
+        scoring_backend: Optional[str],
+        assignment: Optional[str],
+        full: bool,
+        workers: Optional[int],
+        chunk_size: Optional[int],
+        progress: Optional[Callable[[int, int], None]],
+        batch_size: Optional[int],
+        metrics: Optional[ReconcileMetrics],
+    ) -> Iterator[Match]:
+        """
+        Score the run and yield its matches, measuring each stage in metrics
+        (a new ReconcileMetrics if None). Without a batch_size every match is
+        inserted in one statement, committed with the watermark.
+        """
+        metrics = metrics if metrics is not None else ReconcileMetrics()
+        metrics.tenant_id = tenant_id
+        metrics.backend = scoring_backend or SCORING_BACKEND
+        metrics.assignment = assignment or ASSIGNMENT_MODE
+        metrics.full = full
+        with metrics.run(db):
+            yield from ReconciliationService._run_stages(
+                db,
+                tenant_id,
+                metrics.backend,
+                metrics.assignment,
+                full,
+                workers,
+                chunk_size,
+                progress,
+                batch_size,
+                metrics,
+            )
+
+    @staticmethod
+    def _run_stages(
+        db: Session,
+        tenant_id: int,
+        scoring_backend: str,
+        assignment: str,
+        full: bool,
+        workers: Optional[int],
+        chunk_size: Optional[int],
+        progress: Optional[Callable[[int, int], None]],
+        batch_size: Optional[int],
+        metrics: ReconcileMetrics,
+    ) -> Iterator[Match]:
+        """The stages of _reconcile: prepare, load, score and persist."""
+        assign = get_assignment(assignment)
+
+        with metrics.stage("prepare"):
+            # Verify tenant exists
+            tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
+            if not tenant:
+                raise ValueError(f"Tenant {tenant_id} not found")
+
+            # Bound this run by the highest ids now, so rows added while it
+            # runs are left for the next run
+            high_invoice_id = (
+                db.query(func.max(Invoice.id)).filter(Invoice.tenant_id == tenant_id).scalar()
+                or 0
+            )
+            high_transaction_id = (
+                db.query(func.max(BankTransaction.id))
+                .filter(BankTransaction.tenant_id == tenant_id)
+                .scalar()
+                or 0
+            )
+
+            watermark = (
+                db.query(ReconciliationWatermark)
+                .filter(ReconciliationWatermark.tenant_id == tenant_id)
+                .first()
+            )
+            if full or not watermark:
+                last_invoice_id = last_transaction_id = 0
+            else:
+                last_invoice_id = watermark.last_invoice_id
+                last_transaction_id = watermark.last_transaction_id
+
+            # Open invoices
+            invoice_query = (
+                db.query(Invoice)
+                .filter(
+                    and_(
+                        Invoice.tenant_id == tenant_id,
+                        Invoice.status == InvoiceStatus.OPEN,
+                        Invoice.id <= high_invoice_id,
+                    )
                 )
+                .order_by(Invoice.id)
             )
-            .all()
-        )
 
-        # Get unmatched transactions (not confirmed in any match)
-        matched_transaction_ids_subq = (
-            db.query(Match.bank_transaction_id)
-            .filter(
-                and_(
-                    Match.tenant_id == tenant_id,
-                    Match.status == MatchStatus.CONFIRMED,
+            # Unmatched transactions (not confirmed in any match)
+            matched_transaction_ids_subq = (
+                db.query(Match.bank_transaction_id)
+                .filter(
+                    and_(
+                        Match.tenant_id == tenant_id,
+                        Match.status == MatchStatus.CONFIRMED,
+                    )
                 )
+                .subquery()
             )
-            .subquery()
-        )
 
-        unmatched_transactions = (
-            db.query(BankTransaction)
-            .filter(
-                and_(
-                    BankTransaction.tenant_id == tenant_id,
-                    ~BankTransaction.id.in_(
-                        db.query(matched_transaction_ids_subq.c.bank_transaction_id)
-                    ),
+            transaction_query = (
+                db.query(BankTransaction)
+                .filter(
+                    and_(
+                        BankTransaction.tenant_id == tenant_id,
+                        BankTransaction.id <= high_transaction_id,
+                        ~BankTransaction.id.in_(
+                            db.query(matched_transaction_ids_subq.c.bank_transaction_id)
+                        ),
+                    )
                 )
+                .order_by(BankTransaction.id)
             )
-            .all()
-        )
 
-        # Calculate scores and create matches
-        matches = []
-        for invoice in open_invoices:
-            best_match = None
-            best_score = Decimal("0.0")
+            # Load every existing (invoice, transaction) pair once instead of per pair
+            existing_pairs = set()
+            proposed_transaction_ids = set()
+            for invoice_id, transaction_id, status in (
+                db.query(Match.invoice_id, Match.bank_transaction_id, Match.status)
+                .filter(Match.tenant_id == tenant_id)
+                .all()
+            ):
+                existing_pairs.add((invoice_id, transaction_id))
+                if status == MatchStatus.PROPOSED:
+                    proposed_transaction_ids.add(transaction_id)
+            if assignment != "one_to_one":
+                proposed_transaction_ids = set()
 
-            for transaction in unmatched_transactions:
-                # Skip if already matched to this invoice
-                existing_match = (
-                    db.query(Match)
-                    .filter(
-                        and_(
-                            Match.invoice_id == invoice.id,
-                            Match.bank_transaction_id == transaction.id,
-                            Match.tenant_id == tenant_id,
-                        )
+            # Vendor bonuses come from the tenant's cached vendor automaton, so
+            # invoice vendors are never loaded
+            vendors = VendorAutomatonService.get_automaton(db, tenant_id)
+
+        if scoring_backend == DateWindowJoin.name:
+            # Candidates are keyed by transaction id and nothing is loaded
+            # into the session; rows are streamed while scoring. Best-per-
+            # invoice assignment only needs each invoice's top candidates,
+            # one-to-one weighs them all
+            backend = DateWindowJoin(
+                vendors,
+                cache=score_cache,
+                top_k=None if assignment == "one_to_one" else max(TOP_K_CANDIDATES, 1),
+            )
+            with metrics.stage("prepare"):
+                scored_invoices, invoice_count = ReconciliationService._window_candidates(
+                    db,
+                    invoice_query,
+                    transaction_query,
+                    backend,
+                    last_invoice_id,
+                    last_transaction_id,
+                    existing_pairs,
+                    proposed_transaction_ids,
+                    metrics,
+                )
+
+            def transaction_id_at(key: int) -> int:
+                return key
+
+        else:
+            # New invoices are scored against every unmatched transaction and
+            # new transactions against every open invoice; pairs of an old
+            # invoice and an old transaction were scored by an earlier run
+            with metrics.stage("load_invoices"):
+                new_invoices = invoice_query.filter(Invoice.id > last_invoice_id).all()
+            with metrics.stage("load_transactions") as stage:
+                if new_invoices:
+                    unmatched_transactions = transaction_query.all()
+                else:
+                    unmatched_transactions = transaction_query.filter(
+                        BankTransaction.id > last_transaction_id
+                    ).all()
+                unmatched_transactions = [
+                    t for t in unmatched_transactions if t.id not in proposed_transaction_ids
+                ]
+                stage.rows = len(unmatched_transactions)
+            transaction_ids = [t.id for t in unmatched_transactions]
+
+            # New transactions are the tail of the id-ordered list
+            first_new = bisect_right(transaction_ids, last_transaction_id)
+            with metrics.stage("load_invoices") as stage:
+                if first_new < len(unmatched_transactions) and last_invoice_id:
+                    old_invoices = invoice_query.filter(Invoice.id <= last_invoice_id).all()
+                else:
+                    old_invoices = []
+                stage.rows = len(old_invoices) + len(new_invoices)
+
+            backend = get_scoring_backend(scoring_backend, vendors=vendors, cache=score_cache)
+            workers = workers or SCORING_WORKERS
+            if workers > 1:
+                backend = ParallelScoringBackend(
+                    backend.name,
+                    workers,
+                    chunk_size or SCORING_CHUNK_SIZE,
+                    vendors=vendors,
+                    cache=score_cache,
+                )
+            scored_invoices = chain(
+                (
+                    (invoice, [(first_new + position, score) for position, score in scored])
+                    for invoice, scored in backend.score_candidates(
+                        old_invoices, unmatched_transactions[first_new:], existing_pairs
                     )
-                    .first()
+                ),
+                backend.score_candidates(new_invoices, unmatched_transactions, existing_pairs),
+            )
+            invoice_count = len(old_invoices) + len(new_invoices)
+            metrics.invoices = invoice_count
+            metrics.transactions = len(unmatched_transactions)
+            metrics.pairs_in_scope = len(old_invoices) * (
+                len(unmatched_transactions) - first_new
+            ) + len(new_invoices) * len(unmatched_transactions)
+
+            def transaction_id_at(position: int) -> int:
+                return transaction_ids[position]
+
+        candidate_rows = []
+        if TOP_K_CANDIDATES:
+            scored_invoices = ReconciliationService._retain_candidates(
+                scored_invoices, transaction_id_at, TOP_K_CANDIDATES, candidate_rows
+            )
+        if progress:
+            scored_invoices = ReconciliationService._report_progress(
+                scored_invoices, invoice_count, progress
+            )
+
+        # Select proposals from the scored candidates; scoring is lazy, so
+        # it is timed as the proposals are drawn
+        match_rows = (
+            {
+                "tenant_id": tenant_id,
+                "invoice_id": invoice.id,
+                "bank_transaction_id": transaction_id_at(position),
+                "score": score,
+                "status": MatchStatus.PROPOSED,
+            }
+            for invoice, position, score in metrics.timed("score", assign(scored_invoices))
+        )
+
+        # Auto-confirm qualifying matches in the transaction inserting them
+        threshold = tenant.auto_confirm_threshold
+        confirmed_invoice_ids, lost_invoice_ids = set(), set()
+
+        def auto_confirm(matches: List[Match]) -> None:
+            if threshold is None:
+                return
+            confirmed, rejected = ReconciliationService._auto_confirm(
+                db, tenant_id, matches, threshold
+            )
+            confirmed_invoice_ids.update(m.invoice_id for m in confirmed)
+            lost_invoice_ids.update(invoice_id for _, invoice_id in rejected)
+            metrics.auto_confirmed += len(confirmed)
+
+        batch = []
+        if batch_size:
+            # Batch commits must not expire the invoices and transactions
+            # still being scored, or each would be reloaded one by one
+            expire_on_commit = db.expire_on_commit
+            db.expire_on_commit = False
+            try:
+                batch_started = time.perf_counter()
+                for row in match_rows:
+                    batch.append(row)
+                    if (
+                        len(batch) >= batch_size
+                        or time.perf_counter() - batch_started >= STREAM_FLUSH_INTERVAL
+                    ):
+                        with metrics.stage("persist"):
+                            matches = ReconciliationService._insert_matches(db, batch)
+                            auto_confirm(matches)
+                            db.commit()
+                        metrics.matches += len(matches)
+                        yield from matches
+                        batch = []
+                        batch_started = time.perf_counter()
+            finally:
+                db.expire_on_commit = expire_on_commit
+        else:
+            batch = list(match_rows)
+        metrics.set_rows("score", invoice_count)
+        metrics.pairs_scored = backend.pairs_scored
+
+        with metrics.stage("persist") as stage:
+            matches = ReconciliationService._insert_matches(db, batch)
+            auto_confirm(matches)
+            if TOP_K_CANDIDATES:
+                # Confirmed invoices need no runners-up
+                ReconciliationService._store_candidates(
+                    db,
+                    tenant_id,
+                    [
+                        row
+                        for row in candidate_rows
+                        if row["invoice_id"] not in confirmed_invoice_ids
+                    ],
+                    TOP_K_CANDIDATES,
+                    replace=full,
                 )
-                if existing_match:
-                    continue
+            # Invoices whose proposal lost its transaction to an auto-confirmed
+            # match get their next candidate, as after a rejection
+            matches += ReconciliationService._promote_candidates(
+                db,
+                tenant_id,
+                lost_invoice_ids - confirmed_invoice_ids,
+                one_to_one=assignment == "one_to_one",
+            )
+
+            if not watermark:
+                watermark = ReconciliationWatermark(tenant_id=tenant_id)
+                db.add(watermark)
+            watermark.last_invoice_id = high_invoice_id
+            watermark.last_transaction_id = high_transaction_id
+            db.commit()
+
+            # Re-attach the inserted matches; they were detached so the commit
+            # would not expire the values returned by the insert
+            db.add_all(matches)
+            metrics.matches += len(matches)
+            stage.rows = metrics.matches
+
+        yield from matches
 
-                score = ReconciliationService.calculate_match_score(
-                    invoice, transaction
+    @staticmethod
+    def _report_progress(
+        scored_invoices: Iterable, total: int, progress: Callable[[int, int], None]
+    ) -> Iterator:
+        """Pass scored invoices through, reporting progress after each one."""
+        progress(0, total)
+        for count, scored_invoice in enumerate(scored_invoices, start=1):
+            yield scored_invoice
+            progress(count, total)
+
+    @staticmethod
+    def _window_candidates(
+        db: Session,
+        invoice_query,
+        transaction_query,
+        join: DateWindowJoin,
+        last_invoice_id: int,
+        last_transaction_id: int,
+        excluded_pairs: set,
+        excluded_transaction_ids: set,
+        metrics: ReconcileMetrics,
+    ) -> Tuple[Iterator, int]:
+        """
+        Score the run with the date-window join, streaming invoice and
+        transaction columns sorted by date and by amount.
+        Returns the lazily scored (invoice row, [(transaction id, score), ...])
+        of every invoice in scope, in the join's order, and their count. The
+        rows streamed by amount are counted into metrics once it is consumed.
+        """
+        has_new_invoices = db.query(
+            invoice_query.filter(Invoice.id > last_invoice_id).exists()
+        ).scalar()
+        has_new_transactions = db.query(
+            transaction_query.filter(BankTransaction.id > last_transaction_id).exists()
+        ).scalar()
+        # Same scope as the in-memory backends: old invoices are only needed
+        # for new transactions, and old transactions for new invoices
+        if not has_new_transactions:
+            invoice_query = invoice_query.filter(Invoice.id > last_invoice_id)
+        if not has_new_invoices:
+            transaction_query = transaction_query.filter(
+                BankTransaction.id > last_transaction_id
+            )
+
+        def skip_pair(invoice_id: int, transaction_id: int) -> bool:
+            return (
+                (invoice_id <= last_invoice_id and transaction_id <= last_transaction_id)
+                or (invoice_id, transaction_id) in excluded_pairs
+                or transaction_id in excluded_transaction_ids
+            )
+
+        def stream(query, model, row_type, *order):
+            # Plain column rows, fetched in pages, never enter the session
+            columns = [getattr(model, field) for field in row_type._fields]
+            query = query.with_entities(*columns).order_by(None).order_by(*order)
+            return (row_type(*row) for row in query.yield_per(WINDOW_FETCH_SIZE))
+
+        # Rows read per side, split into those up to and after the watermark;
+        # loading happens while scoring, so it has no stage of its own
+        counts = {InvoiceRow: [0, 0], TransactionRow: [0, 0]}
+
+        def counted(rows, last_id):
+            for row in rows:
+                counts[type(row)][row.id > last_id] += 1
+                yield row
+
+        invoice_count = invoice_query.order_by(None).count()
+        scored_invoices = join.score_candidates(
+            stream(
+                invoice_query.filter(Invoice.invoice_date.isnot(None)),
+                Invoice,
+                InvoiceRow,
+                Invoice.invoice_date,
+                Invoice.id,
+            ),
+            stream(
+                transaction_query,
+                BankTransaction,
+                TransactionRow,
+                BankTransaction.posted_at,
+                BankTransaction.id,
+            ),
+            counted(
+                stream(invoice_query, Invoice, InvoiceRow, Invoice.amount_cents, Invoice.id),
+                last_invoice_id,
+            ),
+            counted(
+                stream(
+                    transaction_query,
+                    BankTransaction,
+                    TransactionRow,
+                    BankTransaction.amount_cents,
+                    BankTransaction.id,
+                ),
+                last_transaction_id,
+            ),
+            skip_pair,
+        )
+
+        def with_counts():
+            yield from scored_invoices
+            old_invoices, new_invoices = counts[InvoiceRow]
+            old_transactions, new_transactions = counts[TransactionRow]
+            metrics.invoices = old_invoices + new_invoices
+            metrics.transactions = old_transactions + new_transactions
+            metrics.pairs_in_scope = (
+                old_invoices * new_transactions + new_invoices * metrics.transactions
+            )
+
+        return with_counts(), invoice_count
+
+    @staticmethod
+    def _retain_candidates(
+        scored_invoices: Iterable,
+        transaction_id_at: Callable[[int], int],
+        top_k: int,
+        candidate_rows: List[dict],
+    ) -> Iterator:
+        """
+        Pass scored invoices through, appending the top_k candidates of each
+        to candidate_rows. Only the best top_k of an invoice are ever kept,
+        so memory stays O(invoices x top_k) however many candidates it has.
+        """
+        for invoice, scored in scored_invoices:
+            # Best score first, ties to the earliest transaction
+            for position, score in heapq.nsmallest(
+                top_k, scored, key=lambda candidate: (-candidate[1], candidate[0])
+            ):
+                candidate_rows.append(
+                    {
+                        "tenant_id": invoice.tenant_id,
+                        "invoice_id": invoice.id,
+                        "bank_transaction_id": transaction_id_at(position),
+                        "score": score,
+                    }
                 )
+            yield invoice, scored
 
-                if score > best_score and score >= Decimal("30.0"):  # Minimum threshold
-                    best_score = score
-                    best_match = transaction
+    @staticmethod
+    def _store_candidates(
+        db: Session, tenant_id: int, candidate_rows: List[dict], top_k: int, replace: bool
+    ) -> None:
+        """
+        Store the run's ranked candidates. A full run replaces the tenant's
+        candidates; an incremental run adds to them, then trims every
+        invoice back to its top_k.
+        """
+        if replace:
+            db.execute(delete(RankedCandidate).where(RankedCandidate.tenant_id == tenant_id))
+        if not candidate_rows:
+            return
+        db.execute(insert(RankedCandidate), candidate_rows)
+        if replace:
+            return
 
-            if best_match:
-                match = Match(
-                    tenant_id=tenant_id,
-                    invoice_id=invoice.id,
-                    bank_transaction_id=best_match.id,
-                    score=best_score,
-                    status=MatchStatus.PROPOSED,
+        ranked = (
+            select(
+                RankedCandidate.id,
+                func.row_number()
+                .over(
+                    partition_by=RankedCandidate.invoice_id,
+                    order_by=(
+                        RankedCandidate.score.desc(),
+                        RankedCandidate.bank_transaction_id,
+                    ),
                 )
-                db.add(match)
-                matches.append(match)
+                .label("rank"),
+            )
+            .where(RankedCandidate.tenant_id == tenant_id)
+            .subquery()
+        )
+        db.execute(
+            delete(RankedCandidate).where(
+                RankedCandidate.id.in_(select(ranked.c.id).where(ranked.c.rank > top_k))
+            )
+        )
 
-        db.commit()
+    @staticmethod
+    def _insert_matches(db: Session, match_rows: List[dict]) -> List[Match]:
+        """
+        Insert match rows with a single bulk INSERT ... RETURNING statement.
+        The returned matches are detached from the session.
+        """
+        if not match_rows:
+            return []
 
-        # Refresh matches
+        # RETURNING order is not guaranteed for multi-row inserts, so restore
+        # the input order from the (invoice, transaction) pair of each row
+        order = {
+            (row["invoice_id"], row["bank_transaction_id"]): position
+            for position, row in enumerate(match_rows)
+        }
+        matches = db.scalars(insert(Match).returning(Match), match_rows).all()
+        matches = sorted(
+            matches, key=lambda m: order[(m.invoice_id, m.bank_transaction_id)]
+        )
         for match in matches:
-            db.refresh(match)
-
+            db.expunge(match)
         return matches
 
     @staticmethod
     def confirm_match(
         db: Session, tenant_id: int, match_id: int
     ) -> Optional[Match]:
-        """Confirm a proposed match."""
+        """
+        Confirm a proposed match like a single-id review_matches: competing
+        proposals of its invoice or transaction are rejected and their
+        invoices get their next ranked candidate promoted.
+        Returns None when the match is not found or not proposed, and raises
+        ValueError when its invoice or transaction is already confirmed.
+        """
+        review = ReconciliationService.review_matches(db, tenant_id, [match_id], [])
+        _, _, outcome = review.outcomes[0]
+        if outcome == "conflict":
+            raise ValueError(
+                f"Match {match_id} conflicts with a confirmed match of its "
+                "invoice or transaction"
+            )
+        if outcome != "confirmed":
+            return None
+        return db.get(Match, match_id)
+
+    @staticmethod
+    def reject_match(
+        db: Session, tenant_id: int, match_id: int
+    ) -> Optional[Tuple[Match, Optional[Match]]]:
+        """
+        Reject a proposed match and promote the invoice's next ranked
+        candidate to a new proposal, without rescoring.
+        Returns (rejected match, promoted match or None). Nothing is promoted
+        while the invoice has another proposal or is no longer open;
+        candidates already matched to the invoice or confirmed for another
+        invoice (or, with the one_to_one RECONCILE_ASSIGNMENT, proposed for
+        one) are skipped.
+        """
         match = (
             db.query(Match)
             .filter(
@@ -188,16 +742,382 @@ class ReconciliationService:
         if not match:
             return None
 
-        # Update match status
-        match.status = MatchStatus.CONFIRMED
-
-        # Update invoice status
-        invoice = match.invoice
-        invoice.status = InvoiceStatus.MATCHED
+        match.status = MatchStatus.REJECTED
+        db.flush()
+        promoted = ReconciliationService._promote_candidates(
+            db, tenant_id, [match.invoice_id]
+        )
 
         db.commit()
         db.refresh(match)
-        return match
+        if promoted:
+            db.add_all(promoted)
+            return match, promoted[0]
+        return match, None
+
+    @staticmethod
+    def review_matches(
+        db: Session,
+        tenant_id: int,
+        confirm_ids: List[int],
+        reject_ids: List[int],
+    ) -> MatchReview:
+        """
+        Confirm and reject matches in one transaction, with set-based updates.
+        Every other proposed match of a confirmed match's invoice or
+        transaction is rejected too, and invoices left without a proposal
+        get their next ranked candidate promoted as in reject_match.
+        Each requested id gets an outcome: "confirmed", "rejected",
+        "not_found", "not_proposed" or "conflict" (listed in both confirm and
+        reject, or its invoice or transaction is already confirmed, by an
+        earlier id of the batch or an earlier review). Ids with other
+        outcomes are not acted on, though a proposal competing with a
+        confirmed one is still rejected with it.
+        """
+        confirm_ids = list(dict.fromkeys(confirm_ids))
+        reject_ids = list(dict.fromkeys(reject_ids))
+        requested = [(match_id, "confirm") for match_id in confirm_ids] + [
+            (match_id, "reject") for match_id in reject_ids
+        ]
+        both = set(confirm_ids) & set(reject_ids)
+
+        found = {
+            match_id: (invoice_id, transaction_id, status)
+            for match_id, invoice_id, transaction_id, status in db.query(
+                Match.id, Match.invoice_id, Match.bank_transaction_id, Match.status
+            ).filter(
+                and_(
+                    Match.tenant_id == tenant_id,
+                    Match.id.in_([match_id for match_id, _ in requested]),
+                )
+            )
+        }
+
+        # Invoices and transactions confirmed before this review
+        confirm_found = [found[match_id] for match_id in confirm_ids if match_id in found]
+        taken_invoice_ids, taken_transaction_ids = set(), set()
+        if confirm_found:
+            for invoice_id, transaction_id in db.query(
+                Match.invoice_id, Match.bank_transaction_id
+            ).filter(
+                and_(
+                    Match.tenant_id == tenant_id,
+                    Match.status == MatchStatus.CONFIRMED,
+                    or_(
+                        Match.invoice_id.in_({row[0] for row in confirm_found}),
+                        Match.bank_transaction_id.in_({row[1] for row in confirm_found}),
+                    ),
+                )
+            ):
+                taken_invoice_ids.add(invoice_id)
+                taken_transaction_ids.add(transaction_id)
+
+        outcomes = []
+        confirmed, rejected = [], []
+        confirmed_invoice_ids, confirmed_transaction_ids = set(), set()
+        for match_id, action in requested:
+            if match_id not in found:
+                outcome = "not_found"
+            elif found[match_id][2] != MatchStatus.PROPOSED:
+                outcome = "not_proposed"
+            elif match_id in both:
+                outcome = "conflict"
+            elif action == "reject":
+                outcome = "rejected"
+                rejected.append(match_id)
+            else:
+                invoice_id, transaction_id, _ = found[match_id]
+                if (
+                    invoice_id in confirmed_invoice_ids
+                    or invoice_id in taken_invoice_ids
+                    or transaction_id in confirmed_transaction_ids
+                    or transaction_id in taken_transaction_ids
+                ):
+                    outcome = "conflict"
+                else:
+                    outcome = "confirmed"
+                    confirmed.append(match_id)
+                    confirmed_invoice_ids.add(invoice_id)
+                    confirmed_transaction_ids.add(transaction_id)
+            outcomes.append((match_id, action, outcome))
+
+        auto_rejected = ReconciliationService._confirm_matches(
+            db,
+            tenant_id,
+            confirmed,
+            confirmed_invoice_ids,
+            confirmed_transaction_ids,
+            keep_ids=rejected,
+        )
+        if rejected:
+            db.execute(
+                update(Match)
+                .where(Match.id.in_(rejected))
+                .values(status=MatchStatus.REJECTED),
+                execution_options={"synchronize_session": False},
+            )
+        # Invoices that lost a proposal to a confirmation elsewhere are
+        # promoted like explicitly rejected ones
+        promoted = ReconciliationService._promote_candidates(
+            db,
+            tenant_id,
+            {found[match_id][0] for match_id in rejected}
+            | {invoice_id for _, invoice_id in auto_rejected},
+        )
+
+        db.commit()
+        # Re-attach the promoted matches, like the matches of a run
+        db.add_all(promoted)
+        return MatchReview(outcomes, [match_id for match_id, _ in auto_rejected], promoted)
+
+    @staticmethod
+    def _confirm_matches(
+        db: Session,
+        tenant_id: int,
+        match_ids: List[int],
+        invoice_ids: set,
+        transaction_ids: set,
+        keep_ids: Iterable[int] = (),
+    ) -> List[Tuple[int, int]]:
+        """
+        Confirm matches with set-based updates, without committing: mark
+        their invoices (invoice_ids) MATCHED and reject every other proposal
+        of those invoices or their transactions (transaction_ids) except
+        keep_ids. Returns the (match id, invoice id) of each rejected proposal.
+        """
+        if not match_ids:
+            return []
+        db.execute(
+            update(Match)
+            .where(Match.id.in_(match_ids))
+            .values(status=MatchStatus.CONFIRMED),
+            execution_options={"synchronize_session": False},
+        )
+        auto_rejected = db.execute(
+            update(Match)
+            .where(
+                and_(
+                    Match.tenant_id == tenant_id,
+                    Match.status == MatchStatus.PROPOSED,
+                    or_(
+                        Match.invoice_id.in_(invoice_ids),
+                        Match.bank_transaction_id.in_(transaction_ids),
+                    ),
+                    ~Match.id.in_(list(keep_ids)),
+                )
+            )
+            .values(status=MatchStatus.REJECTED)
+            .returning(Match.id, Match.invoice_id),
+            execution_options={"synchronize_session": False},
+        ).all()
+
+        # Bulk updates skip the ORM events, so bump the invoice versions
+        # and purge their scores here
+        db.execute(
+            update(Invoice)
+            .where(Invoice.id.in_(invoice_ids))
+            .values(status=InvoiceStatus.MATCHED, version=Invoice.version + 1),
+            execution_options={"synchronize_session": False},
+        )
+        db.execute(delete(PairScore).where(PairScore.invoice_id.in_(invoice_ids)))
+        for invoice_id in invoice_ids:
+            score_cache.invalidate_invoice(invoice_id)
+        db.execute(
+            delete(RankedCandidate).where(
+                and_(
+                    RankedCandidate.tenant_id == tenant_id,
+                    RankedCandidate.invoice_id.in_(invoice_ids),
+                )
+            )
+        )
+        return sorted(auto_rejected)
+
+    @staticmethod
+    def _auto_confirm(
+        db: Session, tenant_id: int, matches: List[Match], threshold: Decimal
+    ) -> Tuple[List[Match], List[Tuple[int, int]]]:
+        """
+        Confirm the new matches scoring at least threshold with an exact
+        amount, without committing; best score first, so each invoice and
+        transaction is confirmed at most once, also across the batches of a
+        streamed run. New matches whose invoice or transaction was confirmed
+        before (e.g. by an earlier batch) are rejected. The statuses of the
+        given matches are updated in place.
+        Returns the confirmed matches and the (match id, invoice id) of each
+        competing proposal rejected with them.
+        """
+        if not matches:
+            return [], []
+        taken = db.execute(
+            select(Match.invoice_id, Match.bank_transaction_id).where(
+                and_(
+                    Match.tenant_id == tenant_id,
+                    Match.status == MatchStatus.CONFIRMED,
+                    or_(
+                        Match.invoice_id.in_({m.invoice_id for m in matches}),
+                        Match.bank_transaction_id.in_(
+                            {m.bank_transaction_id for m in matches}
+                        ),
+                    ),
+                )
+            )
+        ).all()
+        taken_invoice_ids = {invoice_id for invoice_id, _ in taken}
+        taken_transaction_ids = {transaction_id for _, transaction_id in taken}
+        lost = [
+            m
+            for m in matches
+            if m.invoice_id in taken_invoice_ids
+            or m.bank_transaction_id in taken_transaction_ids
+        ]
+        if lost:
+            db.execute(
+                update(Match)
+                .where(Match.id.in_([m.id for m in lost]))
+                .values(status=MatchStatus.REJECTED),
+                execution_options={"synchronize_session": False},
+            )
+            for match in lost:
+                set_committed_value(match, "status", MatchStatus.REJECTED)
+        lost_rejected = [(m.id, m.invoice_id) for m in lost]
+
+        lost_ids = {m.id for m in lost}
+        qualifying = [m for m in matches if m.score >= threshold and m.id not in lost_ids]
+        if not qualifying:
+            return [], lost_rejected
+        exact_ids = set(
+            db.scalars(
+                select(Match.id)
+                .join(Invoice, Invoice.id == Match.invoice_id)
+                .join(BankTransaction, BankTransaction.id == Match.bank_transaction_id)
+                .where(
+                    and_(
+                        Match.id.in_([m.id for m in qualifying]),
+                        Invoice.amount_cents == BankTransaction.amount_cents,
+                    )
+                )
+            )
+        )
+
+        confirmed = []
+        invoice_ids, transaction_ids = set(), set()
+        for match in sorted(qualifying, key=lambda m: (-m.score, m.id)):
+            if (
+                match.id in exact_ids
+                and match.invoice_id not in invoice_ids
+                and match.bank_transaction_id not in transaction_ids
+            ):
+                confirmed.append(match)
+                invoice_ids.add(match.invoice_id)
+                transaction_ids.add(match.bank_transaction_id)
+
+        auto_rejected = ReconciliationService._confirm_matches(
+            db, tenant_id, [m.id for m in confirmed], invoice_ids, transaction_ids
+        )
+        # The matches are detached; set their statuses without marking them changed
+        confirmed_ids = {m.id for m in confirmed}
+        rejected_ids = {match_id for match_id, _ in auto_rejected}
+        for match in matches:
+            if match.id in confirmed_ids:
+                set_committed_value(match, "status", MatchStatus.CONFIRMED)
+            elif match.id in rejected_ids:
+                set_committed_value(match, "status", MatchStatus.REJECTED)
+        return confirmed, sorted(lost_rejected + auto_rejected)
+
+    @staticmethod
+    def _promote_candidates(
+        db: Session, tenant_id: int, invoice_ids, one_to_one: Optional[bool] = None
+    ) -> List[Match]:
+        """
+        Propose the best remaining ranked candidate of each open invoice
+        without a proposal. Candidates already matched to the invoice or
+        confirmed for another invoice are skipped. With one_to_one (default:
+        whether RECONCILE_ASSIGNMENT is "one_to_one"), candidates proposed
+        for another invoice are skipped too, and the invoices take their
+        candidates in score order as in that assignment, so no transaction
+        gets two proposals. The promoted matches are inserted without
+        committing and are detached from the session.
+        """
+        if not invoice_ids:
+            return []
+        if one_to_one is None:
+            one_to_one = ASSIGNMENT_MODE == "one_to_one"
+        eligible = (
+            db.query(Invoice.id)
+            .filter(
+                and_(
+                    Invoice.tenant_id == tenant_id,
+                    Invoice.id.in_(invoice_ids),
+                    Invoice.status == InvoiceStatus.OPEN,
+                    ~Invoice.id.in_(
+                        db.query(Match.invoice_id).filter(
+                            and_(
+                                Match.tenant_id == tenant_id,
+                                Match.status == MatchStatus.PROPOSED,
+                            )
+                        )
+                    ),
+                )
+            )
+        )
+        taken_statuses = [MatchStatus.CONFIRMED]
+        if one_to_one:
+            taken_statuses.append(MatchStatus.PROPOSED)
+        taken = (
+            db.query(Match.id)
+            .filter(
+                and_(
+                    Match.tenant_id == tenant_id,
+                    Match.bank_transaction_id == RankedCandidate.bank_transaction_id,
+                    or_(
+                        Match.invoice_id == RankedCandidate.invoice_id,
+                        Match.status.in_(taken_statuses),
+                    ),
+                )
+            )
+            .exists()
+        )
+        order = (
+            RankedCandidate.invoice_id,
+            RankedCandidate.score.desc(),
+            RankedCandidate.bank_transaction_id,
+        )
+        if one_to_one:
+            order = (order[1], order[0], order[2])
+        candidates = (
+            db.query(RankedCandidate)
+            .filter(
+                and_(
+                    RankedCandidate.tenant_id == tenant_id,
+                    RankedCandidate.invoice_id.in_(eligible),
+                    ~taken,
+                )
+            )
+            .order_by(*order)
+        )
+
+        best = {}
+        promoted_transaction_ids = set()
+        for candidate in candidates:
+            if candidate.invoice_id in best or (
+                one_to_one and candidate.bank_transaction_id in promoted_transaction_ids
+            ):
+                continue
+            best[candidate.invoice_id] = candidate
+            promoted_transaction_ids.add(candidate.bank_transaction_id)
+        return ReconciliationService._insert_matches(
+            db,
+            [
+                {
+                    "tenant_id": tenant_id,
+                    "invoice_id": candidate.invoice_id,
+                    "bank_transaction_id": candidate.bank_transaction_id,
+                    "score": candidate.score,
+                    "status": MatchStatus.PROPOSED,
+                }
+                for _, candidate in sorted(best.items())
+            ],
+        )
 
     @staticmethod
     def get_match(
@@ -0,0 +1,215 @@
+"""Pair score cache keyed on record versions."""
+from collections import OrderedDict
+from decimal import Decimal
+from sqlalchemy import and_, delete, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+from typing import Dict, Optional, Set, Tuple
+import os
+import threading
+from app.models.invoice import Invoice
+from app.models.bank_transaction import BankTransaction
+from app.models.pair_score import PairScore
+
+# Pair scores kept in memory (0 disables the cache)
+SCORE_CACHE_SIZE = int(os.getenv("SCORE_CACHE_SIZE", "100000"))
+
+# Also persist scores looked up one pair at a time (explain) in pair_scores
+SCORE_CACHE_PERSIST = os.getenv("SCORE_CACHE_PERSIST", "false").lower() == "true"
+
+# (invoice id, invoice version, transaction id, transaction version, scorer fingerprint)
+ScoreKey = Tuple[int, int, int, int, str]
+
+
+class ScoreCache:
+    """
+    LRU cache of pair scores with an optional persistent table tier.
+    Keys carry both record versions, so an updated record never hits an old
+    score; entries of updated or deleted records are also purged eagerly.
+    """
+
+    def __init__(self, max_size: int, persist: bool = False):
+        self.max_size = max_size
+        self.persist = persist
+        self._lock = threading.Lock()
+        self._scores: "OrderedDict[ScoreKey, Decimal]" = OrderedDict()
+        self._by_invoice: Dict[int, Set[ScoreKey]] = {}
+        self._by_transaction: Dict[int, Set[ScoreKey]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether scores are cached at all."""
+        return self.max_size > 0
+
+    def get(self, key: ScoreKey, db: Optional[Session] = None) -> Optional[Decimal]:
+        """Return the cached score of key, or None on a miss."""
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+                self.hits += 1
+                return score
+
+        if db is not None and self.persist:
+            text = (
+                db.query(PairScore.score)
+                .filter(
+                    and_(
+                        PairScore.invoice_id == key[0],
+                        PairScore.invoice_version == key[1],
+                        PairScore.bank_transaction_id == key[2],
+                        PairScore.transaction_version == key[3],
+                        PairScore.scorer == key[4],
+                    )
+                )
+                .scalar()
+            )
+            if text is not None:
+                score = Decimal(text)
+                with self._lock:
+                    self.persistent_hits += 1
+                    self._store(key, score)
+                return score
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(
+        self,
+        key: ScoreKey,
+        score: Decimal,
+        db: Optional[Session] = None,
+        tenant_id: Optional[int] = None,
+    ) -> None:
+        """Cache the score of key; with db and persistence on, also store it."""
+        with self._lock:
+            self._store(key, score)
+
+        if db is not None and self.persist:
+            # A separate session, so the caller's transaction is left alone
+            with Session(bind=db.get_bind()) as session:
+                session.add(
+                    PairScore(
+                        tenant_id=tenant_id,
+                        invoice_id=key[0],
+                        invoice_version=key[1],
+                        bank_transaction_id=key[2],
+                        transaction_version=key[3],
+                        scorer=key[4],
+                        score=str(score),
+                    )
+                )
+                try:
+                    session.commit()
+                except IntegrityError:
+                    # Stored concurrently by another request
+                    session.rollback()
+
+    def _store(self, key: ScoreKey, score: Decimal) -> None:
+        """Insert into the LRU tier, evicting the least recently used entries."""
+        if not self.enabled:
+            return
+        if key not in self._scores:
+            self._by_invoice.setdefault(key[0], set()).add(key)
+            self._by_transaction.setdefault(key[2], set()).add(key)
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        while len(self._scores) > self.max_size:
+            evicted, _ = self._scores.popitem(last=False)
+            self._unindex(evicted)
+            self.evictions += 1
+
+    def _unindex(self, key: ScoreKey) -> None:
+        """Remove a key from the per-record indexes."""
+        for index, record_id in ((self._by_invoice, key[0]), (self._by_transaction, key[2])):
+            keys = index.get(record_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[record_id]
+
+    def invalidate_invoice(self, invoice_id: int) -> None:
+        """Drop the in-memory scores of an invoice."""
+        with self._lock:
+            self._invalidate(self._by_invoice.get(invoice_id, ()))
+
+    def invalidate_transaction(self, transaction_id: int) -> None:
+        """Drop the in-memory scores of a transaction."""
+        with self._lock:
+            self._invalidate(self._by_transaction.get(transaction_id, ()))
+
+    def _invalidate(self, keys) -> None:
+        """Drop the given keys."""
+        for key in list(keys):
+            self._scores.pop(key, None)
+            self._unindex(key)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop every in-memory score."""
+        with self._lock:
+            self._scores.clear()
+            self._by_invoice.clear()
+            self._by_transaction.clear()
+
+    def stats(self) -> dict:
+        """Return the size and hit/miss counters of the cache."""
+        with self._lock:
+            lookups = self.hits + self.persistent_hits + self.misses
+            return {
+                "size": len(self._scores),
+                "max_size": self.max_size,
+                "persist": self.persist,
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.persistent_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+score_cache = ScoreCache(SCORE_CACHE_SIZE, persist=SCORE_CACHE_PERSIST)
+
+
+def _purge_invoice(mapper, connection, target) -> None:
+    """Purge the scores of an updated or deleted invoice."""
+    score_cache.invalidate_invoice(target.id)
+    connection.execute(delete(PairScore).where(PairScore.invoice_id == target.id))
+
+
+def _purge_transaction(mapper, connection, target) -> None:
+    """Purge the scores of an updated or deleted transaction."""
+    score_cache.invalidate_transaction(target.id)
+    connection.execute(
+        delete(PairScore).where(PairScore.bank_transaction_id == target.id)
+    )
+
+
+def _purge_if_modified(purge):
+    """Wrap a purge listener so updates without changed columns are ignored."""
+
+    def listener(mapper, connection, target) -> None:
+        if object_session(target).is_modified(target, include_collections=False):
+            purge(mapper, connection, target)
+
+    return listener
+
+
+event.listen(Invoice, "before_update", _purge_if_modified(_purge_invoice))
+event.listen(Invoice, "before_delete", _purge_invoice)
+event.listen(BankTransaction, "before_update", _purge_if_modified(_purge_transaction))
+event.listen(BankTransaction, "before_delete", _purge_transaction)
+
+
+@event.listens_for(Invoice.__table__, "after_drop")
+@event.listens_for(BankTransaction.__table__, "after_drop")
+def _clear_on_drop(target, connection, **kw) -> None:
+    """Ids are reused once their table is recreated, so forget every score."""
+    score_cache.clear()
@@ -0,0 +1,202 @@
+"""Match scoring."""
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, FrozenSet, Hashable, Optional, Tuple
+from app.models.invoice import Invoice
+from app.models.bank_transaction import BankTransaction
+from app.services.similarity import get_similarity
+
+# Matches with a lower score are not proposed
+MIN_MATCH_SCORE = Decimal("30.0")
+MAX_MATCH_SCORE = Decimal("100.0")
+
+# Points for an exact amount match and (tolerance percent, points) tiers
+EXACT_AMOUNT_POINTS = 40
+AMOUNT_TIERS = ((1, 30), (5, 15))
+
+# (maximum day difference, points) tiers of the date component
+DATE_TIERS = ((0, 20), (1, 15), (3, 10), (7, 5))
+
+# Maximum points of the text similarity component and the vendor bonus
+MAX_TEXT_POINTS = 20
+VENDOR_POINTS = 10
+
+# Part of every cached score's key; bump when the scoring rules change
+SCORING_VERSION = 1
+
+
+def amount_points(invoice_cents: int, transaction_cents: int) -> int:
+    """Points for how close the transaction amount is to the invoice amount, in cents."""
+    if invoice_cents == transaction_cents:
+        return EXACT_AMOUNT_POINTS
+    if invoice_cents > 0:
+        # |diff| / invoice <= percent / 100, without leaving integers
+        diff = abs(invoice_cents - transaction_cents) * 100
+        for percent, points in AMOUNT_TIERS:
+            if diff <= invoice_cents * percent:
+                return points
+    return 0
+
+
+def date_points(invoice_date: Optional[datetime], posted_at: Optional[datetime]) -> int:
+    """Points for how close the posting date is to the invoice date."""
+    if invoice_date and posted_at:
+        date_diff = abs((invoice_date - posted_at).days)
+        for days, points in DATE_TIERS:
+            if date_diff <= days:
+                return points
+    return 0
+
+
+def similarity_points(ratio: float) -> Decimal:
+    """Points of the text component for a similarity ratio between 0 and 1."""
+    return Decimal(str(ratio * MAX_TEXT_POINTS))
+
+
+def vendor_points(
+    vendor_name: Optional[str], transaction_description: Optional[str]
+) -> int:
+    """Bonus points when the vendor name appears in the transaction description."""
+    if vendor_name is not None and transaction_description:
+        if vendor_name.lower() in transaction_description.lower():
+            return VENDOR_POINTS
+    return 0
+
+
+class PairScorer:
+    """
+    Scores invoice/transaction pairs for one reconciliation run.
+    Each description is normalized by the text similarity backend only once.
+    With a vendor automaton (see app.services.vendor_automaton), each
+    description is also scanned for vendor mentions only once and the vendor
+    bonus is a set-membership check on the invoice's vendor_id; without one,
+    the invoice's vendor name is searched in the description.
+    With a score cache (see app.services.score_cache), scores are looked up
+    by record versions first; db additionally enables its persistent tier.
+    """
+
+    def __init__(self, similarity=None, vendors=None, cache=None, db=None):
+        self.similarity = similarity or get_similarity()
+        self.vendors = vendors
+        self.cache = cache if cache is not None and cache.enabled else None
+        self.db = db
+        self._prepared: Dict[str, object] = {}
+        self._mentions: Dict[str, FrozenSet[int]] = {}
+        # Scores only depend on the records and on these rules
+        self.fingerprint = "{}:{}:{}".format(
+            SCORING_VERSION,
+            self.similarity.name,
+            vendors.fingerprint if vendors is not None else "names",
+        )
+
+    def prepare(self, text: str):
+        """Return the normalized representation of a description."""
+        prepared = self._prepared.get(text)
+        if prepared is None:
+            prepared = self.similarity.prepare(text)
+            self._prepared[text] = prepared
+        return prepared
+
+    def exact_key(self, text: str) -> Hashable:
+        """Key shared by all descriptions that can earn full text points against text."""
+        return self.similarity.exact_key(self.prepare(text))
+
+    def text_points(
+        self,
+        invoice_description: Optional[str],
+        transaction_description: Optional[str],
+    ) -> Decimal:
+        """Points for the similarity of the two descriptions."""
+        if invoice_description and transaction_description:
+            return similarity_points(
+                self.similarity.ratio(
+                    self.prepare(invoice_description),
+                    self.prepare(transaction_description),
+                )
+            )
+        return Decimal("0.0")
+
+    def has_vendor(self, invoice: Invoice) -> bool:
+        """Whether the invoice can earn the vendor bonus at all."""
+        if self.vendors is None:
+            return invoice.vendor is not None
+        return invoice.vendor_id is not None
+
+    def vendor_points(self, invoice: Invoice, transaction: BankTransaction) -> int:
+        """Bonus points when the invoice's vendor is mentioned in the description."""
+        if self.vendors is None:
+            if invoice.vendor is None:
+                return 0
+            return vendor_points(invoice.vendor.name, transaction.description)
+
+        description = transaction.description
+        if invoice.vendor_id is None or not description:
+            return 0
+        mentioned = self._mentions.get(description)
+        if mentioned is None:
+            mentioned = self.vendors.mentioned(description)
+            self._mentions[description] = mentioned
+        return VENDOR_POINTS if invoice.vendor_id in mentioned else 0
+
+    def cache_key(
+        self, invoice: Invoice, transaction: BankTransaction
+    ) -> Optional[Tuple[int, int, int, int, str]]:
+        """Score cache key of a pair, or None for unsaved records."""
+        if None in (invoice.id, invoice.version, transaction.id, transaction.version):
+            return None
+        return (
+            invoice.id,
+            invoice.version,
+            transaction.id,
+            transaction.version,
+            self.fingerprint,
+        )
+
+    def lookup(self, invoice: Invoice, transaction: BankTransaction) -> Optional[Decimal]:
+        """Return the cached score of a pair, if any."""
+        if self.cache is None:
+            return None
+        key = self.cache_key(invoice, transaction)
+        return self.cache.get(key, self.db) if key else None
+
+    def remember(self, invoice: Invoice, transaction: BankTransaction, score: Decimal) -> None:
+        """Store the score of a pair in the cache."""
+        if self.cache is None:
+            return
+        key = self.cache_key(invoice, transaction)
+        if key:
+            self.cache.put(key, score, self.db, invoice.tenant_id)
+
+    def score(self, invoice: Invoice, transaction: BankTransaction) -> Decimal:
+        """Calculate the match score of a pair (see calculate_match_score)."""
+        score = self.lookup(invoice, transaction)
+        if score is None:
+            score = self.compute(invoice, transaction)
+            self.remember(invoice, transaction, score)
+        return score
+
+    def compute(self, invoice: Invoice, transaction: BankTransaction) -> Decimal:
+        """Calculate the match score of a pair without the cache."""
+        # Integer components first; only the text component is fractional
+        points = amount_points(invoice.amount_cents, transaction.amount_cents)
+        points += date_points(invoice.invoice_date, transaction.posted_at)
+        points += self.vendor_points(invoice, transaction)
+        score = Decimal(points) + self.text_points(
+            invoice.description, transaction.description
+        )
+        return min(score, MAX_MATCH_SCORE)
+
+
+def calculate_match_score(
+    invoice: Invoice, transaction: BankTransaction, vendors=None
+) -> Decimal:
+    """
+    Calculate a match score between 0 and 100.
+    Scoring algorithm:
+    - Exact amount match: 40 points (30 within 1%, 15 within 5%)
+    - Date proximity: 20 points same day (15 within 1, 10 within 3, 5 within 7 days)
+    - Text similarity (description): 20 points, using RECONCILE_TEXT_SIMILARITY
+    - Vendor name (or, with a vendor automaton, an alias) in transaction
+      description: 10 points (bonus)
+    """
+    return PairScorer(vendors=vendors).score(invoice, transaction)
@@ -0,0 +1,71 @@
+"""Scoring backends for reconciliation."""
+from decimal import Decimal
+from typing import Iterator, List, Sequence, Set, Tuple
+from app.models.invoice import Invoice
+from app.models.bank_transaction import BankTransaction
+from app.services.candidate_index import CandidateIndex
+from app.services.scoring import MIN_MATCH_SCORE, PairScorer
+
+# (invoice, [(transaction position, score), ...]) for pairs at or above the threshold
+ScoredInvoice = Tuple[Invoice, List[Tuple[int, Decimal]]]
+
+
+class PythonScoringBackend:
+    """Scores the candidates of the blocking index one pair at a time."""
+
+    name = "python"
+
+    def __init__(self, vendors=None, cache=None):
+        self.vendors = vendors
+        self.cache = cache
+        self.pairs_scored = 0
+        self._transactions = None
+        self._scorer = None
+        self._index = None
+
+    def score_candidates(
+        self,
+        invoices: Sequence[Invoice],
+        transactions: Sequence[BankTransaction],
+        excluded_pairs: Set[Tuple[int, int]],
+    ) -> Iterator[ScoredInvoice]:
+        """
+        Yield each invoice with its scored candidates, in transaction order.
+        Pairs in excluded_pairs ((invoice_id, transaction_id)) are skipped.
+        The index is reused while the same transactions list is passed in.
+        """
+        if self._transactions is not transactions:
+            self._transactions = transactions
+            self._scorer = PairScorer(vendors=self.vendors, cache=self.cache)
+            self._index = CandidateIndex(transactions, self._scorer)
+        scorer = self._scorer
+        candidate_index = self._index
+
+        for invoice in invoices:
+            scored = []
+            for position in candidate_index.candidates(invoice):
+                transaction = transactions[position]
+                if (invoice.id, transaction.id) in excluded_pairs:
+                    continue
+
+                score = scorer.score(invoice, transaction)
+                self.pairs_scored += 1
+                if score >= MIN_MATCH_SCORE:
+                    scored.append((position, score))
+            yield invoice, scored
+
+
+def get_scoring_backend(name: str, vendors=None, cache=None):
+    """
+    Return the scoring backend registered under name.
+    vendors is the tenant's vendor automaton used for the vendor bonus and
+    cache an optional score cache consulted before scoring a pair.
+    """
+    if name == PythonScoringBackend.name:
+        return PythonScoringBackend(vendors=vendors, cache=cache)
+    if name == "numpy":
+        # Imported lazily so NumPy is only required when the backend is used
+        from app.services.scoring_numpy import NumpyScoringBackend
+
+        return NumpyScoringBackend(vendors=vendors, cache=cache)
+    raise ValueError(f"Unknown scoring backend {name}")
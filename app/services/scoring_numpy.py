@@ -0,0 +1,194 @@
+"""NumPy scoring backend for reconciliation."""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from app.models.invoice import Invoice
+from app.models.bank_transaction import BankTransaction
+from app.services.scoring import (
+    AMOUNT_TIERS,
+    DATE_TIERS,
+    EXACT_AMOUNT_POINTS,
+    MAX_MATCH_SCORE,
+    MAX_TEXT_POINTS,
+    MIN_MATCH_SCORE,
+    VENDOR_POINTS,
+    PairScorer,
+)
+from app.services.scoring_backends import ScoredInvoice
+
+# Upper bound on the cells of one invoice x transaction score matrix
+CHUNK_CELLS = 1 << 21
+
+_MICROS_PER_DAY = 86_400_000_000
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+
+
+def _timestamp_micros(value: Optional[datetime]) -> int:
+    """Microseconds since the epoch, so day differences floor like timedelta.days."""
+    if value is None:
+        return 0
+    epoch = _EPOCH if value.tzinfo is None else _EPOCH_UTC
+    return (value - epoch) // timedelta(microseconds=1)
+
+
+class _Columns:
+    """Column arrays of the fields the amount and date components need."""
+
+    def __init__(self, cents, dates, descriptions, scorer: PairScorer, codes: Dict, missing: int):
+        self.cents = np.array(cents, dtype=np.int64)
+        self.has_date = np.array([d is not None for d in dates], dtype=bool)
+        self.micros = np.array([_timestamp_micros(d) for d in dates], dtype=np.int64)
+        self.has_description = np.array([bool(d) for d in descriptions], dtype=bool)
+        # Equal codes mean equal exact keys; missing descriptions never match
+        self.description_code = np.array(
+            [
+                codes.setdefault(scorer.exact_key(d), len(codes)) if d else missing
+                for d in descriptions
+            ],
+            dtype=np.int64,
+        )
+
+
+class NumpyScoringBackend:
+    """
+    Computes the amount and date components for blocks of invoices against
+    all transactions at once, then runs the text and vendor components only
+    on pairs whose upper bound can still reach the threshold.
+    """
+
+    name = "numpy"
+
+    def __init__(self, vendors=None, cache=None):
+        self.vendors = vendors
+        self.cache = cache
+        self.pairs_scored = 0
+        self._transactions = None
+        self._scorer = None
+        self._codes = None
+        self._columns = None
+
+    def score_candidates(
+        self,
+        invoices: Sequence[Invoice],
+        transactions: Sequence[BankTransaction],
+        excluded_pairs: Set[Tuple[int, int]],
+    ) -> Iterator[ScoredInvoice]:
+        """
+        Yield each invoice with its scored candidates, in transaction order.
+        Pairs in excluded_pairs ((invoice_id, transaction_id)) are skipped.
+        Transaction columns are reused while the same list is passed in.
+        """
+        if not transactions:
+            for invoice in invoices:
+                yield invoice, []
+            return
+
+        if self._transactions is not transactions:
+            self._transactions = transactions
+            self._scorer = PairScorer(vendors=self.vendors, cache=self.cache)
+            self._codes = {}
+            self._columns = _Columns(
+                [t.amount_cents for t in transactions],
+                [t.posted_at for t in transactions],
+                [t.description for t in transactions],
+                self._scorer,
+                self._codes,
+                missing=-2,
+            )
+        scorer = self._scorer
+        transaction_columns = self._columns
+        invoice_columns = _Columns(
+            [i.amount_cents for i in invoices],
+            [i.invoice_date for i in invoices],
+            [i.description for i in invoices],
+            scorer,
+            self._codes,
+            missing=-1,
+        )
+        has_vendor = np.array([scorer.has_vendor(i) for i in invoices], dtype=bool)
+
+        positions = {t.id: p for p, t in enumerate(transactions)}
+        excluded: Dict[int, Set[int]] = {}
+        for invoice_id, transaction_id in excluded_pairs:
+            if transaction_id in positions:
+                excluded.setdefault(invoice_id, set()).add(positions[transaction_id])
+
+        rows_per_chunk = max(1, CHUNK_CELLS // len(transactions))
+        for start in range(0, len(invoices), rows_per_chunk):
+            stop = min(start + rows_per_chunk, len(invoices))
+            amount, date, reachable = self._score_block(
+                invoice_columns, transaction_columns, has_vendor, start, stop
+            )
+
+            for row, invoice in enumerate(invoices[start:stop]):
+                skipped = excluded.get(invoice.id, ())
+                scored: List[Tuple[int, Decimal]] = []
+                for position in np.flatnonzero(reachable[row]).tolist():
+                    if position in skipped:
+                        continue
+
+                    transaction = transactions[position]
+                    self.pairs_scored += 1
+                    score = scorer.lookup(invoice, transaction)
+                    if score is None:
+                        points = int(amount[row, position]) + int(date[row, position])
+                        points += scorer.vendor_points(invoice, transaction)
+                        score = Decimal(points) + scorer.text_points(
+                            invoice.description, transaction.description
+                        )
+                        score = min(score, MAX_MATCH_SCORE)
+                        scorer.remember(invoice, transaction, score)
+                    if score >= MIN_MATCH_SCORE:
+                        scored.append((position, score))
+                yield invoice, scored
+
+    @staticmethod
+    def _score_block(
+        invoices: _Columns,
+        transactions: _Columns,
+        has_vendor: np.ndarray,
+        start: int,
+        stop: int,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the amount points, date points and reachable mask of a block."""
+        invoice_cents = invoices.cents[start:stop, None]
+
+        # Amount component; integer cents make the tolerance checks exact
+        diff = np.abs(invoice_cents - transactions.cents[None, :])
+        amount = np.zeros(diff.shape, dtype=np.int64)
+        positive = invoice_cents > 0
+        for percent, points in reversed(AMOUNT_TIERS):
+            amount[positive & (diff * 100 <= invoice_cents * percent)] = points
+        amount[diff == 0] = EXACT_AMOUNT_POINTS
+
+        # Date component
+        days = np.abs(
+            np.floor_divide(
+                invoices.micros[start:stop, None] - transactions.micros[None, :],
+                _MICROS_PER_DAY,
+            )
+        )
+        dated = invoices.has_date[start:stop, None] & transactions.has_date[None, :]
+        date = np.zeros(days.shape, dtype=np.int64)
+        for max_days, points in reversed(DATE_TIERS):
+            date[dated & (days <= max_days)] = points
+
+        # Upper bound of the full score; a bound exactly at the threshold is
+        # only reachable with a perfect text score, i.e. equal exact keys
+        described = transactions.has_description[None, :]
+        max_text = np.where(
+            invoices.has_description[start:stop, None] & described, MAX_TEXT_POINTS, 0
+        )
+        max_vendor = np.where(has_vendor[start:stop, None] & described, VENDOR_POINTS, 0)
+        bound = amount + date + max_text + max_vendor
+        threshold = int(MIN_MATCH_SCORE)
+        identical = (
+            invoices.description_code[start:stop, None]
+            == transactions.description_code[None, :]
+        )
+        reachable = (bound > threshold) | (
+            (bound == threshold) & ((max_text == 0) | identical)
+        )
+        return amount, date, reachable
@@ -0,0 +1,107 @@
+"""Text similarity backends for match scoring."""
+import os
+import re
+from difflib import SequenceMatcher
+from typing import Dict, FrozenSet, Hashable, Optional
+
+# Similarity backend for the text component: sequence (default), trigram or token_set
+TEXT_SIMILARITY = os.getenv("RECONCILE_TEXT_SIMILARITY", "sequence")
+
+_NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse punctuation and whitespace into single spaces."""
+    return _NON_ALPHANUMERIC.sub(" ", text.lower()).strip()
+
+
+def _dice(a: FrozenSet, b: FrozenSet) -> float:
+    """Dice coefficient of two sets."""
+    if not a or not b:
+        return 0.0
+    return 2.0 * len(a & b) / (len(a) + len(b))
+
+
+class SequenceSimilarity:
+    """
+    difflib.SequenceMatcher ratio of the lowercased texts (the original scorer).
+    The matcher analysis of each transaction text is cached, so a text is only
+    analysed once per instance; create one instance per run.
+    """
+
+    name = "sequence"
+
+    def __init__(self):
+        self._matchers: Dict[str, SequenceMatcher] = {}
+
+    def prepare(self, text: str) -> str:
+        """Return the representation compared by ratio."""
+        return text.lower()
+
+    def exact_key(self, prepared: str) -> Hashable:
+        """Key that is equal for any two texts whose ratio is 1.0."""
+        return prepared
+
+    def ratio(self, a: str, b: str) -> float:
+        """Similarity of a (invoice) to b (transaction) between 0 and 1."""
+        matcher = self._matchers.get(b)
+        if matcher is None:
+            matcher = SequenceMatcher(None)
+            matcher.set_seq2(b)
+            self._matchers[b] = matcher
+        matcher.set_seq1(a)
+        return matcher.ratio()
+
+
+class TrigramSimilarity:
+    """Dice coefficient of the character trigrams of the normalized texts."""
+
+    name = "trigram"
+
+    def prepare(self, text: str) -> FrozenSet[str]:
+        """Return the trigram set of the normalized text."""
+        normalized = normalize_text(text)
+        if not normalized:
+            return frozenset()
+        padded = f"  {normalized} "
+        return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    def exact_key(self, prepared: FrozenSet[str]) -> Hashable:
+        """Key that is equal for any two texts whose ratio is 1.0."""
+        return prepared
+
+    def ratio(self, a: FrozenSet[str], b: FrozenSet[str]) -> float:
+        """Similarity of two trigram sets between 0 and 1."""
+        return _dice(a, b)
+
+
+class TokenSetSimilarity:
+    """Dice coefficient of the word sets of the normalized texts."""
+
+    name = "token_set"
+
+    def prepare(self, text: str) -> FrozenSet[str]:
+        """Return the token set of the normalized text."""
+        return frozenset(normalize_text(text).split())
+
+    def exact_key(self, prepared: FrozenSet[str]) -> Hashable:
+        """Key that is equal for any two texts whose ratio is 1.0."""
+        return prepared
+
+    def ratio(self, a: FrozenSet[str], b: FrozenSet[str]) -> float:
+        """Similarity of two token sets between 0 and 1."""
+        return _dice(a, b)
+
+
+SIMILARITY_BACKENDS = {
+    backend.name: backend
+    for backend in (SequenceSimilarity, TrigramSimilarity, TokenSetSimilarity)
+}
+
+
+def get_similarity(name: Optional[str] = None):
+    """Return a new instance of the named (or configured) similarity backend."""
+    name = name or TEXT_SIMILARITY
+    if name not in SIMILARITY_BACKENDS:
+        raise ValueError(f"Unknown text similarity backend {name}")
+    return SIMILARITY_BACKENDS[name]()
@@ -0,0 +1,267 @@
+"""Incremental parsers for uploaded bank statements (CSV and OFX/QFX)."""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+from typing import BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Union
+import codecs
+import csv
+import html
+import io
+import re
+
+# Bytes read from an uploaded statement at a time
+READ_SIZE = 64 * 1024
+
+# Characters of an OFX element kept; the rest of a longer one is skipped, so
+# text without tags never grows the read buffer past this
+MAX_ELEMENT_SIZE = 64 * 1024
+
+# CSV header names (lowercased) accepted for each transaction field
+CSV_COLUMNS = {
+    "external_id": ("external_id", "id", "fitid", "reference", "transaction_id"),
+    "posted_at": ("posted_at", "date", "posted", "transaction_date"),
+    "amount": ("amount", "value"),
+    "currency": ("currency",),
+    "description": ("description", "memo", "payee", "name", "details"),
+}
+
+# Date formats tried after ISO 8601
+DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%Y %H:%M:%S")
+
+# OFX elements: "<TAG>text", "</TAG>"; SGML (OFX 1.x) leaves leaf elements unclosed
+_OFX_ELEMENT = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+# OFX date: YYYYMMDD[HHMM[SS[.XXX]]][[+-]offset[:TZ]]
+_OFX_DATE = re.compile(
+    r"(\d{4})(\d{2})(\d{2})(?:(\d{2})(\d{2})(\d{2})?)?(?:\.\d+)?"
+    r"(?:\[([+-]?\d+(?:\.\d+)?)(?::[^\]]*)?\])?$"
+)
+
+
+class StatementRow(NamedTuple):
+    """One parsed statement transaction: its values, or why it is invalid."""
+    line: int
+    values: Optional[Dict]
+    error: Optional[str] = None
+
+
+def parse_amount(text: Optional[str]) -> Decimal:
+    """Parse an amount, allowing thousands separators."""
+    if not text or not text.strip():
+        raise ValueError("amount is required")
+    try:
+        amount = Decimal(text.strip().replace(",", ""))
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {text.strip()!r}")
+    if not amount.is_finite():
+        raise ValueError(f"invalid amount {text.strip()!r}")
+    return amount
+
+
+def parse_date(text: Optional[str]) -> datetime:
+    """Parse an ISO 8601 or MM/DD/YYYY date."""
+    if not text or not text.strip():
+        raise ValueError("posted_at is required")
+    text = text.strip()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            pass
+    raise ValueError(f"invalid date {text!r}")
+
+
+def parse_ofx_date(text: Optional[str]) -> datetime:
+    """Parse an OFX date, keeping its UTC offset when it has one."""
+    match = _OFX_DATE.match(text.strip()) if text else None
+    if not match:
+        raise ValueError(f"invalid DTPOSTED {text!r}")
+    year, month, day, hour, minute, second, offset = match.groups()
+    tzinfo = timezone(timedelta(hours=float(offset))) if offset else None
+    return datetime(
+        int(year),
+        int(month),
+        int(day),
+        int(hour or 0),
+        int(minute or 0),
+        int(second or 0),
+        tzinfo=tzinfo,
+    )
+
+
+def parse_csv(stream: BinaryIO) -> Iterator[StatementRow]:
+    """
+    Parse a CSV statement with a header row, one transaction per record.
+    Columns are matched by name (see CSV_COLUMNS); posted_at and amount are
+    required. Records are read one at a time; a record the csv module
+    rejects in strict mode (a field over csv.field_size_limit(), or an
+    unterminated or misplaced quote) is reported as invalid and reading
+    goes on with the next line.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    reader = csv.reader(text, strict=True)
+
+    def records() -> Iterator[Union[List[str], StatementRow]]:
+        while True:
+            try:
+                yield next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield StatementRow(reader.line_num, None, f"invalid CSV record: {e}")
+
+    rows = records()
+    header = next(rows, None)
+    if header is None:
+        return
+    if isinstance(header, StatementRow):
+        yield header
+        return
+    names = [name.strip().lower() for name in header]
+    positions = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in names:
+                positions[field] = names.index(alias)
+                break
+    missing = [field for field in ("posted_at", "amount") if field not in positions]
+    if missing:
+        yield StatementRow(reader.line_num, None, f"missing column(s): {', '.join(missing)}")
+        return
+
+    for record in rows:
+        if isinstance(record, StatementRow):
+            yield record
+            continue
+        if not any(cell.strip() for cell in record):
+            continue
+        fields = {
+            field: record[position].strip() if position < len(record) else ""
+            for field, position in positions.items()
+        }
+        try:
+            values = {
+                "external_id": fields.get("external_id") or None,
+                "posted_at": parse_date(fields["posted_at"]),
+                "amount": parse_amount(fields["amount"]),
+                "currency": fields.get("currency") or "USD",
+                "description": fields.get("description") or None,
+            }
+        except ValueError as e:
+            yield StatementRow(reader.line_num, None, str(e))
+            continue
+        yield StatementRow(reader.line_num, values)
+
+
+def _ofx_elements(stream: BinaryIO) -> Iterator[tuple]:
+    """
+    Yield (line, closing, tag, text) for each OFX element, reading in chunks.
+    Element text past MAX_ELEMENT_SIZE is skipped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    line = 1
+    # Newlines skipped at the end of pending, while skipping the rest of an
+    # over-long element
+    skipped_lines = 0
+    skipping = False
+    while True:
+        chunk = stream.read(READ_SIZE)
+        text = decoder.decode(chunk, final=not chunk)
+        if skipping:
+            # Drop the rest of an over-long element, up to the next "<"
+            cut = text.find("<")
+            skipped_lines += text.count("\n", 0, cut if cut >= 0 else len(text))
+            if cut < 0:
+                text = ""
+            else:
+                text, skipping = text[cut:], False
+        skipped_at = len(pending)
+        pending += text
+        # An element's text runs up to the next "<", so only elements
+        # before the last "<" are complete
+        end = len(pending) if not chunk else pending.rfind("<")
+        if end > 0:
+            position = 0
+            for match in _OFX_ELEMENT.finditer(pending, 0, end):
+                line += pending.count("\n", position, match.start())
+                if match.start() >= skipped_at:
+                    line, skipped_lines = line + skipped_lines, 0
+                position = match.start()
+                yield line, bool(match.group(1)), match.group(2).upper(), match.group(3)
+            line += pending.count("\n", position, end) + skipped_lines
+            skipped_lines = 0
+            pending = pending[end:]
+        if len(pending) > MAX_ELEMENT_SIZE:
+            # What is left is a single element still missing its end
+            skipped_lines += pending.count("\n", MAX_ELEMENT_SIZE)
+            pending = pending[:MAX_ELEMENT_SIZE]
+            skipping = True
+        if not chunk:
+            return
+
+
+def parse_ofx(stream: BinaryIO) -> Iterator[StatementRow]:
+    """
+    Parse the transactions (STMTTRN) of an OFX or QFX statement, SGML or
+    XML. FITID becomes the external id, NAME and MEMO the description, and
+    the statement's CURDEF the currency.
+    """
+    currency = "USD"
+    fields: Optional[Dict[str, str]] = None
+    start = 0
+
+    def finish() -> StatementRow:
+        try:
+            values = {
+                "external_id": fields.get("FITID") or None,
+                "posted_at": parse_ofx_date(fields.get("DTPOSTED")),
+                "amount": parse_amount(fields.get("TRNAMT")),
+                "currency": currency,
+                "description": " - ".join(
+                    dict.fromkeys(
+                        text for text in (fields.get("NAME"), fields.get("MEMO")) if text
+                    )
+                )
+                or None,
+            }
+        except ValueError as e:
+            return StatementRow(start, None, str(e))
+        return StatementRow(start, values)
+
+    for line, closing, tag, text in _ofx_elements(stream):
+        if tag == "STMTTRN" or (closing and tag == "BANKTRANLIST"):
+            # SGML files may leave a transaction unclosed before the next one
+            if fields is not None:
+                yield finish()
+                fields = None
+            if tag == "STMTTRN" and not closing:
+                fields, start = {}, line
+        elif closing:
+            continue
+        elif fields is not None:
+            fields[tag] = html.unescape(text.strip())
+        elif tag == "CURDEF":
+            currency = text.strip() or currency
+
+    if fields is not None:
+        yield finish()
+
+
+PARSERS: Dict[str, Callable[[BinaryIO], Iterator[StatementRow]]] = {
+    "csv": parse_csv,
+    "ofx": parse_ofx,
+}
+
+# File extensions of each format
+EXTENSIONS = {".csv": "csv", ".ofx": "ofx", ".qfx": "ofx"}
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """Statement format for a file name, or None if unknown."""
+    if not filename or "." not in filename:
+        return None
+    return EXTENSIONS.get(filename[filename.rfind("."):].lower())
@@ -1,6 +1,7 @@
 """Tenant service."""
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
 from app.models.tenant import Tenant
 
 
@@ -8,9 +9,11 @@ class TenantService:
     """Service for tenant operations."""
 
     @staticmethod
-    def create_tenant(db: Session, name: str) -> Tenant:
+    def create_tenant(
+        db: Session, name: str, auto_confirm_threshold: Optional[Decimal] = None
+    ) -> Tenant:
         """Create a new tenant."""
-        tenant = Tenant(name=name)
+        tenant = Tenant(name=name, auto_confirm_threshold=auto_confirm_threshold)
         db.add(tenant)
         db.commit()
         db.refresh(tenant)
@@ -22,6 +25,28 @@ class TenantService:
         return db.query(Tenant).filter(Tenant.id == tenant_id).first()
 
     @staticmethod
-    def list_tenants(db: Session, skip: int = 0, limit: int = 100) -> List[Tenant]:
-        """List all tenants."""
-        return db.query(Tenant).offset(skip).limit(limit).all()
+    def update_tenant(
+        db: Session, tenant_id: int, changes: Dict[str, Any]
+    ) -> Optional[Tenant]:
+        """Set the given tenant fields; returns None if the tenant does not exist."""
+        tenant = TenantService.get_tenant(db, tenant_id)
+        if not tenant:
+            return None
+        for field, value in changes.items():
+            setattr(tenant, field, value)
+        db.commit()
+        db.refresh(tenant)
+        return tenant
+
+    @staticmethod
+    def list_tenants(
+        db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[Tenant]:
+        """
+        List tenants in id order. Pass the last id of a page as after_id to
+        get the next one without an offset scan.
+        """
+        query = db.query(Tenant)
+        if after_id is not None:
+            query = query.filter(Tenant.id > after_id)
+        return query.order_by(Tenant.id).offset(skip).limit(limit).all()
@@ -1,13 +1,37 @@
 """Bank transaction service."""
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional, Dict, Any
-from datetime import datetime
-from decimal import Decimal
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from typing import Iterable, List, Optional, Dict, Any, Sequence, Tuple, Union
 from app.models.bank_transaction import BankTransaction
 from app.models.tenant import Tenant
-from app.models.idempotency import IdempotencyKey
-import json
+from app.models.idempotency import TransactionHash, transaction_hash
+from app.money import to_cents
+from app.schemas.transaction import TransactionCreate, TransactionResponse
+from app.services.idempotency_store import StoredResponse, idempotency_store
+from app.services.statement_parsers import StatementRow
+import os
+import time
+
+# Rows per INSERT ... RETURNING statement when importing transactions
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+
+# Rows per committed chunk when importing an uploaded statement
+STATEMENT_CHUNK_SIZE = int(os.getenv("IMPORT_STATEMENT_CHUNK_SIZE", "5000"))
+
+# Invalid statement rows described in an import report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+# How an upsert treats a transaction whose external id the tenant already
+# has: keep the stored one, or overwrite it
+ON_CONFLICT_MODES = ("skip", "update")
+
+# Columns an upsert overwrites; a transaction whose values all match is skipped
+UPSERT_COLUMNS = ("posted_at", "amount", "amount_cents", "currency", "description")
+
+# Dialects with INSERT ... ON CONFLICT
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
 
 
 class TransactionService:
@@ -19,9 +43,36 @@ class TransactionService:
         tenant_id: int,
         transactions: List[Dict[str, Any]],
         idempotency_key: Optional[str] = None,
-    ) -> tuple[List[BankTransaction], bool]:
+        chunk_size: Optional[int] = None,
+    ) -> tuple[List[Union[BankTransaction, TransactionResponse]], bool]:
+        """
+        Import bank transactions given as dicts, validated as
+        TransactionCreate; see import_transaction_models.
+        Returns (transactions, is_duplicate).
+        """
+        return TransactionService.import_transaction_models(
+            db,
+            tenant_id,
+            [TransactionCreate.model_validate(tx_data) for tx_data in transactions],
+            idempotency_key,
+            chunk_size,
+        )
+
+    @staticmethod
+    def import_transaction_models(
+        db: Session,
+        tenant_id: int,
+        transactions: Sequence[TransactionCreate],
+        idempotency_key: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+    ) -> tuple[List[Union[BankTransaction, TransactionResponse]], bool]:
         """
-        Import bank transactions in bulk with idempotency support.
+        Import validated bank transactions in bulk with idempotency support.
+        Amounts and dates are inserted and hashed as they are, never
+        converted. Rows are inserted chunk_size (IMPORT_CHUNK_SIZE) at a
+        time, all in one transaction with the idempotency key, which stores
+        the serialized transactions: a replay returns them as
+        TransactionResponse models without reading the transactions table.
         Returns (transactions, is_duplicate).
         """
         # Verify tenant exists
@@ -30,76 +81,412 @@ class TransactionService:
             raise ValueError(f"Tenant {tenant_id} not found")
 
         # Check idempotency if key provided
-        if idempotency_key:
-            existing_key = (
-                db.query(IdempotencyKey)
-                .filter(
-                    and_(
-                        IdempotencyKey.key == idempotency_key,
-                        IdempotencyKey.tenant_id == tenant_id,
-                    )
-                )
-                .first()
+        stored = idempotency_store.get(db, tenant_id, idempotency_key)
+        if stored:
+            # Same request, return cached response
+            response_data = TransactionService._replay(stored, transactions)
+            if "transactions" in response_data:
+                return [
+                    TransactionResponse.model_validate(t) for t in response_data["transactions"]
+                ], True
+            # Stored before responses were, or by another kind of import
+            transaction_ids = response_data.get("transaction_ids", [])
+            if not transaction_ids:
+                return [], True
+            imported_transactions = (
+                db.query(BankTransaction)
+                .filter(BankTransaction.id.in_(transaction_ids))
+                .all()
             )
+            return imported_transactions, True
 
-            if existing_key:
-                # Check if payload matches
-                payload_hash = IdempotencyKey.hash_payload(transactions)
-                if existing_key.payload_hash == payload_hash:
-                    # Same request, return cached response
-                    if existing_key.response_data:
-                        response_data = json.loads(existing_key.response_data)
-                        transaction_ids = response_data.get("transaction_ids", [])
-                        imported_transactions = (
-                            db.query(BankTransaction)
-                            .filter(BankTransaction.id.in_(transaction_ids))
-                            .all()
-                        )
-                        return imported_transactions, True
-                    return [], True
-                else:
-                    # Different payload with same key - conflict
-                    raise ValueError(
-                        f"Idempotency key {idempotency_key} already used with different payload"
-                    )
-
-        # Import transactions
+        # Import transactions, one INSERT ... RETURNING per chunk; ids and
+        # server defaults come back with the insert instead of per-row refreshes
+        rows = [TransactionService._transaction_row(tenant_id, tx) for tx in transactions]
+        # RETURNING order is not guaranteed. SQLite assigns ids in VALUES
+        # order, so its rows are sorted by id; asking SQLAlchemy to sort them
+        # would make it insert SQLite rows one statement at a time
+        sort_by_id = db.get_bind().dialect.name == "sqlite"
+        statement = insert(BankTransaction).returning(
+            BankTransaction, sort_by_parameter_order=not sort_by_id
+        )
         imported = []
-        for tx_data in transactions:
-            transaction = BankTransaction(
-                tenant_id=tenant_id,
-                external_id=tx_data.get("external_id"),
-                posted_at=datetime.fromisoformat(tx_data["posted_at"])
-                if isinstance(tx_data.get("posted_at"), str)
-                else tx_data.get("posted_at"),
-                amount=Decimal(str(tx_data["amount"])),
-                currency=tx_data.get("currency", "USD"),
-                description=tx_data.get("description"),
+        chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+        try:
+            for offset in range(0, len(rows), chunk_size):
+                chunk = db.scalars(statement, rows[offset:offset + chunk_size]).all()
+                if sort_by_id:
+                    chunk = sorted(chunk, key=lambda t: t.id)
+                imported.extend(chunk)
+        except IntegrityError:
+            db.rollback()
+            TransactionService._raise_already_imported(tenant_id)
+
+        # Store idempotency key if provided
+        if idempotency_key:
+            payload_hash = TransactionHash()
+            for tx in transactions:
+                payload_hash.update(tx)
+            idempotency_store.save(
+                db,
+                tenant_id,
+                idempotency_key,
+                payload_hash.hexdigest(),
+                {
+                    "transactions": [
+                        TransactionResponse.model_validate(t).model_dump(mode="json")
+                        for t in imported
+                    ]
+                },
             )
-            db.add(transaction)
-            imported.append(transaction)
 
-        db.flush()  # Get IDs
+        # Detach the transactions so the commit does not expire the values
+        # returned by the insert, then re-attach them
+        for transaction in imported:
+            db.expunge(transaction)
+        db.commit()
+        db.add_all(imported)
+
+        return imported, False
+
+    @staticmethod
+    def import_transaction_stream(
+        db: Session,
+        tenant_id: int,
+        transactions: Iterable[TransactionCreate],
+        idempotency_key: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Import transactions (as for import_transaction_models) from an
+        iterable consumed once, inserting chunk_size (IMPORT_CHUNK_SIZE) rows
+        at a time. Only the current chunk is held in memory, and every chunk
+        is committed in one transaction with the idempotency key, whose
+        payload hash is computed over the stream and equals that of the same
+        list given to import_transaction_models.
+        Returns (report of rows imported with the first and last id, is_duplicate).
+        """
+        # Verify tenant exists
+        tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
+        if not tenant:
+            raise ValueError(f"Tenant {tenant_id} not found")
+
+        stored = idempotency_store.get(db, tenant_id, idempotency_key)
+        if stored:
+            # The stream must be read whole to compare its hash
+            response_data = TransactionService._replay(stored, transactions)
+            ids = TransactionService._transaction_ids(response_data)
+            if ids is not None:
+                # Stored by import_transaction_models
+                response_data = {
+                    "imported": len(ids),
+                    "first_id": ids[0] if ids else None,
+                    "last_id": ids[-1] if ids else None,
+                }
+            return response_data, True
+
+        payload_hash = TransactionHash()
+        report = {"imported": 0, "first_id": None, "last_id": None}
+        statement = insert(BankTransaction).returning(BankTransaction.id)
+        chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+        chunk = []
+
+        def insert_chunk() -> None:
+            ids = db.scalars(statement, chunk).all()
+            ids += [i for i in (report["first_id"], report["last_id"]) if i is not None]
+            report["first_id"], report["last_id"] = min(ids), max(ids)
+            report["imported"] += len(chunk)
+            chunk.clear()
+
+        try:
+            for tx in transactions:
+                payload_hash.update(tx)
+                chunk.append(TransactionService._transaction_row(tenant_id, tx))
+                if len(chunk) >= chunk_size:
+                    insert_chunk()
+            if chunk:
+                insert_chunk()
+        except BaseException as e:
+            # The stream failed part way (e.g. an invalid line); drop the
+            # chunks already inserted
+            db.rollback()
+            if isinstance(e, IntegrityError):
+                TransactionService._raise_already_imported(tenant_id)
+            raise
 
-        # Store idempotency key if provided
         if idempotency_key:
-            payload_hash = IdempotencyKey.hash_payload(transactions)
-            response_data = json.dumps({"transaction_ids": [t.id for t in imported]})
-            idempotency_record = IdempotencyKey(
-                key=idempotency_key,
-                tenant_id=tenant_id,
-                payload_hash=payload_hash,
-                response_data=response_data,
+            idempotency_store.save(
+                db, tenant_id, idempotency_key, payload_hash.hexdigest(), report
             )
-            db.add(idempotency_record)
+        db.commit()
+        return report, False
 
+    @staticmethod
+    def upsert_transactions(
+        db: Session,
+        tenant_id: int,
+        transactions: Iterable[TransactionCreate],
+        on_conflict: str = "skip",
+        idempotency_key: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Import transactions (a list or a stream consumed once), resolving
+        external ids the tenant already has per on_conflict: "skip" keeps
+        the stored transaction, "update" overwrites its UPSERT_COLUMNS
+        (skipping it if they are unchanged). Rows are upserted chunk_size
+        (IMPORT_CHUNK_SIZE) at a time with INSERT ... ON CONFLICT, all in
+        one transaction with the idempotency key.
+        Returns (report of rows inserted, updated and skipped, is_duplicate).
+        """
+        if on_conflict not in ON_CONFLICT_MODES:
+            raise ValueError(f"Unknown on_conflict mode {on_conflict!r}")
+        # Verify tenant exists
+        tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
+        if not tenant:
+            raise ValueError(f"Tenant {tenant_id} not found")
+
+        stored = idempotency_store.get(db, tenant_id, idempotency_key)
+        if stored:
+            response_data = TransactionService._replay(stored, transactions)
+            if "inserted" not in response_data:
+                # Stored by import_transaction_models or import_transaction_stream
+                ids = TransactionService._transaction_ids(response_data)
+                response_data = {
+                    "inserted": len(ids) if ids is not None else response_data.get("imported", 0),
+                    "updated": 0,
+                    "skipped": 0,
+                }
+            return response_data, True
+
+        payload_hash = TransactionHash()
+        report = {"inserted": 0, "updated": 0, "skipped": 0}
+        statement = TransactionService._upsert_statement(db, on_conflict)
+        chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+        chunk = []
+        external_ids = set()
+
+        def upsert_chunk() -> None:
+            inserted, updated, skipped = TransactionService._upsert_rows(db, statement, chunk)
+            report["inserted"] += inserted
+            report["updated"] += updated
+            report["skipped"] += skipped
+            chunk.clear()
+            external_ids.clear()
+
+        try:
+            for tx in transactions:
+                payload_hash.update(tx)
+                # A statement may not upsert the same row twice, so a repeated
+                # external id starts a new chunk and meets the earlier one as
+                # a conflict
+                if tx.external_id is not None:
+                    if tx.external_id in external_ids:
+                        upsert_chunk()
+                    external_ids.add(tx.external_id)
+                chunk.append(TransactionService._transaction_row(tenant_id, tx))
+                if len(chunk) >= chunk_size:
+                    upsert_chunk()
+            if chunk:
+                upsert_chunk()
+        except BaseException:
+            db.rollback()
+            raise
+
+        if idempotency_key:
+            idempotency_store.save(
+                db, tenant_id, idempotency_key, payload_hash.hexdigest(), report
+            )
         db.commit()
+        return report, False
 
-        # Refresh to get all fields
-        for transaction in imported:
-            db.refresh(transaction)
+    @staticmethod
+    def _upsert_statement(db: Session, on_conflict: str):
+        """
+        INSERT of transaction rows resolving (tenant, external id) conflicts
+        per on_conflict, returning the id, version and external id of each
+        row written.
+        """
+        dialect = db.get_bind().dialect.name
+        if dialect not in _UPSERT_INSERTS:
+            raise ValueError(f"Upserts are not supported on {dialect}")
+        statement = _UPSERT_INSERTS[dialect](BankTransaction)
+        index_elements = [BankTransaction.tenant_id, BankTransaction.external_id]
+        if on_conflict == "skip":
+            statement = statement.on_conflict_do_nothing(index_elements=index_elements)
+        else:
+            excluded = statement.excluded
+            statement = statement.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={
+                    **{column: excluded[column] for column in UPSERT_COLUMNS},
+                    # Bulk writes skip the version bump
+                    "version": BankTransaction.version + 1,
+                },
+                # amount_cents stands in for amount, which SQLite may store inexactly
+                where=or_(
+                    *(
+                        getattr(BankTransaction, column).is_distinct_from(excluded[column])
+                        for column in UPSERT_COLUMNS
+                        if column != "amount"
+                    )
+                ),
+            )
+        return statement.returning(
+            BankTransaction.id, BankTransaction.version, BankTransaction.external_id
+        )
 
-        return imported, False
+    @staticmethod
+    def _upsert_rows(db: Session, statement, rows: List[Dict[str, Any]]) -> Tuple[int, int, int]:
+        """Execute an upsert statement for rows; return (inserted, updated, skipped)."""
+        written = db.execute(statement, rows).all()
+        # New rows start at version 1; updates bump it
+        inserted = sum(1 for row in written if row.version == 1)
+        return inserted, len(written) - inserted, len(rows) - len(written)
+
+    @staticmethod
+    def _raise_already_imported(tenant_id: int) -> None:
+        """Raise the error of an import repeating one of the tenant's external ids."""
+        raise ValueError(
+            f"External ids already imported for tenant {tenant_id} (or repeated in "
+            f"the import); import with on_conflict skip or update"
+        )
+
+    @staticmethod
+    def _replay(
+        stored: StoredResponse, transactions: Iterable[TransactionCreate]
+    ) -> Dict[str, Any]:
+        """
+        The stored response of a used idempotency key, if transactions are
+        the payload it was used with; raises ValueError otherwise.
+        """
+        # Keys stored before the canonical hash are compared with a legacy one
+        payload_hash = transaction_hash(stored.payload_hash)
+        for tx in transactions:
+            payload_hash.update(tx)
+        if stored.payload_hash != payload_hash.hexdigest():
+            # Different payload with same key - conflict
+            raise ValueError(
+                f"Idempotency key {stored.key} already used with different payload"
+            )
+        return stored.response
+
+    @staticmethod
+    def _transaction_ids(response_data: Dict[str, Any]) -> Optional[List[int]]:
+        """Ids of the transactions in a response stored by import_transaction_models."""
+        if "transactions" in response_data:
+            return [t["id"] for t in response_data["transactions"]]
+        return response_data.get("transaction_ids")
+
+    @staticmethod
+    def import_statement(
+        db: Session,
+        tenant_id: int,
+        rows: Iterable[StatementRow],
+        chunk_size: Optional[int] = None,
+        on_conflict: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Import parsed statement rows as they are read, committing every
+        chunk_size (IMPORT_STATEMENT_CHUNK_SIZE) valid rows; invalid rows are
+        skipped and reported. Only the current chunk is held in memory, and
+        chunks committed before a failure are kept. Without on_conflict, rows
+        repeating an external id the tenant already has (or an earlier row
+        has) are skipped and reported as failed with their line, since the
+        chunks before them are already committed; with on_conflict (see
+        upsert_transactions) they are skipped or updated.
+        Returns a report of rows read, imported (new), updated, skipped and
+        failed, the first MAX_REPORTED_ERRORS errors, and the import rate.
+        """
+        if on_conflict is not None and on_conflict not in ON_CONFLICT_MODES:
+            raise ValueError(f"Unknown on_conflict mode {on_conflict!r}")
+        # Verify tenant exists
+        tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
+        if not tenant:
+            raise ValueError(f"Tenant {tenant_id} not found")
+
+        report = {
+            "rows": 0,
+            "imported": 0,
+            "updated": 0,
+            "skipped": 0,
+            "failed": 0,
+            "errors": [],
+        }
+        statement = TransactionService._upsert_statement(db, on_conflict or "skip")
+        chunk_size = chunk_size or STATEMENT_CHUNK_SIZE
+        start = time.perf_counter()
+        chunk, lines = [], []
+        external_ids = set()
+
+        def fail(line: int, error: str) -> None:
+            report["failed"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"line": line, "error": error})
+
+        def commit_chunk() -> None:
+            if on_conflict is None:
+                written = {
+                    row.external_id for row in db.execute(statement, chunk).all()
+                }
+                for values, line in zip(chunk, lines):
+                    external_id = values["external_id"]
+                    if external_id is None or external_id in written:
+                        report["imported"] += 1
+                    else:
+                        fail(line, f"external_id {external_id!r} already imported")
+            else:
+                inserted, updated, skipped = TransactionService._upsert_rows(
+                    db, statement, chunk
+                )
+                report["imported"] += inserted
+                report["updated"] += updated
+                report["skipped"] += skipped
+            db.commit()
+            chunk.clear()
+            lines.clear()
+            external_ids.clear()
+
+        for row in rows:
+            report["rows"] += 1
+            if row.error:
+                fail(row.line, row.error)
+                continue
+            external_id = row.values.get("external_id")
+            if external_id is not None:
+                # As in upsert_transactions, a repeated external id starts a new chunk
+                if external_id in external_ids:
+                    commit_chunk()
+                external_ids.add(external_id)
+            chunk.append(
+                TransactionService._transaction_row(
+                    tenant_id, TransactionCreate.model_construct(**row.values)
+                )
+            )
+            lines.append(row.line)
+            if len(chunk) >= chunk_size:
+                commit_chunk()
+        if chunk:
+            commit_chunk()
+
+        seconds = time.perf_counter() - start
+        report["duration_seconds"] = seconds
+        report["rows_per_second"] = report["rows"] / seconds if seconds else 0.0
+        return report
+
+    @staticmethod
+    def _transaction_row(tenant_id: int, tx: TransactionCreate) -> Dict[str, Any]:
+        """Insert parameters of a validated transaction."""
+        return {
+            "tenant_id": tenant_id,
+            "external_id": tx.external_id,
+            "posted_at": tx.posted_at,
+            "amount": tx.amount,
+            # Bulk inserts skip the validator keeping amount_cents in sync
+            "amount_cents": to_cents(tx.amount),
+            "currency": tx.currency or "USD",
+            "description": tx.description,
+        }
 
     @staticmethod
     def get_transaction(
@@ -0,0 +1,189 @@
+"""Per-tenant vendor mention detection."""
+from collections import OrderedDict, deque
+import hashlib
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, object_session
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import os
+import threading
+from app.models.vendor import Vendor
+from app.models.vendor_alias import VendorAlias
+
+# Tenant automatons cached in memory, least recently used evicted first
+VENDOR_AUTOMATON_CACHE_SIZE = int(os.getenv("VENDOR_AUTOMATON_CACHE_SIZE", "256"))
+
+# Count and highest id of a tenant's vendors and of its aliases
+VendorStamp = Tuple[int, Optional[int], int, Optional[int]]
+
+
+class VendorAutomaton:
+    """
+    Aho-Corasick automaton over the lowercased names and aliases of a
+    tenant's vendors. mentioned() scans a description once and returns the
+    ids of every vendor whose name or alias occurs in it, the same test as
+    name.lower() in description.lower() for each vendor.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, int]]):
+        patterns = sorted((pattern.lower(), vendor_id) for pattern, vendor_id in patterns)
+        # Identifies the vendor list, e.g. in score cache keys
+        self.fingerprint = hashlib.sha1(repr(patterns).encode()).hexdigest()[:16]
+
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[set] = [set()]
+        always = set()
+        for pattern, vendor_id in patterns:
+            if not pattern:
+                # An empty name occurs in every description
+                always.add(vendor_id)
+                continue
+            state = 0
+            for char in pattern:
+                if char not in goto[state]:
+                    goto.append({})
+                    outputs.append(set())
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            outputs[state].add(vendor_id)
+
+        # Failure links in breadth-first order; each state also reports the
+        # matches of its longest proper suffix state
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in goto[state].items():
+                queue.append(child)
+                suffix = fail[state]
+                while suffix and char not in goto[suffix]:
+                    suffix = fail[suffix]
+                fail[child] = goto[suffix].get(char, 0) if state else 0
+                outputs[child] |= outputs[fail[child]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [frozenset(found) for found in outputs]
+        self._always = frozenset(always)
+
+    def mentioned(self, text: Optional[str]) -> FrozenSet[int]:
+        """Return the ids of the vendors mentioned in text."""
+        if not text:
+            return frozenset()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found = set(self._always)
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return frozenset(found)
+
+
+class VendorAutomatonService:
+    """
+    Builds and caches the vendor automaton of each tenant. A cached automaton
+    is checked on every get against a stamp of the tenant's vendors and
+    aliases, read in one cheap query, so inserts and deletes by other
+    processes are picked up too; in-process ORM writes also invalidate it on
+    commit. At most VENDOR_AUTOMATON_CACHE_SIZE tenants are cached.
+    """
+
+    _lock = threading.Lock()
+    _cache: "OrderedDict[int, Tuple[VendorStamp, VendorAutomaton]]" = OrderedDict()
+    # Bumped on every invalidation so a build that raced one is not cached
+    _generations: Dict[int, int] = {}
+
+    @staticmethod
+    def get_automaton(db: Session, tenant_id: int) -> VendorAutomaton:
+        """Return the tenant's automaton, building it if its vendors changed."""
+        cls = VendorAutomatonService
+        stamp = cls._stamp(db, tenant_id)
+        with cls._lock:
+            entry = cls._cache.get(tenant_id)
+            generation = cls._generations.get(tenant_id, 0)
+            if entry is not None and entry[0] == stamp:
+                cls._cache.move_to_end(tenant_id)
+                return entry[1]
+
+        patterns = db.query(Vendor.name, Vendor.id).filter(Vendor.tenant_id == tenant_id).all()
+        patterns += (
+            db.query(VendorAlias.alias, VendorAlias.vendor_id)
+            .filter(VendorAlias.tenant_id == tenant_id)
+            .all()
+        )
+        automaton = VendorAutomaton(patterns)
+
+        with cls._lock:
+            if (
+                cls._generations.get(tenant_id, 0) == generation
+                and VENDOR_AUTOMATON_CACHE_SIZE > 0
+            ):
+                cls._cache[tenant_id] = (stamp, automaton)
+                cls._cache.move_to_end(tenant_id)
+                while len(cls._cache) > VENDOR_AUTOMATON_CACHE_SIZE:
+                    cls._cache.popitem(last=False)
+        return automaton
+
+    @staticmethod
+    def _stamp(db: Session, tenant_id: int) -> VendorStamp:
+        """
+        Count and highest id of the tenant's vendors and aliases. Any insert
+        or delete changes it; renames are only seen through ORM commits.
+        """
+        return tuple(
+            db.execute(
+                select(
+                    *(
+                        select(aggregate(model.id))
+                        .where(model.tenant_id == tenant_id)
+                        .scalar_subquery()
+                        for model in (Vendor, VendorAlias)
+                        for aggregate in (func.count, func.max)
+                    )
+                )
+            ).one()
+        )
+
+    @staticmethod
+    def invalidate(tenant_id: int) -> None:
+        """Drop the tenant's cached automaton."""
+        cls = VendorAutomatonService
+        with cls._lock:
+            cls._cache.pop(tenant_id, None)
+            cls._generations[tenant_id] = cls._generations.get(tenant_id, 0) + 1
+
+
+# Vendor and alias writes are collected per session and invalidate the
+# cached automatons once committed
+_CHANGED_TENANTS = "vendor_automaton_changed_tenants"
+
+
+def _record_change(mapper, connection, target) -> None:
+    """Remember the tenants whose vendor list a flush changed."""
+    session = object_session(target)
+    if session is None:
+        VendorAutomatonService.invalidate(target.tenant_id)
+        return
+    changed = session.info.setdefault(_CHANGED_TENANTS, set())
+    changed.add(target.tenant_id)
+    changed.update(inspect(target).attrs.tenant_id.history.deleted)
+
+
+for _model in (Vendor, VendorAlias):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _record_change)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed(session: Session) -> None:
+    """Invalidate the automatons of the tenants changed by the commit."""
+    for tenant_id in session.info.pop(_CHANGED_TENANTS, ()):
+        VendorAutomatonService.invalidate(tenant_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed(session: Session) -> None:
+    """Forget changes that were rolled back."""
+    session.info.pop(_CHANGED_TENANTS, None)
@@ -0,0 +1,269 @@
+"""Sorted-merge date-window join for reconciliation candidates."""
+from collections import deque
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import heapq
+from app.services.candidate_index import max_day_diff
+from app.services.scoring import (
+    AMOUNT_TIERS,
+    MAX_TEXT_POINTS,
+    MIN_MATCH_SCORE,
+    VENDOR_POINTS,
+    PairScorer,
+    amount_points,
+    date_points,
+)
+from app.services.scoring_backends import ScoredInvoice
+
+# Half-width in days of the sliding window: the widest day difference that
+# still earns date points, plus a day of slack on either side for mixed UTC
+# offsets. Pairs farther apart never earn date points.
+WINDOW_DAYS = max_day_diff(int(MIN_MATCH_SCORE) - MAX_TEXT_POINTS - VENDOR_POINTS) + 2
+
+
+class InvoiceRow(NamedTuple):
+    """Invoice columns read by the join, without loading the ORM object."""
+    id: int
+    tenant_id: int
+    version: int
+    amount_cents: int
+    invoice_date: Optional[datetime]
+    description: Optional[str]
+    vendor_id: Optional[int]
+
+
+class TransactionRow(NamedTuple):
+    """Transaction columns read by the join, without loading the ORM object."""
+    id: int
+    version: int
+    amount_cents: int
+    posted_at: datetime
+    description: Optional[str]
+
+
+def amount_window(cents: int) -> Tuple[int, int]:
+    """Transaction amounts (cents) that can earn amount points against cents."""
+    if cents <= 0:
+        return cents, cents
+    tolerance = cents * max(percent for percent, _ in AMOUNT_TIERS) // 100
+    return cents - tolerance, cents + tolerance
+
+
+def in_date_window(invoice: InvoiceRow, transaction: TransactionRow) -> bool:
+    """Whether a pair is inside the sliding date window."""
+    if invoice.invoice_date is None:
+        return False
+    days = transaction.posted_at.toordinal() - invoice.invoice_date.toordinal()
+    return -WINDOW_DAYS <= days <= WINDOW_DAYS
+
+
+class DateWindowJoin:
+    """
+    Finds and scores candidate pairs by sweeping date- and amount-ordered
+    streams of invoices and transactions, holding only the current window.
+
+    A pair can reach the threshold only if (see CandidateIndex):
+    - its dates are within WINDOW_DAYS: found by the date sweep
+    - its amounts are within 5%: found by the amount sweep, which skips pairs
+      the date sweep scores
+    - its descriptions are identical and the invoice's vendor is mentioned:
+      found by a lookup of the few transactions that mention any vendor
+    so every pair reaching the threshold is scored exactly once.
+
+    The amount sweep runs first and holds each invoice's best top_k pairs
+    outside the date window. The date sweep then emits each invoice as soon
+    as it has passed invoice_date + WINDOW_DAYS, so the candidates are
+    produced incrementally. Memory holds the two windows, top_k candidates
+    per invoice with pairs outside the date window, the transactions that
+    mention a vendor, and the invoices without a date.
+    """
+
+    name = "window"
+
+    def __init__(self, vendors, cache=None, top_k: Optional[int] = None):
+        self.scorer = PairScorer(vendors=vendors, cache=cache)
+        self.top_k = top_k
+        self.pairs_scored = 0
+        self._held: Dict[int, List[Tuple[Decimal, int]]] = {}
+        self._by_description: Dict[Hashable, List[TransactionRow]] = {}
+
+    def score_candidates(
+        self,
+        invoices_by_date: Iterable[InvoiceRow],
+        transactions_by_date: Iterable[TransactionRow],
+        invoices_by_amount: Iterable[InvoiceRow],
+        transactions_by_amount: Iterable[TransactionRow],
+        skip_pair: Callable[[int, int], bool],
+    ) -> Iterator[ScoredInvoice]:
+        """
+        Score every pair that can reach the threshold and yield every
+        invoice, in date order then invoices without a date in amount order,
+        each with its (transaction id, score) candidates in transaction id
+        order: its best top_k (best score first, ties to the earliest
+        transaction), or all of them when top_k is None.
+        The date streams must be sorted by date (invoices without a date
+        left out) and the amount streams by amount_cents. Pairs for which
+        skip_pair(invoice_id, transaction_id) is true are not scored.
+        """
+        self._held = {}
+        self._by_description = {}
+        try:
+            undated = self._sweep_amounts(invoices_by_amount, transactions_by_amount, skip_pair)
+            yield from self._sweep_dates(invoices_by_date, transactions_by_date, skip_pair)
+            for invoice in undated:
+                yield invoice, self._emit(invoice, self._by_vendor_description(invoice, skip_pair))
+        finally:
+            self._held = {}
+            self._by_description = {}
+
+    def _sweep_amounts(
+        self,
+        invoices: Iterable[InvoiceRow],
+        transactions: Iterable[TransactionRow],
+        skip_pair: Callable[[int, int], bool],
+    ) -> List[InvoiceRow]:
+        """
+        Hold each invoice's best pairs outside the date window whose amounts
+        are within its tolerance, and index every transaction mentioning a
+        vendor. Returns the invoices without a date.
+        """
+        transactions = iter(transactions)
+        window: deque = deque()
+        pending = next(transactions, None)
+        undated = []
+
+        for invoice in invoices:
+            if invoice.invoice_date is None:
+                undated.append(invoice)
+            # Both bounds grow with the invoice amount, so the window only
+            # ever slides forward
+            low, high = amount_window(invoice.amount_cents)
+            while pending is not None and pending.amount_cents <= high:
+                self._index_description(pending)
+                window.append(pending)
+                pending = next(transactions, None)
+            while window and window[0].amount_cents < low:
+                window.popleft()
+            for transaction in window:
+                if not in_date_window(invoice, transaction):
+                    self._hold(invoice, transaction, skip_pair)
+
+        # Transactions beyond the last invoice may still share a description
+        while pending is not None:
+            self._index_description(pending)
+            pending = next(transactions, None)
+        return undated
+
+    def _sweep_dates(
+        self,
+        invoices: Iterable[InvoiceRow],
+        transactions: Iterable[TransactionRow],
+        skip_pair: Callable[[int, int], bool],
+    ) -> Iterator[ScoredInvoice]:
+        """
+        Score each invoice against the transactions within WINDOW_DAYS and
+        emit it with its held pairs, as every later transaction is outside
+        its window.
+        """
+        transactions = iter(transactions)
+        window: deque = deque()
+        pending = next(transactions, None)
+
+        for invoice in invoices:
+            day = invoice.invoice_date.toordinal()
+            while pending is not None and pending.posted_at.toordinal() <= day + WINDOW_DAYS:
+                window.append(pending)
+                pending = next(transactions, None)
+            while window and window[0].posted_at.toordinal() < day - WINDOW_DAYS:
+                window.popleft()
+            scored = self._by_vendor_description(invoice, skip_pair)
+            for transaction in window:
+                score = self._score(invoice, transaction, skip_pair)
+                if score is not None:
+                    scored.append((score, transaction.id))
+            yield invoice, self._emit(invoice, scored)
+
+    def _by_vendor_description(
+        self, invoice: InvoiceRow, skip_pair: Callable[[int, int], bool]
+    ) -> List[Tuple[Decimal, int]]:
+        """
+        Score the invoice against the transactions with its exact description
+        that mention a vendor, outside both its date and amount windows.
+        """
+        scored = []
+        if not invoice.description or not self.scorer.has_vendor(invoice):
+            return scored
+        low, high = amount_window(invoice.amount_cents)
+        for transaction in self._by_description.get(
+            self.scorer.exact_key(invoice.description), ()
+        ):
+            if not in_date_window(invoice, transaction) and not (
+                low <= transaction.amount_cents <= high
+            ):
+                score = self._score(invoice, transaction, skip_pair)
+                if score is not None:
+                    scored.append((score, transaction.id))
+        return scored
+
+    def _index_description(self, transaction: TransactionRow) -> None:
+        """Remember a transaction whose description mentions any vendor."""
+        if transaction.description and self.scorer.vendors.mentioned(transaction.description):
+            key = self.scorer.exact_key(transaction.description)
+            self._by_description.setdefault(key, []).append(transaction)
+
+    def _hold(
+        self,
+        invoice: InvoiceRow,
+        transaction: TransactionRow,
+        skip_pair: Callable[[int, int], bool],
+    ) -> None:
+        """Score a pair and hold it among the invoice's best top_k."""
+        score = self._score(invoice, transaction, skip_pair)
+        if score is None:
+            return
+        held = self._held.setdefault(invoice.id, [])
+        # Min-heap on (score, -transaction id): the root is the worst kept
+        entry = (score, -transaction.id)
+        if self.top_k is None:
+            held.append(entry)
+        elif len(held) < self.top_k:
+            heapq.heappush(held, entry)
+        elif entry > held[0]:
+            heapq.heapreplace(held, entry)
+
+    def _emit(
+        self, invoice: InvoiceRow, scored: List[Tuple[Decimal, int]]
+    ) -> List[Tuple[int, Decimal]]:
+        """Merge an invoice's held pairs into scored and return its candidates."""
+        scored.extend(
+            (score, -negative_id) for score, negative_id in self._held.pop(invoice.id, ())
+        )
+        if self.top_k is not None and len(scored) > self.top_k:
+            # Best score first, ties to the earliest transaction
+            scored = heapq.nsmallest(self.top_k, scored, key=lambda c: (-c[0], c[1]))
+        return sorted((transaction_id, score) for score, transaction_id in scored)
+
+    def _score(
+        self,
+        invoice: InvoiceRow,
+        transaction: TransactionRow,
+        skip_pair: Callable[[int, int], bool],
+    ) -> Optional[Decimal]:
+        """Score a pair; None when it is skipped or below the threshold."""
+        if skip_pair(invoice.id, transaction.id):
+            return None
+        # Integer upper bound first, so hopeless pairs skip the text similarity
+        bound = amount_points(invoice.amount_cents, transaction.amount_cents)
+        bound += date_points(invoice.invoice_date, transaction.posted_at)
+        bound += MAX_TEXT_POINTS
+        if self.scorer.has_vendor(invoice):
+            bound += VENDOR_POINTS
+        if bound < MIN_MATCH_SCORE:
+            return None
+
+        score = self.scorer.score(invoice, transaction)
+        self.pairs_scored += 1
+        if score >= MIN_MATCH_SCORE:
+            return score
+        return None
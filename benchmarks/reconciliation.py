@@ -0,0 +1,291 @@
+"""
+Benchmark reconciliation, transaction import and the list endpoints on synthetic tenants.
+
+For each scale a fresh tenant is generated (see benchmarks.synthetic), its
+transactions are imported with TransactionService.import_transactions, each
+scoring backend reconciles it from scratch and then incrementally, and the
+list endpoints are timed through the API. Reconcile results are also scored
+against the generator's true payments (precision and recall).
+
+The JSON report goes to stdout (or --output). With --baseline, every timing
+is compared with an earlier report and the command exits non-zero when one
+is more than --tolerance slower.
+
+Usage: python -m benchmarks.reconciliation [--scale 1k 10k 100k] [--backend NAME ...]
+       [--seed S] [--database-url URL] [--output PATH] [--baseline PATH] [--tolerance T]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from app.database import Base, get_db
+from app.main import app
+from app.models.match import Match
+from app.models.ranked_candidate import RankedCandidate
+from app.models.reconciliation_watermark import ReconciliationWatermark
+from app.models.vendor import Vendor
+from app.services.reconciliation_service import ReconciliationService
+from app.services.score_cache import score_cache
+from app.services.transaction_service import TransactionService
+from benchmarks.synthetic import SyntheticLedger, create_tenant, generate_ledger, parse_scale
+
+# Transactions per import_transactions call, like one API request
+IMPORT_BATCH_SIZE = 1000
+
+# Timings shorter than this are too noisy to flag as regressions
+MIN_COMPARED_SECONDS = 0.005
+
+
+def time_import(
+    db: Session, tenant_id: int, ledger: SyntheticLedger, batch_size: int
+) -> Tuple[dict, List[int]]:
+    """Import the ledger's transactions in batches; return the timing and their ids."""
+    transaction_ids = []
+    start = time.perf_counter()
+    for offset in range(0, len(ledger.transactions), batch_size):
+        imported, _ = TransactionService.import_transactions(
+            db, tenant_id, ledger.transactions[offset:offset + batch_size]
+        )
+        transaction_ids.extend(t.id for t in imported)
+    seconds = time.perf_counter() - start
+    rows = len(ledger.transactions)
+    return {
+        "rows": rows,
+        "batch_size": batch_size,
+        "seconds": round(seconds, 6),
+        "rows_per_second": round(rows / seconds) if seconds else None,
+    }, transaction_ids
+
+
+def reset_reconciliation(db: Session, tenant_id: int) -> None:
+    """Forget every earlier run of the tenant, so the next one starts cold."""
+    for model in (Match, RankedCandidate, ReconciliationWatermark):
+        db.query(model).filter(model.tenant_id == tenant_id).delete(synchronize_session=False)
+    db.commit()
+    db.expunge_all()
+    score_cache.clear()
+
+
+def time_reconcile(
+    db: Session, tenant_id: int, backend: str, payments: Set[Tuple[int, int]]
+) -> dict:
+    """Reconcile the tenant from scratch, then again with nothing new."""
+    reset_reconciliation(db, tenant_id)
+
+    start = time.perf_counter()
+    matches = ReconciliationService.reconcile(db, tenant_id, scoring_backend=backend)
+    seconds = time.perf_counter() - start
+    proposed = {(m.invoice_id, m.bank_transaction_id) for m in matches}
+
+    start = time.perf_counter()
+    ReconciliationService.reconcile(db, tenant_id, scoring_backend=backend)
+    incremental_seconds = time.perf_counter() - start
+
+    correct = len(proposed & payments)
+    return {
+        "backend": backend,
+        "seconds": round(seconds, 6),
+        "incremental_seconds": round(incremental_seconds, 6),
+        "matches": len(matches),
+        "precision": round(correct / len(proposed), 4) if proposed else None,
+        "recall": round(correct / len(payments), 4) if payments else None,
+    }
+
+
+def time_list_endpoints(
+    session_factory: sessionmaker, tenant_id: int, invoice_count: int, repeat: int
+) -> List[dict]:
+    """Time the list endpoints through the API; each case reports its median."""
+    db = session_factory()
+    try:
+        vendor_id = db.query(Vendor.id).filter(Vendor.tenant_id == tenant_id).first()[0]
+    finally:
+        db.close()
+
+    invoices = f"/tenants/{tenant_id}/invoices"
+    cases = [
+        ("tenants", "/tenants", {"limit": 100}),
+        ("invoices", invoices, {"limit": 100}),
+        ("invoices_last_page", invoices, {"skip": max(0, invoice_count - 100), "limit": 100}),
+        ("invoices_open", invoices, {"status": "open", "limit": 1000}),
+        ("invoices_vendor", invoices, {"vendor_id": vendor_id, "limit": 1000}),
+        ("invoices_amount_range", invoices, {"min_amount": "100", "max_amount": "200", "limit": 1000}),
+        (
+            "invoices_date_range",
+            invoices,
+            {"start_date": "2024-03-01T00:00:00", "end_date": "2024-03-31T00:00:00", "limit": 1000},
+        ),
+    ]
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    results = []
+    try:
+        with TestClient(app) as client:
+            for name, path, params in cases:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    response = client.get(path, params=params)
+                    timings.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                results.append(
+                    {
+                        "endpoint": name,
+                        "rows": len(response.json()),
+                        "seconds": round(statistics.median(timings), 6),
+                    }
+                )
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+    return results
+
+
+def run_scale(
+    database_url: Optional[str], invoices: int, seed: int, backends: List[str], repeat: int
+) -> dict:
+    """Generate one tenant of the given size and run every benchmark on it."""
+    temporary = None
+    if database_url is None:
+        handle, temporary = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        database_url = f"sqlite:///{temporary}"
+
+    engine = create_engine(database_url)
+    try:
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        ledger = generate_ledger(invoices, seed=seed)
+        db = session_factory()
+        try:
+            start = time.perf_counter()
+            tenant_id, invoice_ids = create_tenant(db, ledger, f"Benchmark {invoices} #{seed}")
+            create_seconds = time.perf_counter() - start
+
+            import_result, transaction_ids = time_import(db, tenant_id, ledger, IMPORT_BATCH_SIZE)
+            payments = {(invoice_ids[i], transaction_ids[t]) for i, t in ledger.payments}
+            reconcile_results = [
+                time_reconcile(db, tenant_id, backend, payments) for backend in backends
+            ]
+        finally:
+            db.close()
+
+        list_results = time_list_endpoints(session_factory, tenant_id, invoices, repeat)
+    finally:
+        engine.dispose()
+        if temporary:
+            os.remove(temporary)
+
+    return {
+        "invoices": len(ledger.invoices),
+        "transactions": len(ledger.transactions),
+        "payments": len(ledger.payments),
+        "create_invoices_seconds": round(create_seconds, 6),
+        "import": import_result,
+        "reconcile": reconcile_results,
+        "list": list_results,
+    }
+
+
+def timings(report: dict) -> Dict[str, float]:
+    """Flatten the timings of a report into {"scale/section/name": seconds}."""
+    flat = {}
+    for scale, result in report["results"].items():
+        flat[f"{scale}/create_invoices"] = result["create_invoices_seconds"]
+        flat[f"{scale}/import"] = result["import"]["seconds"]
+        for run in result["reconcile"]:
+            flat[f"{scale}/reconcile/{run['backend']}"] = run["seconds"]
+            flat[f"{scale}/reconcile_incremental/{run['backend']}"] = run["incremental_seconds"]
+        for case in result["list"]:
+            flat[f"{scale}/list/{case['endpoint']}"] = case["seconds"]
+    return flat
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Describe every timing more than tolerance slower than in the baseline."""
+    current = timings(report)
+    regressions = []
+    for key, before in sorted(timings(baseline).items()):
+        after = current.get(key)
+        if after is None or before < MIN_COMPARED_SECONDS:
+            continue
+        if after > before * (1 + tolerance):
+            regressions.append(f"{key}: {before:.4f}s -> {after:.4f}s ({after / before - 1:+.0%})")
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    """The checked-out commit, so reports can be told apart."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def main():
+    backends = ["python", "window"]
+    if importlib.util.find_spec("numpy"):
+        backends.append("numpy")
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", nargs="+", default=["1k"], help="1k, 10k, 100k or a number of invoices")
+    parser.add_argument("--backend", nargs="+", default=backends)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per list endpoint")
+    parser.add_argument("--database-url", help="default: a temporary SQLite file per scale")
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    parser.add_argument("--baseline", help="report of an earlier commit to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    report = {
+        "benchmark": "reconciliation",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "results": {
+            scale: run_scale(
+                args.database_url, parse_scale(scale), args.seed, args.backend, args.repeat
+            )
+            for scale in args.scale
+        },
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Seeded synthetic tenants for the benchmarks.
+
+A ledger is a set of vendors, invoices and the bank transactions paying
+them, with the noise real statements have: fees shaving a little off the
+amount, posting lags, reworded and truncated descriptions, unpaid invoices
+and payments that belong to no invoice. The same seed and size always
+produce the same ledger, so results can be compared between commits.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
+from sqlalchemy.orm import Session
+from app.models.tenant import Tenant
+from app.models.vendor import Vendor
+from app.models.invoice import Invoice, InvoiceStatus
+from benchmarks.text_similarity import ITEMS, VENDORS, bank_description
+
+# Named ledger sizes (number of invoices)
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+# Invoices are dated over this many days before END_DATE
+HISTORY_DAYS = 730
+END_DATE = datetime(2025, 1, 1)
+
+# Days between an invoice and its payment, and how often each occurs
+POSTING_LAGS = [0, 1, 2, 3, 5, 7, 14, 45]
+POSTING_LAG_WEIGHTS = [25, 25, 15, 10, 10, 5, 6, 4]
+
+# Share of invoices never paid, and of extra payments matching no invoice
+UNPAID_RATIO = 0.1
+STRAY_RATIO = 0.1
+
+
+@dataclass
+class SyntheticLedger:
+    """Generated rows, plus which transaction truly pays which invoice."""
+    seed: int
+    vendors: List[str]
+    invoices: List[Dict[str, Any]]
+    transactions: List[Dict[str, Any]]
+    # (invoice position, transaction position) of every true payment
+    payments: List[Tuple[int, int]] = field(default_factory=list)
+
+
+def parse_scale(value: str) -> int:
+    """Number of invoices for a named scale ("10k") or a plain number."""
+    if value in SCALES:
+        return SCALES[value]
+    return int(value)
+
+
+def _amount(rng: random.Random) -> Decimal:
+    """A long-tailed invoice amount."""
+    return max(Decimal("1.00"), Decimal(str(round(rng.lognormvariate(5, 1.2), 2))))
+
+
+def _paid_amount(rng: random.Random, amount: Decimal) -> Decimal:
+    """The amount that reaches the bank: usually exact, sometimes minus a fee."""
+    roll = rng.random()
+    if roll < 0.85:
+        return amount
+    percent = rng.uniform(0.1, 1.0) if roll < 0.95 else rng.uniform(1.0, 5.0)
+    return (amount * Decimal(str(1 - percent / 100))).quantize(Decimal("0.01"))
+
+
+def generate_ledger(invoices: int, seed: int = 0) -> SyntheticLedger:
+    """Generate a ledger of the given number of invoices."""
+    rng = random.Random(seed)
+    vendors = [
+        f"{name} {suffix}" if suffix else name
+        for suffix in ("", "East", "West", "Holdings")
+        for name in VENDORS
+    ][: max(5, min(40, invoices // 50))]
+
+    ledger = SyntheticLedger(seed=seed, vendors=vendors, invoices=[], transactions=[])
+    start = END_DATE - timedelta(days=HISTORY_DAYS)
+
+    for position in range(invoices):
+        vendor = rng.randrange(len(vendors))
+        invoice_date = start + timedelta(
+            days=rng.randrange(HISTORY_DAYS), minutes=rng.randrange(24 * 60)
+        )
+        amount = _amount(rng)
+        description = (
+            f"{vendors[vendor]} - {rng.choice(ITEMS).capitalize()} INV-{position:06d}"
+        )
+        ledger.invoices.append(
+            {
+                # Some invoices are entered without a vendor or a date
+                "vendor": vendor if rng.random() > 0.1 else None,
+                "amount": amount,
+                "invoice_number": f"INV-{position:06d}",
+                "invoice_date": invoice_date if rng.random() > 0.05 else None,
+                "description": description,
+            }
+        )
+        if rng.random() < UNPAID_RATIO:
+            continue
+
+        lag = rng.choices(POSTING_LAGS, POSTING_LAG_WEIGHTS)[0]
+        posted_at = invoice_date + timedelta(days=lag, minutes=rng.randrange(-120, 600))
+        ledger.payments.append((position, len(ledger.transactions)))
+        ledger.transactions.append(
+            {
+                "external_id": f"BENCH-{seed}-{len(ledger.transactions)}",
+                "posted_at": posted_at.isoformat(),
+                "amount": float(_paid_amount(rng, amount)),
+                "currency": "USD",
+                "description": bank_description(rng, description),
+            }
+        )
+
+    for _ in range(int(invoices * STRAY_RATIO)):
+        posted_at = start + timedelta(
+            days=rng.randrange(HISTORY_DAYS), minutes=rng.randrange(24 * 60)
+        )
+        description = f"{rng.choice(vendors)} - {rng.choice(ITEMS).capitalize()}"
+        ledger.transactions.append(
+            {
+                "external_id": f"BENCH-{seed}-{len(ledger.transactions)}",
+                "posted_at": posted_at.isoformat(),
+                "amount": float(_amount(rng)),
+                "currency": "USD",
+                "description": bank_description(rng, description),
+            }
+        )
+
+    # Statements list payments by posting date, not by invoice
+    order = sorted(
+        range(len(ledger.transactions)),
+        key=lambda position: ledger.transactions[position]["posted_at"],
+    )
+    new_position = {old: new for new, old in enumerate(order)}
+    ledger.transactions = [ledger.transactions[old] for old in order]
+    ledger.payments = [(i, new_position[t]) for i, t in ledger.payments]
+    return ledger
+
+
+def create_tenant(db: Session, ledger: SyntheticLedger, name: str) -> Tuple[int, List[int]]:
+    """
+    Create a tenant with the ledger's vendors and open invoices.
+    Returns (tenant id, invoice ids in ledger order); transactions are left
+    for the caller to import.
+    """
+    tenant = Tenant(name=name)
+    db.add(tenant)
+    db.flush()
+
+    vendors = [Vendor(tenant_id=tenant.id, name=vendor) for vendor in ledger.vendors]
+    db.add_all(vendors)
+    db.flush()
+
+    invoices = [
+        Invoice(
+            tenant_id=tenant.id,
+            vendor_id=vendors[row["vendor"]].id if row["vendor"] is not None else None,
+            amount=row["amount"],
+            invoice_number=row["invoice_number"],
+            invoice_date=row["invoice_date"],
+            description=row["description"],
+            status=InvoiceStatus.OPEN,
+        )
+        for row in ledger.invoices
+    ]
+    db.add_all(invoices)
+    db.flush()
+    # Read the ids before the commit expires every invoice
+    tenant_id, invoice_ids = tenant.id, [invoice.id for invoice in invoices]
+    db.commit()
+    return tenant_id, invoice_ids
@@ -0,0 +1,138 @@
+"""
+Benchmark the text similarity backends on realistic bank descriptions.
+
+Each invoice description is compared against its true bank description and a
+set of distractors. For every backend the benchmark reports the time spent
+normalizing and comparing, top-1 accuracy (the true description ranks first)
+and the mean difference in text points from SequenceMatcher.
+
+Usage: python -m benchmarks.text_similarity [--invoices N] [--distractors K] [--seed S]
+"""
+import argparse
+import json
+import random
+import time
+from app.services.scoring import MAX_TEXT_POINTS
+from app.services.similarity import SIMILARITY_BACKENDS, SequenceSimilarity
+
+VENDORS = [
+    "Acme Corp",
+    "Globex Inc",
+    "Initech",
+    "Umbrella Supplies",
+    "Stark Industries",
+    "Wayne Enterprises",
+    "Hooli",
+    "Vandelay Industries",
+    "Soylent Foods",
+    "Wonka Confectionery",
+]
+ITEMS = [
+    "office supplies",
+    "software license",
+    "consulting services",
+    "cloud hosting",
+    "catering",
+    "equipment rental",
+    "maintenance contract",
+    "freight charges",
+]
+BANK_PREFIXES = ["ACH DEBIT", "POS PURCHASE", "WIRE TRF", "CHECKCARD", "ONLINE PMT", ""]
+
+
+def invoice_description(rng: random.Random) -> str:
+    """A description as typed on an invoice."""
+    vendor = rng.choice(VENDORS)
+    item = rng.choice(ITEMS)
+    return f"{vendor} - {item.capitalize()} INV-{rng.randint(1000, 9999)}"
+
+
+def bank_description(rng: random.Random, description: str) -> str:
+    """The same payment as it might appear on a bank statement."""
+    text = description.upper().replace(" - ", " ")
+    words = text.split()
+    if rng.random() < 0.3:
+        # Banks often truncate descriptions
+        words = words[: rng.randint(2, len(words))]
+    if rng.random() < 0.3:
+        rng.shuffle(words)
+    prefix = rng.choice(BANK_PREFIXES)
+    reference = f"REF{rng.randint(100000, 999999)}" if rng.random() < 0.5 else ""
+    return " ".join(part for part in [prefix, *words, reference] if part)
+
+
+def generate_cases(rng: random.Random, invoices: int, distractors: int):
+    """Return (invoice description, [true description, distractors...]) cases."""
+    cases = []
+    for _ in range(invoices):
+        description = invoice_description(rng)
+        candidates = [bank_description(rng, description)]
+        candidates.extend(
+            bank_description(rng, invoice_description(rng)) for _ in range(distractors)
+        )
+        cases.append((description, candidates))
+    return cases
+
+
+def run_backend(name: str, cases, reference):
+    """Time one backend and compare its points with the reference points."""
+    backend = SIMILARITY_BACKENDS[name]()
+
+    start = time.perf_counter()
+    prepared = [
+        (backend.prepare(description), [backend.prepare(c) for c in candidates])
+        for description, candidates in cases
+    ]
+    prepare_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ratios = [
+        [backend.ratio(description, candidate) for candidate in candidates]
+        for description, candidates in prepared
+    ]
+    compare_seconds = time.perf_counter() - start
+
+    pairs = sum(len(row) for row in ratios)
+    correct = sum(1 for row in ratios if max(range(len(row)), key=row.__getitem__) == 0)
+    point_error = sum(
+        abs(ratio - expected) * MAX_TEXT_POINTS
+        for row, expected_row in zip(ratios, reference)
+        for ratio, expected in zip(row, expected_row)
+    )
+    return {
+        "backend": name,
+        "pairs": pairs,
+        "prepare_seconds": round(prepare_seconds, 6),
+        "compare_seconds": round(compare_seconds, 6),
+        "pairs_per_second": round(pairs / compare_seconds) if compare_seconds else None,
+        "top1_accuracy": round(correct / len(ratios), 4),
+        "mean_point_difference": round(point_error / pairs, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--invoices", type=int, default=2000)
+    parser.add_argument("--distractors", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cases = generate_cases(random.Random(args.seed), args.invoices, args.distractors)
+
+    # Reference: a fresh SequenceMatcher per pair, as the scorer used to do
+    sequence = SequenceSimilarity()
+    reference = [
+        [
+            SequenceSimilarity().ratio(sequence.prepare(description), sequence.prepare(c))
+            for c in candidates
+        ]
+        for description, candidates in cases
+    ]
+
+    results = [run_backend(name, cases, reference) for name in SIMILARITY_BACKENDS]
+    report = {"benchmark": "text_similarity", "seed": args.seed, "results": results}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
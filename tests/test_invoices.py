@@ -77,6 +77,14 @@ def test_list_invoices(client, tenant, vendor):
     assert len(data) == 1
     assert data[0]["amount"] == "200.00"
 
+    # Bounds finer than a cent are rounded inwards
+    response = client.get(
+        f"/tenants/{tenant.id}/invoices?min_amount=199.995&max_amount=200.004"
+    )
+    assert [inv["amount"] for inv in response.json()] == ["200.00"]
+    response = client.get(f"/tenants/{tenant.id}/invoices?max_amount=199.999")
+    assert [inv["amount"] for inv in response.json()] == ["100.00"]
+
 
 def test_delete_invoice(client, tenant):
     """Test deleting an invoice."""
@@ -44,3 +44,83 @@ def test_tenant_isolation(client, db):
     # Should return empty or 404, but definitely not the invoice
     invoices = InvoiceService.list_invoices(db, tenant1.id)
     assert invoice2.id not in [inv.id for inv in invoices]
+
+
+def test_batch_reconciliation(client, db, monkeypatch):
+    """Test that the admin batch reconciles tenants smallest first and reports each one."""
+    from app.services import batch_reconciliation_service
+    from app.services.batch_reconciliation_service import BatchReconciliationService
+    from app.services.tenant_service import TenantService
+    from app.services.invoice_service import InvoiceService
+    from app.services.transaction_service import TransactionService
+    from app.models.match import Match
+
+    day = datetime(2024, 10, 1)
+    tenant_ids = []
+    for name, size in (("Large", 3), ("Small", 1), ("Medium", 2)):
+        tenant = TenantService.create_tenant(db, name)
+        tenant_ids.append(tenant.id)
+        for i in range(size):
+            InvoiceService.create_invoice(db, tenant.id, Decimal(100 + i), invoice_date=day)
+        TransactionService.import_transactions(
+            db,
+            tenant.id,
+            [
+                {"external_id": f"{name}-{i}", "posted_at": day.isoformat(), "amount": 100 + i}
+                for i in range(size)
+            ],
+        )
+    large, small, medium = tenant_ids
+    idle = TenantService.create_tenant(db, "Idle").id
+
+    response = client.post(
+        "/admin/reconcile",
+        params={"tenant_id": [large, small, medium], "workers": 1},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert [t["tenant_id"] for t in report["tenants"]] == [small, medium, large]
+    assert [t["match_count"] for t in report["tenants"]] == [1, 2, 3]
+    assert report["succeeded"] == 3
+    assert report["match_count"] == report["invoices_scored"] == 6
+    assert db.query(Match).filter(Match.tenant_id == idle).count() == 0
+
+    # Without a selection every tenant is included; the others have nothing new
+    response = client.post("/admin/reconcile")
+    report = response.json()
+    assert report["tenant_count"] == 4
+    assert report["tenants"][0]["tenant_id"] == idle
+    assert report["match_count"] == 0
+
+    # Tenants are paged by id, each exactly once
+    monkeypatch.setattr(batch_reconciliation_service, "TENANT_PAGE_SIZE", 2)
+    assert BatchReconciliationService._all_tenant_ids(db) == sorted(tenant_ids + [idle])
+
+
+def test_batch_reconciliation_time_limit(db):
+    """Test that a tenant over its time limit is rolled back and reported as timed out."""
+    from sqlalchemy.orm import sessionmaker
+    from app.services.batch_reconciliation_service import BatchReconciliationService
+    from app.services.tenant_service import TenantService
+    from app.services.invoice_service import InvoiceService
+    from app.services.transaction_service import TransactionService
+    from app.models.match import Match
+
+    tenant = TenantService.create_tenant(db, "Slow")
+    InvoiceService.create_invoice(db, tenant.id, Decimal("100.00"))
+    TransactionService.import_transactions(
+        db,
+        tenant.id,
+        [{"external_id": "SLOW-1", "posted_at": datetime(2024, 10, 1).isoformat(), "amount": 100}],
+    )
+
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    report = BatchReconciliationService.reconcile_tenants(
+        session_factory, tenant_ids=[tenant.id, 999], time_limit=1e-9
+    )
+
+    results = {r["tenant_id"]: r for r in report["tenants"]}
+    assert results[tenant.id]["status"] == "timed_out"
+    assert results[999]["status"] == "failed"
+    assert report["timed_out"] == report["failed"] == 1
+    assert db.query(Match).filter(Match.tenant_id == tenant.id).count() == 0
@@ -125,6 +125,347 @@ def test_confirm_match(client, tenant, vendor, db):
     assert invoice.status == InvoiceStatus.MATCHED
 
 
+def test_reject_promotes_next_candidate(client, tenant, db, monkeypatch):
+    """Test that rejecting a proposal promotes the runner-up without rescoring."""
+    from app.models.ranked_candidate import RankedCandidate
+    from app.services import reconciliation_service
+    from app.services.invoice_service import InvoiceService
+    from app.services.transaction_service import TransactionService
+    from app.services.reconciliation_service import ReconciliationService
+
+    monkeypatch.setattr(reconciliation_service, "TOP_K_CANDIDATES", 2)
+    day = datetime(2024, 8, 1)
+
+    def import_transaction(external_id, days):
+        transactions, _ = TransactionService.import_transactions(
+            db,
+            tenant.id,
+            [
+                {
+                    "external_id": external_id,
+                    "posted_at": (day + timedelta(days=days)).isoformat(),
+                    "amount": 100.00,
+                    "description": "Payment",
+                }
+            ],
+        )
+        return transactions[0].id
+
+    def reject(match_id):
+        response = client.post(f"/tenants/{tenant.id}/reconcile/matches/{match_id}/reject")
+        assert response.status_code == 200
+        return response.json()
+
+    invoice = InvoiceService.create_invoice(db, tenant.id, Decimal("100.00"), invoice_date=day)
+    tx_third = import_transaction("TX-1", 5)
+    tx_best = import_transaction("TX-2", 0)
+    tx_second = import_transaction("TX-3", 2)
+
+    matches = ReconciliationService.reconcile(db, tenant.id)
+    assert [m.bank_transaction_id for m in matches] == [tx_best]
+    candidates = db.query(RankedCandidate).order_by(RankedCandidate.score.desc()).all()
+    assert [c.bank_transaction_id for c in candidates] == [tx_best, tx_second]
+
+    # Rejecting the proposal promotes the runner-up, scoring nothing
+    def no_rescoring(*args, **kwargs):
+        raise AssertionError("rejecting a match must not rescore")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(reconciliation_service, "get_scoring_backend", no_rescoring)
+        data = reject(matches[0].id)
+        assert data["rejected"]["status"] == "rejected"
+        assert data["promoted"]["bank_transaction_id"] == tx_second
+        assert data["promoted"]["status"] == "proposed"
+
+        # Only the top 2 were kept, so the next rejection has nothing to promote
+        assert reject(data["promoted"]["id"])["promoted"] is None
+        assert client.post(
+            f"/tenants/{tenant.id}/reconcile/matches/{matches[0].id}/reject"
+        ).status_code == 404
+
+    # A new transaction is merged into the kept candidates, still 2 per invoice
+    tx_new = import_transaction("TX-4", 1)
+    matches = ReconciliationService.reconcile(db, tenant.id)
+    assert [m.bank_transaction_id for m in matches] == [tx_new]
+    assert db.query(RankedCandidate).count() == 2
+    assert tx_third not in {c.bank_transaction_id for c in db.query(RankedCandidate)}
+
+    # Confirming drops the invoice's candidates
+    client.post(f"/tenants/{tenant.id}/reconcile/matches/{matches[0].id}/confirm")
+    assert db.query(RankedCandidate).count() == 0
+
+
+def test_reject_promotes_one_to_one(client, tenant, db, monkeypatch):
+    """Test that one-to-one promotion skips transactions proposed elsewhere."""
+    from app.services import reconciliation_service
+    from app.services.invoice_service import InvoiceService
+    from app.services.transaction_service import TransactionService
+    from app.services.reconciliation_service import ReconciliationService
+
+    day = datetime(2024, 8, 1)
+    first = InvoiceService.create_invoice(db, tenant.id, Decimal("100.00"), invoice_date=day)
+    second = InvoiceService.create_invoice(db, tenant.id, Decimal("100.00"), invoice_date=day)
+    first_id, second_id = first.id, second.id
+    transactions, _ = TransactionService.import_transactions(
+        db,
+        tenant.id,
+        [
+            {
+                "external_id": f"TX-{days}",
+                "posted_at": (day + timedelta(days=days)).isoformat(),
+                "amount": 100.00,
+                "description": "Payment",
+            }
+            for days in (0, 2)
+        ],
+    )
+    tx_best, tx_next = (t.id for t in transactions)
+
+    matches = ReconciliationService.reconcile(db, tenant.id, assignment="one_to_one")
+    by_invoice = {m.invoice_id: (m.id, m.bank_transaction_id) for m in matches}
+    assert by_invoice[first_id][1] == tx_best and by_invoice[second_id][1] == tx_next
+
+    # The first invoice's runner-up is proposed for the second invoice
+    monkeypatch.setattr(reconciliation_service, "ASSIGNMENT_MODE", "one_to_one")
+    response = client.post(
+        f"/tenants/{tenant.id}/reconcile/matches/{by_invoice[first_id][0]}/reject"
+    )
+    assert response.status_code == 200
+    assert response.json()["promoted"] is None
+
+    # Once that proposal is rejected too, the second invoice can take the
+    # transaction the first one gave up
+    data = client.post(
+        f"/tenants/{tenant.id}/reconcile/matches/{by_invoice[second_id][0]}/reject"
+    ).json()
+    assert (data["promoted"]["invoice_id"], data["promoted"]["bank_transaction_id"]) == (
+        second_id,
+        tx_best,
+    )
+
+
+def test_review_matches_batch(client, tenant, db):
+    """Test batch confirm/reject with competing-proposal cleanup and promotion."""
+    from app.models.invoice import Invoice, InvoiceStatus
+    from app.models.match import Match, MatchStatus
+    from app.services.invoice_service import InvoiceService
+    from app.services.transaction_service import TransactionService
+    from app.services.reconciliation_service import ReconciliationService
+
+    day = datetime(2024, 8, 1)
+    first = InvoiceService.create_invoice(db, tenant.id, Decimal("100.00"), invoice_date=day)
+    second = InvoiceService.create_invoice(db, tenant.id, Decimal("100.00"), invoice_date=day)
+    transactions, _ = TransactionService.import_transactions(
+        db,
+        tenant.id,
+        [
+            {
+                "external_id": f"TX-{days}",
+                "posted_at": (day + timedelta(days=days)).isoformat(),
+                "amount": 100.00,
+                "description": "Payment",
+            }
+            for days in (0, 2)
+        ],
+    )
+    tx_best, tx_next = (t.id for t in transactions)
+    first_id, second_id = first.id, second.id
+    first_version = first.version
+
+    # Both invoices are proposed the same best transaction
+    matches = ReconciliationService.reconcile(db, tenant.id)
+    by_invoice = {m.invoice_id: m.id for m in matches}
+    assert {m.bank_transaction_id for m in matches} == {tx_best}
+
+    response = client.post(
+        f"/tenants/{tenant.id}/reconcile/matches:batch",
+        json={"confirm": [by_invoice[first_id], by_invoice[first_id], 999999]},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["results"] == [
+        {"match_id": by_invoice[first_id], "action": "confirm", "outcome": "confirmed"},
+        {"match_id": 999999, "action": "confirm", "outcome": "not_found"},
+    ]
+    # Confirming the transaction rejects the other invoice's proposal of it,
+    # and that invoice is proposed its next candidate instead
+    assert data["auto_rejected"] == [by_invoice[second_id]]
+    assert [(m["invoice_id"], m["bank_transaction_id"]) for m in data["promoted"]] == [
+        (second_id, tx_next)
+    ]
+
+    db.expire_all()
+    assert db.get(Invoice, first_id).status == InvoiceStatus.MATCHED
+    assert db.get(Invoice, first_id).version == first_version + 1
+    assert db.get(Match, by_invoice[second_id]).status == MatchStatus.REJECTED
+
+    promoted_id = data["promoted"][0]["id"]
+    response = client.post(
+        f"/tenants/{tenant.id}/reconcile/matches:batch",
+        json={"confirm": [promoted_id], "reject": [promoted_id, by_invoice[first_id]]},
+    )
+    assert [r["outcome"] for r in response.json()["results"]] == [
+        "conflict",
+        "conflict",
+        "not_proposed",
+    ]
+    db.expire_all()
+    assert db.get(Match, promoted_id).status == MatchStatus.PROPOSED
+
+    response = client.post(
+        f"/tenants/{tenant.id}/reconcile/matches:batch", json={"reject": [promoted_id]}
+    )
+    data = response.json()
+    assert data["results"][0]["outcome"] == "rejected"
+    assert data["auto_rejected"] == [] and data["promoted"] == []
+
+    response = client.post("/tenants/999999/reconcile/matches:batch", json={"confirm": [1]})
+    assert response.status_code == 404
+
+
+def test_confirm_then_review_conflicts_with_confirmed_match(client, tenant, db):
+    """Test that single and batch confirmations respect earlier confirmations."""
+    from app.models.match import Match, MatchStatus
+    from app.services.invoice_service import InvoiceService
+    from app.services.transaction_service import TransactionService
+    from app.services.reconciliation_service import ReconciliationService
+
+    day = datetime(2024, 8, 1)
+    first = InvoiceService.create_invoice(db, tenant.id, Decimal("100.00"), invoice_date=day)
+    second = InvoiceService.create_invoice(db, tenant.id, Decimal("100.00"), invoice_date=day)
+    first_id, second_id = first.id, second.id
+    transactions, _ = TransactionService.import_transactions(
+        db,
+        tenant.id,
+        [{"external_id": "TX-1", "posted_at": day.isoformat(), "amount": 100.00, "description": "Payment"}],
+    )
+    transaction_id = transactions[0].id
+
+    matches = ReconciliationService.reconcile(db, tenant.id)
+    by_invoice = {m.invoice_id: m.id for m in matches}
+    assert set(by_invoice) == {first_id, second_id}
+
+    # A single confirmation rejects the competing proposal, like a batch one
+    response = client.post(
+        f"/tenants/{tenant.id}/reconcile/matches/{by_invoice[first_id]}/confirm"
+    )
+    assert response.status_code == 200
+    db.expire_all()
+    assert db.get(Match, by_invoice[second_id]).status == MatchStatus.REJECTED
+    response = client.post(
+        f"/tenants/{tenant.id}/reconcile/matches:batch",
+        json={"confirm": [by_invoice[second_id]]},
+    )
+    assert response.json()["results"][0]["outcome"] == "not_proposed"
+
+    # A proposal of the confirmed transaction (e.g. from a concurrent run)
+    # conflicts with the confirmation stored before the review
+    stale = Match(
+        tenant_id=tenant.id,
+        invoice_id=second_id,
+        bank_transaction_id=transaction_id,
+        score=Decimal("90"),
+        status=MatchStatus.PROPOSED,
+    )
+    db.add(stale)
+    db.commit()
+    response = client.post(
+        f"/tenants/{tenant.id}/reconcile/matches:batch", json={"confirm": [stale.id]}
+    )
+    assert response.json()["results"][0]["outcome"] == "conflict"
+    response = client.post(f"/tenants/{tenant.id}/reconcile/matches/{stale.id}/confirm")
+    assert response.status_code == 409
+    db.expire_all()
+    assert db.get(Match, stale.id).status == MatchStatus.PROPOSED
+
+
+def test_reconcile_auto_confirms_exact_matches(client, tenant, db):
+    """Test that reconcile confirms exact-amount proposals above the tenant's threshold."""
+    from app.models.invoice import Invoice, InvoiceStatus
+    from app.services.invoice_service import InvoiceService
+    from app.services.transaction_service import TransactionService
+
+    response = client.patch(f"/tenants/{tenant.id}", json={"auto_confirm_threshold": "50"})
+    assert response.status_code == 200
+    assert float(response.json()["auto_confirm_threshold"]) == 50
+
+    day = datetime(2024, 8, 1)
+    first = InvoiceService.create_invoice(db, tenant.id, Decimal("100.00"), invoice_date=day)
+    second = InvoiceService.create_invoice(db, tenant.id, Decimal("100.00"), invoice_date=day)
+    inexact = InvoiceService.create_invoice(db, tenant.id, Decimal("250.00"), invoice_date=day)
+    first_id, second_id, inexact_id = first.id, second.id, inexact.id
+    transactions, _ = TransactionService.import_transactions(
+        db,
+        tenant.id,
+        [
+            {
+                "external_id": f"TX-{number}",
+                "posted_at": (day + timedelta(days=days)).isoformat(),
+                "amount": amount,
+                "description": "Payment",
+            }
+            for number, (days, amount) in enumerate(((0, 100.00), (2, 100.00), (0, 247.50)))
+        ],
+    )
+    tx_best, tx_next, tx_inexact = (t.id for t in transactions)
+
+    data = client.post(f"/tenants/{tenant.id}/reconcile", params={"metrics": True}).json()
+    matches = {(m["invoice_id"], m["bank_transaction_id"]): m["status"] for m in data["matches"]}
+    # Both invoices were proposed the best transaction; the first is
+    # confirmed, so the second loses it and is proposed its runner-up
+    assert matches == {
+        (first_id, tx_best): "confirmed",
+        (second_id, tx_best): "rejected",
+        (inexact_id, tx_inexact): "proposed",
+        (second_id, tx_next): "proposed",
+    }
+    assert data["metrics"]["auto_confirmed"] == 1
+
+    db.expire_all()
+    assert db.get(Invoice, first_id).status == InvoiceStatus.MATCHED
+    assert db.get(Invoice, inexact_id).status == InvoiceStatus.OPEN
+
+    # Disabling the threshold leaves every proposal for review
+    response = client.patch(f"/tenants/{tenant.id}", json={"auto_confirm_threshold": None})
+    assert response.json()["auto_confirm_threshold"] is None
+    assert client.patch("/tenants/999999", json={"name": "x"}).status_code == 404
+
+
+def test_reconcile_stream_auto_confirms_once_across_batches(tenant, db):
+    """Test that a streamed run never auto-confirms a transaction twice."""
+    from app.models.match import Match, MatchStatus
+    from app.services.invoice_service import InvoiceService
+    from app.services.reconciliation_service import ReconciliationService
+    from app.services.transaction_service import TransactionService
+
+    tenant.auto_confirm_threshold = Decimal("50")
+    db.commit()
+    day = datetime(2024, 8, 1)
+    first = InvoiceService.create_invoice(
+        db, tenant.id, Decimal("100.00"), invoice_date=day, description="rent"
+    )
+    second = InvoiceService.create_invoice(
+        db, tenant.id, Decimal("100.00"), invoice_date=day, description="rent"
+    )
+    first_id, second_id = first.id, second.id
+    transactions, _ = TransactionService.import_transactions(
+        db,
+        tenant.id,
+        [{"external_id": "TX-1", "posted_at": day.isoformat(), "amount": 100.00, "description": "rent"}],
+    )
+    transaction_id = transactions[0].id
+
+    streamed = list(ReconciliationService.reconcile_stream(db, tenant.id, batch_size=1))
+    assert len(streamed) == 2
+    db.expire_all()
+    assert sorted(
+        (m.invoice_id, m.bank_transaction_id, m.status) for m in db.query(Match)
+    ) == [
+        (first_id, transaction_id, MatchStatus.CONFIRMED),
+        (second_id, transaction_id, MatchStatus.REJECTED),
+    ]
+
+
 def test_explain_reconciliation_mocked(client, tenant, vendor, db, monkeypatch):
     """Test AI explanation endpoint with mocked AI."""
     from app.services.invoice_service import InvoiceService
@@ -219,3 +560,469 @@ def test_explain_reconciliation_fallback(client, tenant, vendor, db, monkeypatch
     finally:
         if original_key:
             os.environ["OPENAI_API_KEY"] = original_key
+
+
+def test_reconciliation_matches_exhaustive_scan(tenant, vendor, db):
+    """Test that candidate blocking proposes the same matches as scoring every pair."""
+    import random
+    from app.models.invoice import Invoice
+    from app.models.bank_transaction import BankTransaction
+    from app.services.reconciliation_service import ReconciliationService
+
+    rng = random.Random(42)
+    base = datetime(2024, 3, 1, 12, 0)
+    descriptions = [
+        "Office supplies",
+        "office supplies",
+        "Software license",
+        f"Payment to {vendor.name}",
+        None,
+    ]
+
+    invoices = [
+        Invoice(
+            tenant_id=tenant.id,
+            vendor_id=vendor.id if i % 2 else None,
+            amount=Decimal(rng.choice([100, 250, 999])) + Decimal(rng.randint(-60, 60)) / 10,
+            invoice_date=base + timedelta(hours=rng.randint(-400, 400)) if i % 5 else None,
+            description=rng.choice(descriptions),
+            status=InvoiceStatus.OPEN,
+        )
+        for i in range(30)
+    ]
+    transactions = [
+        BankTransaction(
+            tenant_id=tenant.id,
+            posted_at=base + timedelta(hours=rng.randint(-400, 400)),
+            amount=Decimal(rng.choice([100, 250, 999])) + Decimal(rng.randint(-60, 60)) / 10,
+            description=rng.choice(descriptions),
+        )
+        for _ in range(60)
+    ]
+    db.add_all(invoices + transactions)
+    db.commit()
+
+    # Expected result: score every invoice against every transaction
+    expected = {}
+    for invoice in invoices:
+        best_id, best_score = None, Decimal("0.0")
+        for transaction in sorted(transactions, key=lambda t: t.id):
+            score = ReconciliationService.calculate_match_score(invoice, transaction)
+            if score > best_score and score >= Decimal("30.0"):
+                best_id, best_score = transaction.id, score
+        if best_id:
+            expected[invoice.id] = (best_id, best_score)
+
+    matches = ReconciliationService.reconcile(db, tenant.id)
+    actual = {m.invoice_id: (m.bank_transaction_id, m.score) for m in matches}
+
+    assert len(expected) > 0
+    assert actual.keys() == expected.keys()
+    for invoice_id, (transaction_id, score) in expected.items():
+        assert actual[invoice_id][0] == transaction_id
+        assert abs(actual[invoice_id][1] - score) < Decimal("0.01")
+
+
+def test_reconciliation_query_count_is_constant(db):
+    """Test that a reconcile run issues the same number of statements for any tenant size."""
+    from sqlalchemy import event
+    from app.models.invoice import Invoice
+    from app.models.bank_transaction import BankTransaction
+    from app.models.vendor import Vendor
+    from app.schemas.match import MatchResponse
+    from app.services.reconciliation_service import ReconciliationService
+    from app.services.tenant_service import TenantService
+
+    def run_reconcile(size):
+        tenant = TenantService.create_tenant(db, f"Tenant {size}")
+        vendors = [Vendor(tenant_id=tenant.id, name=f"Vendor {i}") for i in range(size)]
+        db.add_all(vendors)
+        db.flush()
+        for i in range(size):
+            db.add(
+                Invoice(
+                    tenant_id=tenant.id,
+                    vendor_id=vendors[i].id,
+                    amount=Decimal(100 + i),
+                    invoice_date=datetime(2024, 1, 1),
+                    description=f"Invoice {i}",
+                    status=InvoiceStatus.OPEN,
+                )
+            )
+            db.add(
+                BankTransaction(
+                    tenant_id=tenant.id,
+                    posted_at=datetime(2024, 1, 1),
+                    amount=Decimal(100 + i),
+                    description=f"Payment to Vendor {i}",
+                )
+            )
+        db.commit()
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = db.get_bind()
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            matches = ReconciliationService.reconcile(db, tenant.id)
+            [MatchResponse.model_validate(m) for m in matches]
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        return len(matches), len(statements)
+
+    small_matches, small_statements = run_reconcile(2)
+    large_matches, large_statements = run_reconcile(40)
+
+    assert small_matches == 2
+    assert large_matches == 40
+    assert large_statements == small_statements
+
+
+def test_reconciliation_one_to_one_assignment(client, tenant, vendor, db):
+    """Test that one-to-one assignment proposes each transaction at most once."""
+    from app.services.invoice_service import InvoiceService
+    from app.services.transaction_service import TransactionService
+
+    posted_at = datetime(2024, 5, 1)
+    # Both invoices score best against TX-001; only invoice_a should get it
+    invoice_a = InvoiceService.create_invoice(
+        db, tenant.id, Decimal("100.00"), invoice_date=posted_at, description="Cloud hosting"
+    )
+    invoice_b = InvoiceService.create_invoice(
+        db, tenant.id, Decimal("100.00"), invoice_date=posted_at, description="Hosting"
+    )
+    transactions, _ = TransactionService.import_transactions(
+        db,
+        tenant.id,
+        [
+            {
+                "external_id": "TX-001",
+                "posted_at": posted_at.isoformat(),
+                "amount": 100.00,
+                "description": "Cloud hosting",
+            },
+            {
+                "external_id": "TX-002",
+                "posted_at": (posted_at + timedelta(days=2)).isoformat(),
+                "amount": 100.00,
+                "description": "Payment",
+            },
+        ],
+    )
+
+    response = client.post(
+        f"/tenants/{tenant.id}/reconcile", params={"assignment": "one_to_one"}
+    )
+    assert response.status_code == 200
+    matches = {m["invoice_id"]: m["bank_transaction_id"] for m in response.json()["matches"]}
+    assert matches == {invoice_a.id: transactions[0].id, invoice_b.id: transactions[1].id}
+
+    # Transactions already proposed are not proposed again
+    response = client.post(
+        f"/tenants/{tenant.id}/reconcile", params={"assignment": "one_to_one"}
+    )
+    assert response.status_code == 200
+    assert response.json()["matches"] == []
+
+    response = client.post(f"/tenants/{tenant.id}/reconcile", params={"assignment": "bogus"})
+    assert response.status_code == 422
+
+
+def test_one_to_one_assignment_scales():
+    """Test the one-to-one assignment on a large candidate graph."""
+    import random
+    from types import SimpleNamespace
+    from app.services.assignment import one_to_one
+
+    rng = random.Random(3)
+    scored_invoices = [
+        (
+            SimpleNamespace(id=invoice_id),
+            sorted(
+                (rng.randrange(5000), Decimal(rng.randint(3000, 10000)) / 100)
+                for _ in range(10)
+            ),
+        )
+        for invoice_id in range(5000)
+    ]
+
+    assignments = one_to_one(scored_invoices)
+
+    positions = [position for _, position, _ in assignments]
+    assert len(positions) == len(set(positions))
+    assert len({invoice.id for invoice, _, _ in assignments}) == len(assignments)
+    # The highest scoring edge overall is always taken
+    best = max(
+        (score, -invoice.id) for invoice, scored in scored_invoices for _, score in scored
+    )
+    assert any(score == best[0] for _, _, score in assignments)
+
+
+def test_incremental_reconciliation(client, tenant, db):
+    """Test that reconcile only scores records added since the previous run."""
+    from app.services.invoice_service import InvoiceService
+    from app.services.transaction_service import TransactionService
+
+    day = datetime(2024, 7, 1)
+
+    def import_transaction(external_id, amount, days):
+        transactions, _ = TransactionService.import_transactions(
+            db,
+            tenant.id,
+            [
+                {
+                    "external_id": external_id,
+                    "posted_at": (day + timedelta(days=days)).isoformat(),
+                    "amount": amount,
+                    "description": "Payment",
+                }
+            ],
+        )
+        return transactions[0].id
+
+    def reconcile(**params):
+        response = client.post(f"/tenants/{tenant.id}/reconcile", params=params)
+        assert response.status_code == 200
+        return [(m["invoice_id"], m["bank_transaction_id"]) for m in response.json()["matches"]]
+
+    invoice_a = InvoiceService.create_invoice(db, tenant.id, Decimal("100.00"), invoice_date=day)
+    tx_best = import_transaction("TX-1", 100.00, 0)
+    tx_runner_up = import_transaction("TX-2", 100.00, 2)
+    tx_other = import_transaction("TX-3", 200.00, 0)
+
+    assert reconcile() == [(invoice_a.id, tx_best)]
+
+    # Nothing changed, so nothing is rescored
+    assert reconcile() == []
+
+    # A new invoice is scored against old transactions, and a new
+    # transaction against old invoices
+    invoice_b = InvoiceService.create_invoice(db, tenant.id, Decimal("200.00"), invoice_date=day)
+    tx_new = import_transaction("TX-4", 100.00, 0)
+    assert reconcile() == [(invoice_a.id, tx_new), (invoice_b.id, tx_other)]
+
+    # A full run rescans every pair that has no match yet
+    assert reconcile(full="true") == [(invoice_a.id, tx_runner_up)]
+
+
+def test_reconciliation_job(client, tenant, vendor, db):
+    """Test that a reconciliation job runs in the background and reports its matches."""
+    import time
+    from app.services.invoice_service import InvoiceService
+    from app.services.transaction_service import TransactionService
+
+    day = datetime(2024, 8, 1)
+    invoices = [
+        InvoiceService.create_invoice(
+            db, tenant.id, Decimal(amount), vendor_id=vendor.id, invoice_date=day
+        )
+        for amount in ("120.00", "340.00")
+    ]
+    TransactionService.import_transactions(
+        db,
+        tenant.id,
+        [
+            {"external_id": f"JOB-{i}", "posted_at": day.isoformat(), "amount": float(inv.amount)}
+            for i, inv in enumerate(invoices)
+        ],
+    )
+
+    def wait_for(job_id):
+        for _ in range(200):
+            response = client.get(f"/tenants/{tenant.id}/reconcile/jobs/{job_id}")
+            assert response.status_code == 200
+            job = response.json()
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            time.sleep(0.05)
+        raise AssertionError(f"Job {job_id} did not finish")
+
+    response = client.post(f"/tenants/{tenant.id}/reconcile/jobs")
+    assert response.status_code == 202
+    first = response.json()
+    assert first["status"] == "queued"
+    # Queued right behind the first job of the same tenant
+    second = client.post(f"/tenants/{tenant.id}/reconcile/jobs", params={"full": "true"}).json()
+
+    first = wait_for(first["id"])
+    second = wait_for(second["id"])
+    assert first["status"] == "succeeded"
+    assert first["invoices_scored"] == first["invoices_total"] == 2
+    assert first["match_count"] == 2
+    assert first["duration_seconds"] is not None
+
+    from app.models.match import Match
+    matches = db.query(Match).filter(Match.id.in_(first["match_ids"])).all()
+    assert {m.invoice_id for m in matches} == {i.id for i in invoices}
+
+    # Jobs of one tenant are serialized, so the second run sees the first one's matches
+    assert second["status"] == "succeeded"
+    assert second["match_ids"] == []
+    assert second["started_at"] >= first["finished_at"]
+
+    response = client.get(f"/tenants/{tenant.id}/reconcile/jobs/999")
+    assert response.status_code == 404
+    response = client.post("/tenants/999/reconcile/jobs")
+    assert response.status_code == 404
+
+
+def test_fail_orphaned_jobs(tenant, db):
+    """Test that jobs left queued or running by an earlier process are failed."""
+    from app.models.reconciliation_job import JobStatus, ReconciliationJob
+    from app.services.reconciliation_job_service import ReconciliationJobService
+
+    jobs = [
+        ReconciliationJob(tenant_id=tenant.id, status=status)
+        for status in (JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.SUCCEEDED)
+    ]
+    db.add_all(jobs)
+    db.commit()
+
+    assert ReconciliationJobService.fail_orphaned_jobs(db) == 2
+    db.expire_all()
+    assert [job.status for job in jobs] == [
+        JobStatus.FAILED,
+        JobStatus.FAILED,
+        JobStatus.SUCCEEDED,
+    ]
+    assert jobs[0].error == "Interrupted by a server restart"
+    assert jobs[1].finished_at is not None and jobs[2].error is None
+
+
+def test_reconciliation_stream(client, tenant, vendor, db, monkeypatch):
+    """Test that the streaming endpoint persists matches in batches and emits NDJSON."""
+    import json
+    from sqlalchemy import event
+    from app.services import reconciliation_service
+    from app.services.invoice_service import InvoiceService
+    from app.services.transaction_service import TransactionService
+    from app.models.match import Match
+
+    monkeypatch.setattr(reconciliation_service, "STREAM_BATCH_SIZE", 2)
+    tenant_id = tenant.id
+    day = datetime(2024, 9, 1)
+    invoice_ids = [
+        InvoiceService.create_invoice(
+            db, tenant_id, Decimal(100 + 50 * i), vendor_id=vendor.id, invoice_date=day
+        ).id
+        for i in range(5)
+    ]
+    TransactionService.import_transactions(
+        db,
+        tenant_id,
+        [
+            {"external_id": f"STREAM-{i}", "posted_at": day.isoformat(), "amount": 100 + 50 * i}
+            for i in range(5)
+        ],
+    )
+
+    inserts = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO matches"):
+            inserts.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = client.post(f"/tenants/{tenant_id}/reconcile/stream")
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["invoice_id"] for r in records] == invoice_ids
+    assert len(inserts) == 3
+
+    stored = {m.id for m in db.query(Match).filter(Match.tenant_id == tenant_id).all()}
+    assert {r["id"] for r in records} == stored
+
+    # The watermark advanced once the stream finished
+    response = client.post(f"/tenants/{tenant_id}/reconcile/stream")
+    assert response.status_code == 200
+    assert response.text == ""
+
+    response = client.post("/tenants/999/reconcile/stream")
+    assert response.status_code == 404
+
+
+def test_reconcile_metrics(client, tenant, vendor, db):
+    """Test that reconcile reports per-stage metrics and aggregates them."""
+    from app.services.invoice_service import InvoiceService
+    from app.services.transaction_service import TransactionService
+
+    for number, amount in enumerate(("100.00", "250.00", "75.00")):
+        InvoiceService.create_invoice(
+            db,
+            tenant.id,
+            Decimal(amount),
+            vendor_id=vendor.id,
+            invoice_number=f"INV-{number}",
+            invoice_date=datetime.now(),
+            description="Office supplies",
+        )
+    TransactionService.import_transactions(
+        db,
+        tenant.id,
+        [
+            {
+                "external_id": f"TX-{number}",
+                "posted_at": datetime.now().isoformat(),
+                "amount": amount,
+                "currency": "USD",
+                "description": f"Payment to {vendor.name}",
+            }
+            for number, amount in enumerate((100.00, 250.00, 9000.00, 12.50))
+        ],
+    )
+
+    before = client.get("/admin/metrics").json()
+    response = client.post(f"/tenants/{tenant.id}/reconcile", params={"metrics": True})
+    assert response.status_code == 200
+    data = response.json()
+    metrics = data["metrics"]
+    assert metrics["status"] == "succeeded"
+    assert metrics["tenant_id"] == tenant.id
+    assert metrics["invoices"] == 3
+    assert metrics["matches"] == len(data["matches"]) > 0
+    # The window backend loads rows while scoring, without load stages
+    assert {"prepare", "score", "persist"} <= {stage["name"] for stage in metrics["stages"]}
+    assert metrics["statements"] >= sum(stage["statements"] for stage in metrics["stages"]) > 0
+    assert 0 < metrics["pairs_scored"] <= 12
+    assert metrics["pairs_scored"] + metrics["pairs_skipped"] == 12
+
+    # Metrics are only returned on request, but every run is aggregated
+    assert client.post(f"/tenants/{tenant.id}/reconcile").json()["metrics"] is None
+    after = client.get("/admin/metrics").json()
+    assert after["runs"]["succeeded"] == before["runs"].get("succeeded", 0) + 2
+    assert after["run_seconds"]["count"] == before["run_seconds"]["count"] + 2
+    assert after["stage_seconds"]["score"]["count"] >= 2
+    assert after["statements"]["buckets"][-1]["count"] <= after["statements"]["count"]
+
+
+def test_reconcile_metrics_release_committed_connections(db):
+    """Test that a connection released by a run's commit is not counted against it."""
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import Session
+    from app.services.reconciliation_metrics import ReconcileMetrics
+
+    # One pooled connection, so the other session gets the one just released
+    engine = create_engine(db.get_bind().url, pool_size=1, max_overflow=0)
+    try:
+        with Session(bind=engine) as run_db, Session(bind=engine) as other_db:
+            metrics = ReconcileMetrics()
+            with metrics.run(run_db):
+                run_db.execute(text("SELECT 1"))
+                run_db.commit()
+                counted = metrics.statements
+                other_db.execute(text("SELECT 1"))
+                other_db.commit()
+                assert metrics.statements == counted
+                run_db.execute(text("SELECT 1"))
+                assert metrics.statements == counted + 1
+    finally:
+        engine.dispose()
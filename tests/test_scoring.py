@@ -0,0 +1,460 @@
+"""Tests for match scoring backends."""
+import random
+import pytest
+from decimal import Decimal
+from datetime import datetime, timedelta
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.bank_transaction import BankTransaction
+
+
+def _random_ledger(db, tenant, vendor, seed=7, invoices=40, transactions=80, spread=15000):
+    """
+    Create a seeded mix of invoices and transactions with near-miss values,
+    dated up to spread minutes either side of a base date.
+    """
+    rng = random.Random(seed)
+    base = datetime(2024, 6, 1, 9, 30)
+    descriptions = [
+        "Office supplies",
+        "OFFICE SUPPLIES",
+        "Software license Q2",
+        f"ACH {vendor.name} invoice",
+        f"{vendor.name}",
+        None,
+    ]
+
+    def amount():
+        return Decimal(rng.choice([0, 50, 100, 1000])) + Decimal(rng.randint(-80, 80)) / 100
+
+    invoice_rows = [
+        Invoice(
+            tenant_id=tenant.id,
+            vendor_id=vendor.id if i % 3 else None,
+            amount=amount(),
+            invoice_date=base + timedelta(minutes=rng.randint(-spread, spread)) if i % 4 else None,
+            description=rng.choice(descriptions),
+            status=InvoiceStatus.OPEN,
+        )
+        for i in range(invoices)
+    ]
+    transaction_rows = [
+        BankTransaction(
+            tenant_id=tenant.id,
+            posted_at=base + timedelta(minutes=rng.randint(-spread, spread)),
+            amount=amount(),
+            description=rng.choice(descriptions),
+        )
+        for _ in range(transactions)
+    ]
+    db.add_all(invoice_rows + transaction_rows)
+    db.commit()
+    return invoice_rows, sorted(transaction_rows, key=lambda t: t.id)
+
+
+def test_numpy_backend_matches_scalar_scores(tenant, vendor, db):
+    """Test that the NumPy backend returns exactly the scalar scores above the threshold."""
+    pytest.importorskip("numpy")
+    from app.services.scoring import MIN_MATCH_SCORE, calculate_match_score
+    from app.services.scoring_backends import get_scoring_backend
+
+    invoices, transactions = _random_ledger(db, tenant, vendor)
+    excluded = {(invoices[0].id, transactions[0].id)}
+
+    expected = {}
+    for invoice in invoices:
+        for position, transaction in enumerate(transactions):
+            if (invoice.id, transaction.id) in excluded:
+                continue
+            score = calculate_match_score(invoice, transaction)
+            if score >= MIN_MATCH_SCORE:
+                expected[(invoice.id, position)] = score
+
+    backend = get_scoring_backend("numpy")
+    actual = {
+        (invoice.id, position): score
+        for invoice, scored in backend.score_candidates(invoices, transactions, excluded)
+        for position, score in scored
+    }
+
+    assert len(expected) > 0
+    assert actual == expected
+
+
+def test_reconcile_backends_agree(tenant, vendor, db):
+    """Test that reconcile proposes the same matches with either backend."""
+    pytest.importorskip("numpy")
+    from app.services.reconciliation_service import ReconciliationService
+    from app.services.score_cache import score_cache
+
+    _random_ledger(db, tenant, vendor, seed=11)
+
+    python_matches = ReconciliationService.reconcile(db, tenant.id, scoring_backend="python")
+    python_pairs = [(m.invoice_id, m.bank_transaction_id, m.score) for m in python_matches]
+
+    # Drop the proposals so the second run scores the same pairs again, and
+    # the cached scores so it really rescores them
+    for match in python_matches:
+        db.delete(match)
+    db.commit()
+    score_cache.clear()
+
+    numpy_matches = ReconciliationService.reconcile(
+        db, tenant.id, scoring_backend="numpy", full=True
+    )
+    numpy_pairs = [(m.invoice_id, m.bank_transaction_id, m.score) for m in numpy_matches]
+
+    assert len(python_pairs) > 0
+    assert numpy_pairs == python_pairs
+
+
+def test_window_join_matches_exhaustive_scan(tenant, vendor, db):
+    """Test that the date-window join scores exactly the pairs reaching the threshold."""
+    from app.services.reconciliation_service import ReconciliationService
+    from app.services.score_cache import score_cache
+    from app.services.scoring import MIN_MATCH_SCORE, PairScorer
+    from app.services.vendor_automaton import VendorAutomatonService
+    from app.services.window_join import DateWindowJoin, InvoiceRow, TransactionRow
+
+    # Spread over months, so many amount and description matches fall
+    # outside the date window
+    invoices, transactions = _random_ledger(
+        db, tenant, vendor, seed=5, invoices=60, transactions=120, spread=200000
+    )
+    vendors = VendorAutomatonService.get_automaton(db, tenant.id)
+    invoice_rows = [InvoiceRow(*(getattr(i, f) for f in InvoiceRow._fields)) for i in invoices]
+    transaction_rows = [
+        TransactionRow(*(getattr(t, f) for f in TransactionRow._fields)) for t in transactions
+    ]
+
+    scorer = PairScorer(vendors=vendors)
+    expected = {}
+    for invoice in invoice_rows:
+        for transaction in transaction_rows:
+            score = scorer.score(invoice, transaction)
+            if score >= MIN_MATCH_SCORE:
+                expected.setdefault(invoice.id, []).append((transaction.id, score))
+
+    def join(top_k=None, transactions_by_date=None):
+        return DateWindowJoin(vendors, top_k=top_k).score_candidates(
+            sorted(
+                (i for i in invoice_rows if i.invoice_date), key=lambda i: (i.invoice_date, i.id)
+            ),
+            transactions_by_date or sorted(transaction_rows, key=lambda t: (t.posted_at, t.id)),
+            sorted(invoice_rows, key=lambda i: (i.amount_cents, i.id)),
+            sorted(transaction_rows, key=lambda t: (t.amount_cents, t.id)),
+            lambda invoice_id, transaction_id: False,
+        )
+
+    scored = list(join())
+    assert len(scored) == len(invoice_rows)
+    assert {invoice.id: candidates for invoice, candidates in scored if candidates} == expected
+
+    # With top_k, each invoice keeps its best candidates only
+    assert {invoice.id: candidates for invoice, candidates in join(top_k=2) if candidates} == {
+        invoice_id: sorted(
+            sorted(candidates, key=lambda c: (-c[1], c[0]))[:2]
+        )
+        for invoice_id, candidates in expected.items()
+    }
+
+    # Invoices are emitted while the date stream is still being read
+    read = []
+
+    def by_date():
+        for transaction in sorted(transaction_rows, key=lambda t: (t.posted_at, t.id)):
+            read.append(transaction)
+            yield transaction
+
+    next(join(transactions_by_date=by_date()))
+    assert 0 < len(read) < len(transaction_rows)
+    assert any(
+        abs((t.posted_at - i.invoice_date).days) > 9
+        for i in invoices
+        for t in transactions
+        if i.invoice_date and (t.id, scorer.score(i, t)) in expected.get(i.id, [])
+    )
+
+    # Through reconcile, streaming from the database
+    python_matches = ReconciliationService.reconcile(db, tenant.id, scoring_backend="python")
+    python_pairs = [(m.invoice_id, m.bank_transaction_id, m.score) for m in python_matches]
+    for match in python_matches:
+        db.delete(match)
+    db.commit()
+    score_cache.clear()
+
+    window_matches = ReconciliationService.reconcile(
+        db, tenant.id, scoring_backend="window", full=True
+    )
+    assert python_pairs
+    # Proposed in date order rather than id order
+    assert sorted(
+        (m.invoice_id, m.bank_transaction_id, m.score) for m in window_matches
+    ) == python_pairs
+
+
+def test_similarity_backends():
+    """Test the text similarity backends on bank-style descriptions."""
+    from difflib import SequenceMatcher
+    from app.services.similarity import SIMILARITY_BACKENDS, get_similarity
+
+    invoice = "Acme Corp - Office supplies"
+    bank = "ACH DEBIT ACME CORP OFFICE SUPPLIES REF123456"
+    unrelated = "WIRE TRF GLOBEX CLOUD HOSTING"
+
+    sequence = get_similarity("sequence")
+    assert sequence.ratio(sequence.prepare(invoice), sequence.prepare(bank)) == (
+        SequenceMatcher(None, invoice.lower(), bank.lower()).ratio()
+    )
+
+    for name in SIMILARITY_BACKENDS:
+        backend = get_similarity(name)
+        a, b, c = (backend.prepare(text) for text in (invoice, bank, unrelated))
+        assert backend.ratio(a, b) > backend.ratio(a, c)
+        assert backend.ratio(a, backend.prepare(invoice.upper())) == 1.0
+        # A perfect ratio implies equal exact keys (used by candidate blocking)
+        assert backend.exact_key(a) == backend.exact_key(backend.prepare(invoice.upper()))
+
+    with pytest.raises(ValueError):
+        get_similarity("unknown")
+
+
+def test_parallel_scoring_matches_single_process(tenant, vendor, db):
+    """Test that process-pool scoring returns the single-process results."""
+    from app.services.parallel_scoring import ParallelScoringBackend
+    from app.services.score_cache import ScoreCache
+    from app.services.scoring_backends import get_scoring_backend
+
+    invoices, transactions = _random_ledger(db, tenant, vendor, seed=5)
+    excluded = {(invoices[1].id, transactions[2].id), (invoices[9].id, transactions[0].id)}
+
+    def results(backend):
+        return [
+            (invoice.id, scored)
+            for invoice, scored in backend.score_candidates(invoices, transactions, excluded)
+        ]
+
+    expected = results(get_scoring_backend("python"))
+    actual = results(ParallelScoringBackend("python", workers=2, chunk_size=7))
+
+    assert any(scored for _, scored in expected)
+    assert actual == expected
+
+    # A single chunk is scored in this process, through the score cache
+    cache = ScoreCache(max_size=10000)
+    single = ParallelScoringBackend("python", workers=2, chunk_size=1000, cache=cache)
+    assert results(single) == expected
+    assert cache.stats()["size"] > 0
+    rescored = ParallelScoringBackend("python", workers=2, chunk_size=1000, cache=cache)
+    assert results(rescored) == expected
+    assert cache.stats()["hits"] > 0
+
+
+def test_amount_cents_scoring(tenant, db):
+    """Test that amounts are stored as cents and scored with integer tolerances."""
+    from app.services.scoring import amount_points
+
+    invoice = Invoice(tenant_id=tenant.id, amount=Decimal("100.00"), status=InvoiceStatus.OPEN)
+    transaction = BankTransaction(
+        tenant_id=tenant.id, amount=Decimal("19.995"), posted_at=datetime(2024, 1, 1)
+    )
+    db.add_all([invoice, transaction])
+    db.commit()
+    assert invoice.amount_cents == 10000
+    assert transaction.amount_cents == 2000
+
+    invoice.amount = Decimal("250.10")
+    db.commit()
+    db.refresh(invoice)
+    assert invoice.amount_cents == 25010
+    assert invoice.amount == Decimal("250.10")
+
+    # Tier boundaries are inclusive and exact in integer cents
+    assert amount_points(10000, 10000) == 40
+    assert amount_points(10000, 10100) == 30
+    assert amount_points(10000, 10101) == 15
+    assert amount_points(10000, 10500) == 15
+    assert amount_points(10000, 10501) == 0
+    assert amount_points(0, 1) == 0
+
+
+def test_amount_cents_backfill(tenant, db):
+    """Test that the schema upgrade adds and backfills the cents columns."""
+    from sqlalchemy import inspect, text
+    from app.schema_upgrades import upgrade_schema
+
+    db.add_all(
+        [
+            Invoice(tenant_id=tenant.id, amount=Decimal("12.34"), status=InvoiceStatus.OPEN),
+            Invoice(tenant_id=tenant.id, amount=Decimal("-0.50"), status=InvoiceStatus.OPEN),
+        ]
+    )
+    db.commit()
+    engine = db.get_bind()
+    db.close()
+
+    # Recreate the table layout from before the cents column existed
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_invoices_tenant_amount_cents"))
+        conn.execute(text("ALTER TABLE invoices DROP COLUMN amount_cents"))
+    # Pooled SQLite connections may still report the old columns
+    engine.dispose()
+
+    upgrade_schema(engine)
+
+    with engine.connect() as conn:
+        cents = conn.execute(text("SELECT amount_cents FROM invoices ORDER BY id")).scalars().all()
+    assert cents == [1234, -50]
+    indexes = {index["name"] for index in inspect(engine).get_indexes("invoices")}
+    assert "ix_invoices_tenant_amount_cents" in indexes
+
+
+def test_vendor_automaton():
+    """Test that the automaton finds the same vendors as a substring search."""
+    from app.services.vendor_automaton import VendorAutomaton
+
+    names = {1: "Acme", 2: "Acme Corp", 3: "ME C", 4: "Globex", 5: "cor"}
+    automaton = VendorAutomaton((name, vendor_id) for vendor_id, name in names.items())
+    descriptions = [
+        "ACH DEBIT ACME CORP REF 1",
+        "acmacme co",
+        "WIRE GLOBEXGLOBEX",
+        "Card payment",
+        "",
+        None,
+    ]
+    for description in descriptions:
+        expected = {
+            vendor_id
+            for vendor_id, name in names.items()
+            if description and name.lower() in description.lower()
+        }
+        assert automaton.mentioned(description) == expected
+
+
+def test_vendor_aliases_and_cache(tenant, vendor, db, monkeypatch):
+    """Test that aliases earn the vendor bonus and vendor changes rebuild the automaton."""
+    from sqlalchemy import insert
+    from app.models.vendor_alias import VendorAlias
+    from app.services import vendor_automaton
+    from app.services.reconciliation_service import ReconciliationService
+    from app.services.vendor_automaton import VendorAutomatonService
+
+    day = datetime(2024, 11, 4)
+    invoice = Invoice(
+        tenant_id=tenant.id,
+        vendor_id=vendor.id,
+        amount=Decimal("100.00"),
+        invoice_date=day,
+        status=InvoiceStatus.OPEN,
+    )
+    # 15 amount points + 10 date points: short of the threshold without the bonus
+    transaction = BankTransaction(
+        tenant_id=tenant.id,
+        amount=Decimal("104.00"),
+        posted_at=day + timedelta(days=3),
+        description="ACH DEBIT TSTV 8812",
+    )
+    db.add_all([invoice, transaction])
+    db.commit()
+
+    automaton = VendorAutomatonService.get_automaton(db, tenant.id)
+    assert VendorAutomatonService.get_automaton(db, tenant.id) is automaton
+    assert ReconciliationService.reconcile(db, tenant.id) == []
+
+    # Written without the ORM (as by another process), so only the stamp
+    # of the tenant's vendors and aliases shows the change
+    db.execute(
+        insert(VendorAlias), [{"tenant_id": tenant.id, "vendor_id": vendor.id, "alias": "TSTV"}]
+    )
+    db.commit()
+    assert VendorAutomatonService.get_automaton(db, tenant.id) is not automaton
+
+    matches = ReconciliationService.reconcile(db, tenant.id, full=True)
+    assert [(m.invoice_id, m.bank_transaction_id) for m in matches] == [
+        (invoice.id, transaction.id)
+    ]
+    assert matches[0].score == Decimal("35.00")
+    assert ReconciliationService.calculate_match_score(invoice, transaction, db) == Decimal("35")
+
+    # Only the most recently used tenants are kept
+    automaton = VendorAutomatonService.get_automaton(db, tenant.id)
+    monkeypatch.setattr(vendor_automaton, "VENDOR_AUTOMATON_CACHE_SIZE", 1)
+    VendorAutomatonService.get_automaton(db, tenant.id + 1)
+    assert VendorAutomatonService.get_automaton(db, tenant.id) is not automaton
+
+
+def test_score_cache_lru():
+    """Test LRU eviction, counters and per-record invalidation of the score cache."""
+    from app.services.score_cache import ScoreCache
+
+    cache = ScoreCache(max_size=2)
+    first, second, third = (1, 1, 10, 1, "s"), (1, 1, 11, 1, "s"), (2, 1, 10, 1, "s")
+    cache.put(first, Decimal("50"))
+    cache.put(second, Decimal("60"))
+    assert cache.get(first) == Decimal("50")
+    cache.put(third, Decimal("70"))  # evicts second, the least recently used
+
+    assert cache.get(second) is None
+    assert cache.get(third) == Decimal("70")
+    cache.invalidate_transaction(10)
+    assert cache.get(first) is None and cache.get(third) is None
+
+    stats = cache.stats()
+    assert stats["size"] == 0
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 3, 1)
+    assert stats["invalidations"] == 2
+
+
+def test_score_cache_versions_and_table_tier(client, tenant, vendor, db, monkeypatch):
+    """Test that explain reads cached scores and record updates invalidate them."""
+    from app.models.pair_score import PairScore
+    from app.services.score_cache import score_cache as cache
+    from app.services.scoring import calculate_match_score
+
+    monkeypatch.setattr(cache, "persist", True)
+    for counter in ("hits", "misses", "persistent_hits"):
+        monkeypatch.setattr(cache, counter, 0)
+
+    day = datetime(2024, 12, 2)
+    invoice = Invoice(
+        tenant_id=tenant.id,
+        vendor_id=vendor.id,
+        amount=Decimal("80.00"),
+        invoice_date=day,
+        description="Consulting retainer",
+        status=InvoiceStatus.OPEN,
+    )
+    transaction = BankTransaction(
+        tenant_id=tenant.id, amount=Decimal("80.00"), posted_at=day, description="Retainer"
+    )
+    db.add_all([invoice, transaction])
+    db.commit()
+
+    url = (
+        f"/tenants/{tenant.id}/reconcile/explain"
+        f"?invoice_id={invoice.id}&transaction_id={transaction.id}"
+    )
+    assert client.get(url).status_code == 200
+    assert client.get(url).status_code == 200
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert db.query(PairScore).count() == 1
+
+    # A new process would find the score in the table tier
+    cache.clear()
+    assert client.get(url).status_code == 200
+    assert cache.persistent_hits == 1
+
+    # Updating either record bumps its version and purges its scores
+    invoice.description = "Retainer"
+    db.commit()
+    assert invoice.version == 2
+    assert db.query(PairScore).count() == 0
+    assert cache.stats()["size"] == 0
+
+    assert client.get(url).status_code == 200
+    assert cache.misses == 2
+    stats = client.get("/admin/score-cache").json()
+    assert (stats["hits"], stats["persistent_hits"], stats["misses"]) == (1, 1, 2)
+    stored = db.query(PairScore).one()
+    assert (stored.invoice_version, stored.transaction_version) == (2, 1)
+    assert Decimal(stored.score) == calculate_match_score(invoice, transaction)
@@ -81,3 +81,464 @@ def test_import_transactions_idempotency(client, tenant):
         headers={"Idempotency-Key": "idempotent-key-1"},
     )
     assert response3.status_code == 409
+
+
+def test_import_transactions_in_chunks(db, tenant):
+    """Test that imports insert per chunk with RETURNING and never reload rows."""
+    from decimal import Decimal
+    from sqlalchemy import event
+    from app.services.transaction_service import TransactionService
+
+    rows = [
+        {
+            "external_id": f"TX-{number}",
+            "posted_at": datetime(2024, 8, 1 + number).isoformat(),
+            "amount": 10.05 * (number + 1),
+            "description": f"Payment {number}",
+        }
+        for number in range(5)
+    ]
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        imported, is_duplicate = TransactionService.import_transactions(
+            db, tenant.id, rows, idempotency_key="chunked", chunk_size=2
+        )
+        # Everything the response needs was returned by the inserts
+        assert [t.external_id for t in imported] == [row["external_id"] for row in rows]
+        assert [t.amount_cents for t in imported] == [1005, 2010, 3015, 4020, 5025]
+        assert all(t.id and t.created_at and t.version == 1 for t in imported)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert not is_duplicate
+    inserts = [s for s in statements if s.startswith("INSERT INTO bank_transactions")]
+    assert len(inserts) == 3
+    assert not [s for s in statements if s.startswith("SELECT") and "bank_transactions" in s]
+    assert imported[2].amount == Decimal("30.15")
+
+
+def test_import_transaction_models_exact_and_canonical(client, tenant, db):
+    """Test typed imports keep exact amounts and hash a canonical encoding."""
+    from decimal import Decimal
+    from app.models.idempotency import IdempotencyKey
+    from app.schemas.transaction import TransactionCreate
+    from app.services.transaction_service import TransactionService
+
+    models = [
+        TransactionCreate(
+            external_id="TX-1",
+            posted_at=datetime(2024, 3, 1, 12, 0),
+            amount=Decimal("98765432.19"),
+            description="Large payment",
+        )
+    ]
+    imported, _ = TransactionService.import_transaction_models(db, tenant.id, models)
+    assert imported[0].amount == Decimal("98765432.19")
+    assert imported[0].amount_cents == 9876543219
+
+    # The same values spelt differently are the same payload
+    def post(amount, posted_at, key):
+        return client.post(
+            f"/tenants/{tenant.id}/bank-transactions/import",
+            json={
+                "transactions": [
+                    {"external_id": "TX-2", "posted_at": posted_at, "amount": amount}
+                ]
+            },
+            headers={"Idempotency-Key": key},
+        )
+
+    first = post("100.10", "2024-03-01T12:00:00+00:00", "canonical")
+    replay = post("100.1", "2024-03-01T13:00:00+01:00", "canonical")
+    assert replay.json() == first.json()
+    assert post("100.11", "2024-03-01T12:00:00Z", "canonical").status_code == 409
+    stored = db.query(IdempotencyKey).filter(IdempotencyKey.key == "canonical").one()
+    assert stored.payload_hash.startswith("v2:")
+
+    # Keys hashed by earlier versions, over float-converted dicts, still replay
+    legacy = [
+        {
+            "external_id": "TX-1",
+            "posted_at": "2024-03-01T12:00:00",
+            "amount": 98765432.19,
+            "currency": "USD",
+            "description": "Large payment",
+        }
+    ]
+    db.add(
+        IdempotencyKey(
+            key="legacy",
+            tenant_id=tenant.id,
+            payload_hash=IdempotencyKey.hash_payload(legacy),
+            response_data=f'{{"transaction_ids": [{imported[0].id}]}}',
+        )
+    )
+    db.commit()
+    replayed, is_duplicate = TransactionService.import_transaction_models(
+        db, tenant.id, models, idempotency_key="legacy"
+    )
+    assert is_duplicate and [t.id for t in replayed] == [imported[0].id]
+
+
+def test_import_csv_statement(client, tenant, monkeypatch):
+    """Test CSV statement upload with chunked commits and per-row errors."""
+    from app.services import transaction_service
+
+    monkeypatch.setattr(transaction_service, "STATEMENT_CHUNK_SIZE", 2)
+    statement = (
+        "Date,Amount,Description,Reference\n"
+        "2024-01-15,100.00,Payment ACME,REF-1\n"
+        "01/16/2024,\"1,250.50\",Payment Globex,REF-2\n"
+        "2024-01-17,abc,Broken,REF-3\n"
+        "\n"
+        "2024-01-18,-20.00,Fee,REF-4\n"
+        ",30.00,No date,REF-5\n"
+    )
+    response = client.post(
+        f"/tenants/{tenant.id}/bank-transactions/import/statement",
+        files={"file": ("statement.csv", statement.encode(), "text/csv")},
+    )
+    assert response.status_code == 201
+    report = response.json()
+    assert report["format"] == "csv"
+    assert (report["rows"], report["imported"], report["failed"]) == (5, 3, 2)
+    assert report["errors"] == [
+        {"line": 4, "error": "invalid amount 'abc'"},
+        {"line": 7, "error": "posted_at is required"},
+    ]
+    assert report["rows_per_second"] > 0
+
+    # Known and repeated external ids are skipped and reported per line,
+    # keeping the rest of the statement
+    statement = (
+        "Date,Amount,Description,Reference\n"
+        "2024-01-19,10.00,New,REF-6\n"
+        "2024-01-15,100.00,Payment ACME,REF-1\n"
+        "2024-01-20,11.00,New again,REF-6\n"
+        "2024-01-21,12.00,Newer,REF-7\n"
+    )
+    response = client.post(
+        f"/tenants/{tenant.id}/bank-transactions/import/statement",
+        files={"file": ("statement.csv", statement.encode(), "text/csv")},
+    )
+    assert response.status_code == 201
+    report = response.json()
+    assert (report["rows"], report["imported"], report["failed"]) == (4, 2, 2)
+    assert report["errors"] == [
+        {"line": 3, "error": "external_id 'REF-1' already imported"},
+        {"line": 4, "error": "external_id 'REF-6' already imported"},
+    ]
+
+    # Records the csv module rejects fail alone, keeping the rest
+    statement = (
+        "Date,Amount,Description,Reference\n"
+        f"2024-01-22,13.00,\"{'z' * 200000}\",REF-8\n"
+        "2024-01-23,14.00,After,REF-9\n"
+        "2024-01-24,15.00,\"Unterminated,REF-10\n"
+    )
+    response = client.post(
+        f"/tenants/{tenant.id}/bank-transactions/import/statement",
+        files={"file": ("statement.csv", statement.encode(), "text/csv")},
+    )
+    assert response.status_code == 201
+    report = response.json()
+    assert (report["rows"], report["imported"], report["failed"]) == (3, 1, 2)
+    assert report["errors"] == [
+        {"line": 2, "error": "invalid CSV record: field larger than field limit (131072)"},
+        {"line": 4, "error": "invalid CSV record: unexpected end of data"},
+    ]
+
+    response = client.post(
+        f"/tenants/{tenant.id}/bank-transactions/import/statement",
+        files={"file": ("statement.txt", b"x", "text/plain")},
+    )
+    assert response.status_code == 422
+
+
+def test_import_ofx_statement(client, tenant, db, monkeypatch):
+    """Test OFX statement parsing across read boundaries, SGML and XML."""
+    import io
+    from decimal import Decimal
+    from app.models.bank_transaction import BankTransaction
+    from app.services import statement_parsers
+
+    # Tiny reads so elements are split across chunks
+    monkeypatch.setattr(statement_parsers, "READ_SIZE", 7)
+    sgml = (
+        "OFXHEADER:100\nDATA:OFXSGML\n\n"
+        "<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>EUR\n"
+        "<BANKTRANLIST>\n"
+        "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240115120000[-5:EST]"
+        "<TRNAMT>100.00<FITID>F-1<NAME>ACME &amp; Co<MEMO>INV-1\n"
+        "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>bad<TRNAMT>5<FITID>F-2\n"
+        "</STMTTRN>\n"
+        "<STMTTRN><DTPOSTED>20240116<TRNAMT>-2.50<FITID>F-3<NAME>Fee</STMTTRN>\n"
+        "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+    )
+    response = client.post(
+        f"/tenants/{tenant.id}/bank-transactions/import/statement",
+        files={"file": ("statement.qfx", sgml.encode(), "application/octet-stream")},
+    )
+    report = response.json()
+    assert (report["format"], report["imported"], report["failed"]) == ("ofx", 2, 1)
+    assert report["errors"] == [{"line": 7, "error": "invalid DTPOSTED 'bad'"}]
+
+    transactions = {t.external_id: t for t in db.query(BankTransaction)}
+    assert transactions["F-1"].description == "ACME & Co - INV-1"
+    assert transactions["F-1"].currency == "EUR"
+    assert transactions["F-1"].amount_cents == 10000
+    assert transactions["F-3"].amount == Decimal("-2.50")
+
+    xml = (
+        '<?xml version="1.0"?><?OFX OFXHEADER="200"?><OFX><STMTRS><CURDEF>USD</CURDEF>'
+        "<BANKTRANLIST><STMTTRN><DTPOSTED>20240120</DTPOSTED><TRNAMT>42.00</TRNAMT>"
+        "<FITID>X-1</FITID><NAME>Globex</NAME></STMTTRN></BANKTRANLIST></STMTRS></OFX>"
+    )
+    rows = list(statement_parsers.parse_ofx(io.BytesIO(xml.encode())))
+    assert [(r.values["external_id"], r.values["amount"]) for r in rows] == [
+        ("X-1", Decimal("42.00"))
+    ]
+
+    # Text without tags is skipped past MAX_ELEMENT_SIZE instead of buffered,
+    # keeping line numbers
+    monkeypatch.setattr(statement_parsers, "READ_SIZE", 4096)
+    monkeypatch.setattr(statement_parsers, "MAX_ELEMENT_SIZE", 100)
+    untagged = ("x" * 999 + "\n") * 1000
+    ofx = (
+        untagged
+        + "<STMTTRN><DTPOSTED>bad<TRNAMT>1<FITID>L-1<NAME>"
+        + "y" * 5000
+        + "\n<STMTTRN><DTPOSTED>20240121<TRNAMT>7.00<FITID>L-2</STMTTRN>"
+    )
+    rows = list(statement_parsers.parse_ofx(io.BytesIO(ofx.encode())))
+    assert [(r.line, r.error) for r in rows] == [
+        (1001, "invalid DTPOSTED 'bad'"),
+        (1002, None),
+    ]
+    fields = list(statement_parsers._ofx_elements(io.BytesIO(ofx.encode())))
+    assert max(len(text) for _, _, _, text in fields) <= 100
+
+
+def test_import_transactions_ndjson(client, tenant, db, monkeypatch):
+    """Test NDJSON streaming import, chunking and idempotency across formats."""
+    import json
+    from app.models.bank_transaction import BankTransaction
+    from app.services import transaction_service
+
+    monkeypatch.setattr(transaction_service, "IMPORT_CHUNK_SIZE", 2)
+    transactions = [
+        {
+            "external_id": f"TX-{number}",
+            "posted_at": datetime(2024, 1, 1 + number).isoformat(),
+            "amount": f"{number + 1}00.00",
+            "currency": "USD",
+            "description": f"Payment {number}",
+        }
+        for number in range(5)
+    ]
+    body = "\n".join(json.dumps(t) for t in transactions) + "\n\n"
+
+    def post_ndjson(content, key):
+        return client.post(
+            f"/tenants/{tenant.id}/bank-transactions/import",
+            content=content,
+            headers={"Content-Type": "application/x-ndjson", "Idempotency-Key": key},
+        )
+
+    response = post_ndjson(body, "ndjson-1")
+    assert response.status_code == 201
+    report = response.json()
+    assert report["imported"] == 5 and not report["duplicate"]
+    assert report["last_id"] - report["first_id"] == 4
+    assert [t.external_id for t in db.query(BankTransaction).order_by(BankTransaction.id)] == [
+        t["external_id"] for t in transactions
+    ]
+
+    # Replays return the stored report, and the same transactions as a JSON
+    # body carry the same payload hash
+    assert post_ndjson(body, "ndjson-1").json() == {**report, "duplicate": True}
+    response = client.post(
+        f"/tenants/{tenant.id}/bank-transactions/import",
+        json={"transactions": transactions},
+        headers={"Idempotency-Key": "ndjson-1"},
+    )
+    assert response.status_code == 201
+    assert post_ndjson(body.replace("Payment 4", "Payment X"), "ndjson-1").status_code == 409
+
+    # An invalid line rejects the whole import
+    lines = body.replace("TX-", "TY-").splitlines()
+    lines[2] = '{"posted_at": "2024-01-01T00:00:00"}'
+    response = post_ndjson("\n".join(lines), "ndjson-2")
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 3, "amount"]
+    assert db.query(BankTransaction).count() == 5
+
+
+def test_import_transactions_upsert(client, tenant, db):
+    """Test external-id conflicts fail plain imports and upsert on request."""
+    import json
+    from decimal import Decimal
+    from sqlalchemy import inspect, text
+    from app.models.bank_transaction import BankTransaction
+    from app.schema_upgrades import upgrade_schema
+
+    def transaction(number, amount="100.00"):
+        return {
+            "external_id": f"TX-{number}",
+            "posted_at": datetime(2024, 5, number).isoformat(),
+            "amount": amount,
+            "description": f"Payment {number}",
+        }
+
+    def post(transactions, on_conflict=None):
+        return client.post(
+            f"/tenants/{tenant.id}/bank-transactions/import",
+            json={"transactions": transactions},
+            params={"on_conflict": on_conflict} if on_conflict else {},
+        )
+
+    assert post([transaction(1), transaction(2), transaction(3)]).status_code == 201
+    assert post([transaction(4), transaction(1)]).status_code == 409
+    assert db.query(BankTransaction).count() == 3
+
+    response = post([transaction(2), transaction(4)], "skip")
+    assert response.json() == {"inserted": 1, "updated": 0, "skipped": 1, "duplicate": False}
+
+    # Unchanged rows are skipped; a repeated external id updates its first row
+    response = post(
+        [transaction(1), transaction(3, "300.00"), transaction(5), transaction(5, "5.55")],
+        "update",
+    )
+    assert response.json() == {"inserted": 1, "updated": 2, "skipped": 1, "duplicate": False}
+    db.expire_all()
+    updated = {t.external_id: t for t in db.query(BankTransaction)}
+    assert len(updated) == 5
+    assert (updated["TX-3"].amount, updated["TX-3"].amount_cents) == (Decimal("300.00"), 30000)
+    assert (updated["TX-1"].version, updated["TX-3"].version, updated["TX-5"].version) == (1, 2, 2)
+
+    response = client.post(
+        f"/tenants/{tenant.id}/bank-transactions/import",
+        params={"on_conflict": "skip"},
+        content="\n".join(json.dumps(transaction(n)) for n in range(1, 7)),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.json() == {"inserted": 1, "updated": 0, "skipped": 5, "duplicate": False}
+
+    statement = "Date,Amount,Reference\n2024-05-01,100.00,TX-1\n2024-05-07,70.00,TX-7\n"
+    response = client.post(
+        f"/tenants/{tenant.id}/bank-transactions/import/statement",
+        params={"on_conflict": "skip"},
+        files={"file": ("statement.csv", statement.encode(), "text/csv")},
+    )
+    report = response.json()
+    assert (report["imported"], report["updated"], report["skipped"]) == (1, 0, 1)
+
+    # The schema upgrade keeps duplicates imported before the unique index,
+    # clearing all but the first one's external id
+    engine = db.get_bind()
+    db.close()
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ux_bank_transactions_tenant_external_id"))
+        conn.execute(
+            text(
+                "INSERT INTO bank_transactions (tenant_id, external_id, posted_at, amount, "
+                "amount_cents, currency, version) SELECT tenant_id, external_id, posted_at, "
+                "amount, amount_cents, currency, 1 FROM bank_transactions WHERE external_id = 'TX-1'"
+            )
+        )
+    engine.dispose()
+
+    upgrade_schema(engine)
+
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT external_id FROM bank_transactions WHERE amount_cents = 10000 ORDER BY id")
+        ).scalars().all()
+    assert rows == ["TX-1", "TX-2", "TX-4", "TX-6", None]
+    indexes = {index["name"] for index in inspect(engine).get_indexes("bank_transactions")}
+    assert "ux_bank_transactions_tenant_external_id" in indexes
+
+
+def test_idempotency_store(client, tenant, db, monkeypatch):
+    """Test replays from the key cache, tenant-scoped keys and TTL expiry."""
+    import time
+    from datetime import timedelta, timezone
+    from sqlalchemy import event
+    from app.models.idempotency import IdempotencyKey
+    from app.models.tenant import Tenant
+    from app.services.idempotency_store import idempotency_store
+
+    monkeypatch.setattr(idempotency_store, "ttl", 3600)
+    other = Tenant(name="Other Tenant")
+    db.add(other)
+    db.commit()
+
+    def post(tenant_id, amount, key):
+        return client.post(
+            f"/tenants/{tenant_id}/bank-transactions/import",
+            json={
+                "transactions": [
+                    {
+                        "external_id": f"TX-{amount}",
+                        "posted_at": "2024-06-01T00:00:00",
+                        "amount": amount,
+                    }
+                ]
+            },
+            headers={"Idempotency-Key": key},
+        )
+
+    first = post(tenant.id, "10.00", "store-1")
+    assert first.status_code == 201
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        # Answered from the cache and the stored response alone
+        assert post(tenant.id, "10.00", "store-1").json() == first.json()
+        assert not [s for s in statements if "idempotency_keys" in s or "bank_transactions" in s]
+        idempotency_store.clear()
+        assert post(tenant.id, "10.00", "store-1").json() == first.json()
+        assert not [s for s in statements if "FROM bank_transactions" in s]
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert idempotency_store.stats()["hits"] >= 1
+
+    # Keys are scoped to their tenant
+    assert post(other.id, "20.00", "store-1").status_code == 201
+    assert post(tenant.id, "20.00", "store-1").status_code == 409
+
+    # An expired key is ignored and replaced, and the sweeper deletes the rest
+    db.query(IdempotencyKey).update(
+        {IdempotencyKey.created_at: datetime.now(timezone.utc) - timedelta(hours=2)},
+        synchronize_session=False,
+    )
+    db.commit()
+    idempotency_store.clear()
+    replaced = post(tenant.id, "30.00", "store-1")
+    assert replaced.status_code == 201 and replaced.json()[0]["amount"] == "30.00"
+    assert db.query(IdempotencyKey).count() == 2
+
+    # Replace the app's sweeper with a fast one on the test database
+    idempotency_store.stop_sweeper()
+    idempotency_store.start_sweeper(engine, interval=0.01)
+    try:
+        deadline = time.monotonic() + 5
+        while db.query(IdempotencyKey).count() > 1 and time.monotonic() < deadline:
+            db.rollback()
+            time.sleep(0.01)
+    finally:
+        idempotency_store.stop_sweeper()
+    assert [k.tenant_id for k in db.query(IdempotencyKey)] == [tenant.id]